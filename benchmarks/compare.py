@@ -0,0 +1,52 @@
+"""Compare two run_benchmarks.py result files stage by stage.
+
+    python benchmarks/compare.py benchmarks/results/old.json benchmarks/results/new.json
+
+Prints the wall time and peak memory of both runs per scale and stage, with
+the new/old ratio. Exits with status 1 when any stage got slower than
+--threshold (default 1.25x), so it can gate CI.
+"""
+import argparse
+import json
+import sys
+
+
+def _load(path):
+    with open(path) as f:
+        report = json.load(f)
+    return report, {run["scale"]: run["stages"] for run in report["runs"]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="new/old wall time ratio that counts as a regression (default: 1.25)")
+    args = parser.parse_args(argv)
+
+    old_report, old_runs = _load(args.old)
+    new_report, new_runs = _load(args.new)
+    print(f"old: {old_report['commit']}  new: {new_report['commit']}")
+
+    regressions = []
+    for scale in sorted(set(old_runs) & set(new_runs)):
+        print(f"\n=== {scale:g}x ===")
+        print(f"{'stage':<12}{'old s':>9}{'new s':>9}{'ratio':>8}{'old MB':>9}{'new MB':>9}")
+        for stage, new in new_runs[scale].items():
+            old = old_runs[scale].get(stage)
+            if old is None:
+                continue
+            ratio = new["wall_seconds"] / old["wall_seconds"] if old["wall_seconds"] else float("inf")
+            print(f"{stage:<12}{old['wall_seconds']:>9.3f}{new['wall_seconds']:>9.3f}{ratio:>7.2f}x"
+                  f"{old['peak_rss_delta_mb']:>9.1f}{new['peak_rss_delta_mb']:>9.1f}")
+            if ratio > args.threshold:
+                regressions.append(f"{scale:g}x {stage}: {ratio:.2f}x slower")
+
+    if regressions:
+        print("\nRegressions:\n  " + "\n  ".join(regressions))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
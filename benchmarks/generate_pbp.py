@@ -0,0 +1,191 @@
+"""Synthetic nflfastR-shaped play-by-play data for the benchmarks.
+
+Writes play_by_play_{year}.parquet files with the columns the analysis reads
+and realistic distributions of down, ydstogo, yardline_100, play_type,
+game_seconds_remaining, epa, player ids and desc. --scale 1 is about the size of
+the real 1999-2024 data (~48k plays per season), --scale 50 fifty times that.
+Seasons are written in chunks, so memory stays bounded at any scale.
+
+    python benchmarks/generate_pbp.py --scale 5 --out bench_data/x5
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+PLAYS_PER_SEASON = 48_000
+CHUNK_ROWS = 250_000
+TEAMS = ["ARI", "ATL", "BAL", "BUF", "CAR", "CHI", "CIN", "CLE", "DAL", "DEN", "DET",
+         "GB", "HOU", "IND", "JAX", "KC", "LA", "LAC", "LV", "MIA", "MIN", "NE", "NO",
+         "NYG", "NYJ", "PHI", "PIT", "SEA", "SF", "TB", "TEN", "WAS"]
+# per team: quarterbacks are players 0-2, skill players 3-29
+PLAYERS_PER_TEAM = 30
+QBS_PER_TEAM = 3
+
+DOWNS = [1, 2, 3, 4, None]
+DOWN_P = [0.36, 0.27, 0.18, 0.09, 0.10]  # None: kickoffs, extra points, timeouts
+EARLY_DOWN_PLAY_TYPES = ["run", "pass", "no_play", None]
+EARLY_DOWN_P = [0.42, 0.52, 0.04, 0.02]
+
+
+def _player_ids(team_idx, player_idx):
+    """GSIS-style ids ("00-0030100"), unique per team and player"""
+    numbers = 30000 + team_idx * 100 + player_idx
+    return pc.binary_join_element_wise("00-00", pa.array(numbers.astype(str)), "")
+
+
+def _fourth_down_play_types(rng, yardline_100, ydstogo):
+    """punt / field_goal / run / pass / no_play for 4th downs, depending on field position and distance"""
+    n = len(yardline_100)
+    go_p = np.clip(0.55 * np.exp(-0.35 * (ydstogo - 1)) + 0.05, 0.03, 0.6)
+    go_p = np.where(yardline_100 > 60, go_p * 0.5, go_p)
+    fg_p = np.where(yardline_100 <= 37, 0.85, 0.02) * (1 - go_p)
+    roll = rng.random(n)
+    play_type = np.where(roll < go_p, np.where(rng.random(n) < 0.45, "run", "pass"),
+                         np.where(roll < go_p + fg_p, "field_goal", "punt")).astype(object)
+    penalty = rng.random(n)
+    play_type[penalty < 0.05] = "no_play"
+    play_type[penalty > 0.985] = None
+    return play_type
+
+
+def generate_chunk(rng, season, n, first_play_id):
+    """One chunk of `n` plays of a season as an Arrow table"""
+    down = rng.choice(len(DOWNS), n, p=DOWN_P)
+    down_values = np.where(down == len(DOWNS) - 1, np.nan, down + 1.0)
+
+    yardline_100 = np.clip(np.round(rng.beta(2.2, 1.8, n) * 98 + 1), 1, 99)
+    # 1st downs are almost always 10 yards, later downs roughly geometric
+    ydstogo = np.where((down_values == 1) & (rng.random(n) < 0.9), 10, rng.geometric(0.16, n))
+    ydstogo = np.clip(np.minimum(ydstogo, yardline_100), 1, 50)
+
+    play_type = rng.choice(np.array(EARLY_DOWN_PLAY_TYPES, dtype=object), n, p=EARLY_DOWN_P)
+    fourth = down_values == 4
+    play_type[fourth] = _fourth_down_play_types(rng, yardline_100[fourth], ydstogo[fourth])
+    is_run, is_pass = play_type == "run", play_type == "pass"
+
+    qtr = rng.choice([1, 2, 3, 4, 5], n, p=[0.245, 0.26, 0.24, 0.245, 0.01])
+    game_seconds_remaining = np.where(qtr == 5, 0, (4 - np.minimum(qtr, 4)) * 900 + rng.integers(0, 901, n))
+
+    # go-for-it conversions fall off with distance (about 70% on 4th and 1)
+    convert_p = np.clip(0.72 * np.exp(-0.11 * (ydstogo - 1)), 0.15, 0.75)
+    converted = (rng.random(n) < convert_p) & fourth & (is_run | is_pass)
+    failed = fourth & (is_run | is_pass) & ~converted
+
+    # expected points added: a failed 4th down costs more the closer it is to
+    # the offense's own goal line, field goals are made less often from further out
+    epa = rng.normal(0, 1.2, n)
+    epa[converted] = 1.2 + rng.normal(0, 0.8, converted.sum())
+    epa[failed] = -1.0 - 2.5 * yardline_100[failed] / 100 + rng.normal(0, 0.5, failed.sum())
+    punt, kick = fourth & (play_type == "punt"), fourth & (play_type == "field_goal")
+    epa[punt] = -0.4 + rng.normal(0, 0.6, punt.sum())
+    made = rng.random(kick.sum()) < np.clip(1.1 - yardline_100[kick] / 45, 0.05, 0.97)
+    epa[kick] = np.where(made, 1.4 - yardline_100[kick] / 40, -1.6 - yardline_100[kick] / 40)
+
+    week = rng.integers(1, 19, n).astype(np.int32)
+    posteam = rng.integers(0, len(TEAMS), n)
+    defteam = (posteam + rng.integers(1, len(TEAMS), n)) % len(TEAMS)
+    qb = rng.integers(0, QBS_PER_TEAM, n)
+    # short-yardage 4th down runs are often QB sneaks
+    qb_runs = is_run & (rng.random(n) < np.where(fourth & (ydstogo <= 2), 0.45, 0.12))
+    rusher = np.where(qb_runs, qb, rng.integers(QBS_PER_TEAM, PLAYERS_PER_TEAM, n))
+    scramble = qb_runs & ~fourth & (rng.random(n) < 0.3)
+
+    passer_id = pc.if_else(pa.array(is_pass), _player_ids(posteam, qb), pa.scalar(None, pa.string()))
+    rusher_id = pc.if_else(pa.array(is_run), _player_ids(posteam, rusher), pa.scalar(None, pa.string()))
+    passer_name = pc.if_else(pa.array(is_pass),
+                             pa.array(np.char.add("QB", (posteam * 10 + qb).astype(str))), pa.scalar(None, pa.string()))
+    rusher_name = pc.if_else(pa.array(is_run),
+                             pa.array(np.char.add(np.where(qb_runs, "QB", "RB"), (posteam * 100 + rusher).astype(str))),
+                             pa.scalar(None, pa.string()))
+
+    sneak_words = np.where(qb_runs & (ydstogo <= 2) & (rng.random(n) < 0.5), "QB sneak ", "")
+    desc = np.select(
+        [is_pass, is_run, play_type == "punt", play_type == "field_goal", play_type == "no_play"],
+        ["pass short right", "up the middle", "punts 44 yards", "field goal attempt is GOOD", "PENALTY"],
+        "Timeout")
+    desc = pc.binary_join_element_wise(pa.array(np.where(is_run, "(Shotgun) ", "")),
+                                       pa.array(sneak_words), pa.array(desc), "")
+
+    return pa.table({
+        "play_id": np.arange(first_play_id, first_play_id + n),
+        "game_id": pc.binary_join_element_wise(str(season), pa.array(week.astype(str)), "_"),
+        "season": np.full(n, season, dtype=np.int32),
+        "week": week,
+        "posteam": pa.array(np.array(TEAMS)[posteam]),
+        "defteam": pa.array(np.array(TEAMS)[defteam]),
+        "yardline_100": yardline_100,
+        "ydstogo": ydstogo.astype(float),
+        "down": down_values,
+        "play_type": pa.array(play_type, pa.string()),
+        "wp": rng.beta(2, 2, n),
+        "fourth_down_converted": converted.astype(float),
+        "fourth_down_failed": failed.astype(float),
+        "epa": epa,
+        "qtr": qtr.astype(float),
+        "game_seconds_remaining": game_seconds_remaining.astype(float),
+        "passer_player_id": passer_id,
+        "passer_player_name": passer_name,
+        "rusher_player_id": rusher_id,
+        "rusher_player_name": rusher_name,
+        "qb_scramble": scramble.astype(float),
+        "desc": desc,
+    })
+
+
+def write_season(path, season, rows, seed=0, extra_columns=0, row_group_size=50_000):
+    """Write one season of `rows` plays in chunks, adding `extra_columns` float filler columns"""
+    rng = np.random.default_rng([seed, season])
+    writer = None
+    written = 0
+    try:
+        while written < rows:
+            n = min(CHUNK_ROWS, rows - written)
+            table = generate_chunk(rng, season, n, written + 1)
+            for i in range(extra_columns):
+                table = table.append_column(f"extra_{i}", pa.array(rng.random(n)))
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table, row_group_size=row_group_size)
+            written += n
+    finally:
+        if writer is not None:
+            writer.close()
+    return written
+
+
+def generate(out_dir, years, scale=1.0, seed=0, extra_columns=20):
+    """Write one file per season into out_dir and return the total number of plays"""
+    os.makedirs(out_dir, exist_ok=True)
+    rows = int(PLAYS_PER_SEASON * scale)
+    total = 0
+    for year in years:
+        path = os.path.join(out_dir, f"play_by_play_{year}.parquet")
+        total += write_season(path, year, rows, seed, extra_columns)
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic nflfastR-shaped play-by-play files")
+    parser.add_argument("--out", default="bench_data/x1", help="output directory (default: bench_data/x1)")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="multiple of the real data volume, ~48k plays per season at 1 (default: 1)")
+    parser.add_argument("--first-year", type=int, default=1999)
+    parser.add_argument("--last-year", type=int, default=2024)
+    parser.add_argument("--extra-columns", type=int, default=20,
+                        help="filler columns to mimic the width of the real files (default: 20)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    years = range(args.first_year, args.last_year + 1)
+    total = generate(args.out, years, args.scale, args.seed, args.extra_columns)
+    print(f"Wrote {total} plays for {len(years)} seasons to {args.out} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Load-test query_service.py on localhost with concurrent keep-alive clients.
+
+Starts the service in-process on a free port, runs --clients concurrent
+connections that each send --requests random /query requests, checks every
+answer against a direct QueryService.query call and prints the latency seen
+by the clients next to the service's own /metrics:
+
+    python benchmarks/query_load.py --data-dir bench_data/x1-1999-2024 --clients 32
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+
+from query_service import NUMERIC_DIMENSIONS, load_service
+
+
+def random_query(service, rng):
+    """A random filter + group-by over the service's dimensions"""
+    params = {}
+    for dim in rng.sample(service.dimensions, rng.randint(1, 3)):
+        values = [value for value in service.values[dim] if value is not None]
+        if dim in NUMERIC_DIMENSIONS and rng.random() < 0.5:
+            params[dim] = f"{rng.choice(values)}-"
+        else:
+            params[dim] = ",".join(str(value) for value in rng.sample(values, min(len(values), rng.randint(1, 3))))
+    params["group_by"] = ",".join(rng.sample(service.dimensions, rng.randint(0, 2)))
+    return "/query?" + urlencode(params)
+
+
+async def _request(reader, writer, target):
+    writer.write(f"GET {target} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode("latin-1"))
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return status, json.loads(await reader.readexactly(int(headers["content-length"])))
+
+
+async def client(port, targets, latencies):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    answers = []
+    for target in targets:
+        start = time.perf_counter()
+        answers.append(await _request(reader, writer, target))
+        latencies.append(time.perf_counter() - start)
+    writer.close()
+    await writer.wait_closed()
+    return answers
+
+
+async def run(service, clients, requests, seed):
+    server = await asyncio.start_server(service.serve_connection, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    rng = random.Random(seed)
+    targets = [[random_query(service, rng) for _ in range(requests)] for _ in range(clients)]
+
+    latencies = []
+    start = time.perf_counter()
+    answers = await asyncio.gather(*(client(port, t, latencies) for t in targets))
+    elapsed = time.perf_counter() - start
+
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    _, metrics = await _request(reader, writer, "/metrics")
+    writer.close()
+    await writer.wait_closed()
+    # let the server's handlers see the clients go before shutting down
+    await asyncio.sleep(0.05)
+    server.close()
+    await server.wait_closed()
+    return targets, answers, latencies, elapsed, metrics
+
+
+def main(argv=None):
+    from fourth_down_scripts import years
+
+    parser = argparse.ArgumentParser(description="Concurrent-client load test of the query service")
+    parser.add_argument("--data-dir", default="pbp_data")
+    parser.add_argument("--cache-dir", default="cache")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=50, help="requests per client (default: 50)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    service = load_service(years, args.data_dir, args.cache_dir)
+    targets, answers, latencies, elapsed, metrics = asyncio.run(
+        run(service, args.clients, args.requests, args.seed))
+
+    # every HTTP answer must match the in-process one
+    mismatches = sum(
+        body != json.loads(json.dumps(service.query(parse_qsl(urlsplit(target).query, keep_blank_values=True))))
+        or status != 200
+        for client_targets, client_answers in zip(targets, answers)
+        for target, (status, body) in zip(client_targets, client_answers))
+
+    ms = np.array(latencies) * 1000
+    print(f"{len(latencies)} requests from {args.clients} clients in {elapsed:.2f}s "
+          f"({len(latencies) / elapsed:.0f} req/s), {mismatches} mismatched answers")
+    print(f"client latency: p50 {np.percentile(ms, 50):.2f} ms, p95 {np.percentile(ms, 95):.2f} ms, "
+          f"p99 {np.percentile(ms, 99):.2f} ms, max {ms.max():.2f} ms")
+    print(f"service /query: {json.dumps(metrics['endpoints'].get('/query'))}")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
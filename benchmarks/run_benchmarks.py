@@ -0,0 +1,212 @@
+"""Time and memory-profile the stages of fourth_down_scripts.py on synthetic data.
+
+For every --scales value the synthetic play-by-play files are generated once
+into bench_data/x{scale}-{first year}-{last year} (see generate_pbp.py) and the pipeline is run stage
+by stage:
+
+    load        decode the 4th downs (with the QB sneak classification at ingest)
+    categorize  compact dtypes, time/field position buckets and indicators
+    store       the prepared frame memory-mapped back from the Arrow store,
+                for comparison with load + categorize
+    aggregate   aggregate cube plus every analysis table
+    render      build every figure and write the HTML charts
+    stream      the --stream cube build, for comparison with load..aggregate
+    polars      the --backend polars build of the prepared frame and the cube,
+                for comparison with load + categorize (+ the cube); only when
+                polars is installed
+
+Each stage reports wall and CPU seconds (best of --repeat), the peak RSS above
+the stage's starting RSS, and the rows it produced, measured with the same
+instrumentation.stage the pipeline records its run report with; the
+pipeline's own finer stages of the best run are kept under "substages".
+Results go to a JSON file that benchmarks/compare.py diffs across commits:
+
+    python benchmarks/run_benchmarks.py --scales 1 5 --out benchmarks/results/new.json
+"""
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from functools import partial
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pandas as pd
+import pyarrow as pa
+
+import fourth_down_scripts
+import instrumentation
+from bucketing import add_situation_categories
+from cube import build_cube
+from generate_pbp import PLAYS_PER_SEASON, generate
+from pbp_loader import available_columns, load_fourths
+from rates import add_indicators
+from render import render_charts
+from schema import apply_schema
+from store import load_store, write_store
+from sneaks import classify_qb_sneaks, qb_player_ids
+from streaming import stream_cube
+
+
+def measure(func, repeat=1):
+    """Run func() `repeat` times; return its last result and the stage stats"""
+    runs = []
+    for _ in range(repeat):
+        instrumentation.reset()
+        with instrumentation.stage("bench") as run, contextlib.redirect_stdout(io.StringIO()):
+            result = func()
+        runs.append((run, instrumentation.records()[:-1]))
+    walls = [run["wall_seconds"] for run, _ in runs]
+    best, substages = runs[walls.index(min(walls))]
+    stats = {
+        "wall_seconds": best["wall_seconds"],
+        "wall_seconds_median": round(statistics.median(walls), 4),
+        "cpu_seconds": best["cpu_seconds"],
+        "peak_rss_delta_mb": max(run["peak_memory_delta_mb"] for run, _ in runs),
+        "substages": substages,
+    }
+    return result, stats
+
+
+def _rows(result):
+    if isinstance(result, (pd.DataFrame, pa.Table)):
+        return len(result)
+    return None
+
+
+def bench_scale(data_dir, years, repeat=1, render_workers=1, max_rows=100_000):
+    """Run every stage on one data directory and return {stage: stats}"""
+    # the store and the files the analyses save (decision table, model) go to a scratch cache
+    with tempfile.TemporaryDirectory() as cache_dir:
+        return _bench_stages(data_dir, years, cache_dir, repeat, render_workers, max_rows)
+
+
+def _bench_stages(data_dir, years, cache_dir, repeat, render_workers, max_rows):
+    names = list(fourth_down_scripts.ANALYSES)
+    pbp_columns = available_columns(years, data_dir)
+    load_cols = [col for col in fourth_down_scripts.required_columns(names) if col in pbp_columns]
+    stages = {}
+
+    def load():
+        prepare = partial(classify_qb_sneaks, qb_ids=qb_player_ids(years, data_dir))
+        return load_fourths(years, load_cols, data_dir, prepare=prepare)
+    raw, stages["load"] = measure(load, repeat)
+
+    def categorize():
+        return add_indicators(add_situation_categories(apply_schema(raw)))
+    fourths, stages["categorize"] = measure(categorize, repeat)
+
+    write_store(fourths, cache_dir, columns=load_cols)
+    stored, stages["store"] = measure(partial(load_store, cache_dir, columns=load_cols), repeat)
+
+    def run_analyses(cube, charts):
+        data = {
+            "fourths": fourths, "cube": cube, "pbp_columns": pbp_columns, "charts": charts, "figures": {},
+            "cache_dir": cache_dir,
+            "go_cube": cube[cube["decision"] == "go"].rename(columns={"play_type": "play_strategy"}),
+        }
+        for name in names:
+            fourth_down_scripts.ANALYSES[name]["func"](data)
+        return data
+
+    def aggregate():
+        cube = build_cube(fourths)
+        run_analyses(cube, charts=False)
+        return cube
+    cube, stages["aggregate"] = measure(aggregate, repeat)
+
+    with tempfile.TemporaryDirectory() as charts_dir:
+        def render():
+            figures = run_analyses(cube, charts=True)["figures"]
+            render_charts(figures, charts_dir, render_workers)
+            return figures
+        figures, stages["render"] = measure(render, repeat)
+
+    def stream():
+        prepare = partial(classify_qb_sneaks, qb_ids=qb_player_ids(years, data_dir))
+        return stream_cube(years, load_cols, data_dir, max_rows, prepare=prepare)
+    _, stages["stream"] = measure(stream, repeat)
+
+    if importlib.util.find_spec("polars"):
+        import polars_backend
+        (lazy_fourths, _), stages["polars"] = measure(
+            partial(polars_backend.load_prepared, years, load_cols, data_dir), repeat)
+        stages["polars"]["rows"] = len(lazy_fourths)
+
+    for stage, result in [("load", raw), ("categorize", fourths), ("store", stored), ("aggregate", cube)]:
+        stages[stage]["rows"] = _rows(result)
+    stages["render"]["rows"] = len(figures)
+    stages["stream"]["rows"] = stages["aggregate"]["rows"]
+    return stages
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the 4th down analysis stages on synthetic data")
+    parser.add_argument("--scales", type=float, nargs="+", default=[1],
+                        help="data volumes to run, as multiples of the real data (default: 1)")
+    parser.add_argument("--first-year", type=int, default=1999)
+    parser.add_argument("--last-year", type=int, default=2024)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage, the best is reported (default: 3)")
+    parser.add_argument("--render-workers", type=int, default=1,
+                        help="processes writing the HTML charts (default: 1)")
+    parser.add_argument("--max-rows", type=int, default=100_000, help="batch size of the stream stage")
+    parser.add_argument("--data-root", default="bench_data",
+                        help="where the synthetic data is generated and reused (default: bench_data)")
+    parser.add_argument("--out", help="results file (default: benchmarks/results/<commit>.json)")
+    args = parser.parse_args(argv)
+
+    years = list(range(args.first_year, args.last_year + 1))
+    commit = _git_commit()
+    report = {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "pyarrow": pa.__version__,
+        "machine": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "seasons": len(years),
+        "repeat": args.repeat,
+        "runs": [],
+    }
+    for scale in args.scales:
+        data_dir = os.path.join(args.data_root, f"x{scale:g}-{years[0]}-{years[-1]}")
+        if not os.path.isdir(data_dir):
+            print(f"Generating {scale:g}x data in {data_dir} ...")
+            generate(data_dir, years, scale)
+        stages = bench_scale(data_dir, years, args.repeat, args.render_workers, args.max_rows)
+        report["runs"].append({"scale": scale, "plays": int(PLAYS_PER_SEASON * scale) * len(years),
+                               "stages": stages})
+
+        print(f"\n=== {scale:g}x ({report['runs'][-1]['plays']} plays) ===")
+        print(f"{'stage':<12}{'wall s':>10}{'cpu s':>10}{'peak MB':>10}{'rows':>12}")
+        for stage, stats in stages.items():
+            print(f"{stage:<12}{stats['wall_seconds']:>10.3f}{stats['cpu_seconds']:>10.3f}"
+                  f"{stats['peak_rss_delta_mb']:>10.1f}{stats['rows'] if stats['rows'] is not None else '-':>12}")
+
+    out = args.out or os.path.join("benchmarks", "results", f"{commit or 'local'}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Memory of concurrent worker processes reading the memory-mapped 4th down store.
+
+Every worker reads the whole store, either as Arrow (store.open_store,
+touching every column buffer) or as pandas (store.load_store, what the
+analyses and query_service.py use), and reports how much its RSS and PSS
+(proportional set size, shared pages split between the processes mapping
+them) grew, read from /proc/self/smaps_rollup (Linux only). The workers hold
+the store at the same time, so the summed PSS is the real memory cost of N
+readers. It stays flat for Arrow readers; pandas readers share only the
+numeric columns without missing values and grow by a private copy of the
+others each, so both are measured:
+
+    python fourth_down_scripts.py        # writes cache/fourths.arrow
+    python benchmarks/store_sharing.py --workers 1 2 4 8
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+
+from store import load_store, open_store, store_path
+
+_barrier = None
+
+
+def _memory_mb():
+    """(Rss, Pss) of this process in MB"""
+    values = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            name, _, rest = line.partition(":")
+            if name in ("Rss", "Pss"):
+                values[name] = int(rest.split()[0]) / 1024
+    return values["Rss"], values["Pss"]
+
+
+def _init(barrier):
+    global _barrier
+    _barrier = barrier
+
+
+def _worker(cache_dir, pandas):
+    rss_before, pss_before = _memory_mb()
+    if pandas:
+        frame = load_store(cache_dir)
+        checksum = sum(len(frame[col]) for col in frame.columns)
+    else:
+        table = open_store(cache_dir)
+        checksum = sum(int(np.frombuffer(buf, dtype=np.uint8).sum())
+                       for column in table.columns for chunk in column.chunks
+                       for buf in chunk.buffers() if buf is not None)
+    # measure while every worker has the store open, then keep it open until all have measured
+    _barrier.wait()
+    rss, pss = _memory_mb()
+    _barrier.wait()
+    return rss - rss_before, pss - pss_before, checksum
+
+
+def run(cache_dir, workers, pandas=False):
+    barrier = multiprocessing.get_context("fork").Barrier(workers)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork"),
+                             initializer=_init, initargs=(barrier,)) as pool:
+        results = list(pool.map(_worker, [cache_dir] * workers, [pandas] * workers))
+    rss, pss, _ = zip(*results)
+    return sum(rss), sum(pss)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Memory of N processes sharing the memory-mapped 4th down store")
+    parser.add_argument("--cache-dir", default="cache")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--readers", nargs="+", choices=["arrow", "pandas"], default=["arrow", "pandas"],
+                        help="how the workers read the store (default: both)")
+    args = parser.parse_args(argv)
+
+    path = store_path(args.cache_dir)
+    if not os.path.exists(path):
+        sys.exit(f"{path} not found, run `python fourth_down_scripts.py` first")
+    print(f"Store: {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
+    print(f"{'reader':>8}{'workers':>8}{'summed RSS MB':>16}{'summed PSS MB':>16}")
+    for reader in args.readers:
+        for workers in args.workers:
+            rss, pss = run(args.cache_dir, workers, reader == "pandas")
+            print(f"{reader:>8}{workers:>8}{rss:>16.1f}{pss:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
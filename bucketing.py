@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+# Game time buckets, in game order, with the game_seconds_remaining upper edge of each
+TIME_ORDER = ["1st Half", "3rd Quarter", "Early 4th Quarter", "Late 4th Quarter", "Final 5 Minutes"]
+# seconds_remaining <= 300 -> Final 5 Minutes, <= 900 -> Late 4th Quarter, ...
+TIME_EDGES = [300, 900, 1800, 2700]
+
+# Field position buckets from the offense's own goal line to the opponent's
+FIELD_ORDER = ["Own 1-10", "Own 11-20", "Own 21-30", "Own 31-40", "Own 41-50",
+               "Opp 40-49", "Opp 30-39", "Opp 20-29", "Opp 10-19", "Opp 1-9"]
+# yardline_100 <= 10 -> Own 1-10, <= 20 -> Own 11-20, ...
+FIELD_EDGES = [10, 20, 30, 40, 50, 60, 70, 80, 90]
+
+
+def _as_float(values):
+    # nullable Int columns turn pd.NA into NaN here
+    return pd.Series(values).to_numpy(dtype="float64", na_value=np.nan)
+
+
+def time_category(seconds_remaining):
+    """Ordered time-in-game Categorical from game_seconds_remaining.
+
+    Missing clock values fall in "Final 5 Minutes", same as the old
+    row-by-row categorize_time did.
+    """
+    values = _as_float(seconds_remaining)
+    # searchsorted gives 0 for the final 5 minutes up to 4 for the 1st half
+    codes = np.searchsorted(TIME_EDGES, values, side="left")
+    codes[np.isnan(values)] = 0
+    codes = len(TIME_EDGES) - codes
+    return pd.Categorical.from_codes(codes, categories=TIME_ORDER, ordered=True)
+
+
+def field_position(yardline_100):
+    """Ordered field position Categorical from yardline_100.
+
+    Missing yardlines fall in "Opp 1-9", same as the old row-by-row
+    categorize_field_position did.
+    """
+    values = _as_float(yardline_100)
+    # NaN sorts past the last edge, i.e. into "Opp 1-9"
+    codes = np.searchsorted(FIELD_EDGES, values, side="left")
+    return pd.Categorical.from_codes(codes, categories=FIELD_ORDER, ordered=True)
+
+
+def add_situation_categories(fourths):
+    """Add the time_category and field_position columns in one vectorized pass"""
+    fourths["time_category"] = time_category(fourths["game_seconds_remaining"])
+    fourths["field_position"] = field_position(fourths["yardline_100"])
+    return fourths
@@ -0,0 +1,91 @@
+import contextlib
+import hashlib
+import inspect
+import io
+import json
+import os
+import sys
+
+import pandas as pd
+
+# Dependency graph of the last run: analysis -> input key and the charts it
+# made, chart path -> figure hash
+GRAPH_FILE = "build_graph.json"
+# Pickled result tables and printed output of each analysis
+RESULTS_DIR = "analyses"
+
+
+def _sha256(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def frame_fingerprint(df):
+    """Content hash of a DataFrame's column names and values (the index is ignored)"""
+    sha = hashlib.sha256()
+    sha.update(json.dumps([str(col) for col in df.columns]).encode("utf-8"))
+    sha.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return sha.hexdigest()
+
+
+def code_hash(*objects):
+    """Hash of the source code of the given functions or modules"""
+    return _sha256("\n".join(inspect.getsource(obj) for obj in objects))
+
+
+def figure_hash(fig):
+    """Hash of a plotly figure's JSON, i.e. of everything written to its HTML file"""
+    return _sha256(fig.to_json())
+
+
+def node_key(**inputs):
+    """Single key for a node from its named inputs (fingerprints, parameters, code hashes)"""
+    return _sha256(json.dumps(inputs, sort_keys=True, default=str))
+
+
+def load_graph(cache_dir="cache"):
+    """Read the graph saved by the last run, or an empty one"""
+    path = os.path.join(cache_dir, GRAPH_FILE)
+    if not os.path.exists(path):
+        return {"analyses": {}, "charts": {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_graph(graph, cache_dir="cache"):
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(os.path.join(cache_dir, GRAPH_FILE), "w") as f:
+        json.dump(graph, f, indent=2, sort_keys=True)
+
+
+def results_path(cache_dir, name):
+    return os.path.join(cache_dir, RESULTS_DIR, f"{name}.pkl")
+
+
+def save_results(cache_dir, name, tables, output):
+    """Store an analysis' result tables together with what it printed"""
+    path = results_path(cache_dir, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    pd.to_pickle((tables, output), path)
+
+
+def load_results(cache_dir, name):
+    """(tables, printed output) stored by save_results"""
+    return pd.read_pickle(results_path(cache_dir, name))
+
+
+class _Tee(io.StringIO):
+    def __init__(self, stream):
+        super().__init__()
+        self.stream = stream
+
+    def write(self, text):
+        self.stream.write(text)
+        return super().write(text)
+
+
+@contextlib.contextmanager
+def capture_output():
+    """Record everything printed inside the block while still printing it"""
+    tee = _Tee(sys.stdout)
+    with contextlib.redirect_stdout(tee):
+        yield tee
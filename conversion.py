@@ -0,0 +1,197 @@
+"""Smoothed 4th down conversion probabilities from a ridge-regularized logistic model.
+
+The model is fitted on the go-for-it attempts grouped into binomial cells
+(one row per yardline_100, ydstogo, play type, time bucket and season with
+its attempts and conversions) by Newton/IRLS steps in NumPy. Its logit is a
+sum of per-axis terms:
+
+    yardline   piecewise-linear in yardline_100 (knots at YARD_KNOTS)
+    distance   piecewise-linear in ydstogo (knots at DISTANCE_KNOTS), capped at MAX_DISTANCE
+    pass       pass vs run, with its own piecewise-linear distance slope
+    time       one coefficient per time bucket
+    season     one coefficient per season
+
+so predict_grid scores every (play type, yardline, distance, time bucket,
+season) combination by broadcasting five small per-axis arrays, without
+building the grid's design matrix.
+"""
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+from bucketing import TIME_ORDER
+
+YARD_KNOTS = [5, 10, 20, 40, 60, 80]
+DISTANCE_KNOTS = [1, 2, 4, 7, 10, 15]
+MAX_DISTANCE = 30
+# L2 penalty on every coefficient but the intercept
+RIDGE = 2.0
+MAX_ITERATIONS = 50
+TOLERANCE = 1e-8
+PLAY_TYPES = ["run", "pass"]
+MODEL_FILE = "conversion_model.npz"
+
+
+def _hinges(x, knots, scale):
+    """x and max(x - knot, 0) for each knot, divided by scale, as columns"""
+    x = np.asarray(x, dtype="float64")[:, None]
+    return np.hstack([x, np.maximum(x - np.asarray(knots, dtype="float64"), 0)]) / scale
+
+
+def _one_hot(codes, n):
+    """Indicator columns of codes 1..n-1 (code 0 is the baseline)"""
+    return np.eye(n)[np.asarray(codes, dtype=np.int64)][:, 1:]
+
+
+def _blocks(n_seasons):
+    """Name and width of each block of coefficients, after the intercept"""
+    distance = len(DISTANCE_KNOTS) + 1
+    return [("yardline", len(YARD_KNOTS) + 1), ("distance", distance), ("pass", 1),
+            ("pass_distance", distance), ("time", len(TIME_ORDER) - 1), ("season", n_seasons - 1)]
+
+
+def _design(yardline, distance, is_pass, time_code, season_code, n_seasons):
+    distance = np.minimum(distance, MAX_DISTANCE)
+    distance_terms = _hinges(distance, DISTANCE_KNOTS, 10)
+    is_pass = np.asarray(is_pass, dtype="float64")[:, None]
+    return np.hstack([
+        np.ones((len(distance), 1)),
+        _hinges(yardline, YARD_KNOTS, 100),
+        distance_terms,
+        is_pass,
+        is_pass * distance_terms,
+        _one_hot(time_code, len(TIME_ORDER)),
+        _one_hot(season_code, n_seasons),
+    ])
+
+
+def conversion_cells(fourths):
+    """Go-for-it attempts with a recorded result as binomial cells (attempts, conversions)"""
+    go = fourths[fourths["play_type"].isin(PLAY_TYPES) & fourths["fourth_down_converted"].notna()
+                 & fourths["yardline_100"].notna() & fourths["ydstogo"].notna()]
+    go = go.assign(play_type=go["play_type"].astype(str),
+                   fourth_down_converted=go["fourth_down_converted"].astype("int64"))
+    cells = go.groupby(["season", "time_category", "yardline_100", "ydstogo", "play_type"], observed=True)
+    cells = cells["fourth_down_converted"].agg(attempts="count", conversions="sum").reset_index()
+    return cells[cells["attempts"] > 0]
+
+
+def cells_key(cells):
+    """Content hash of the training cells and the model's hyperparameters, stored with the model.
+
+    A saved model is only reused when both match: other knots change the
+    coefficient blocks, another penalty or cap changes the fit.
+    """
+    params = repr((RIDGE, YARD_KNOTS, DISTANCE_KNOTS, MAX_DISTANCE, MAX_ITERATIONS, TOLERANCE)).encode()
+    cells_hash = pd.util.hash_pandas_object(cells, index=False).to_numpy().tobytes()
+    return hashlib.sha256(params + cells_hash).hexdigest()
+
+
+def fit_conversion_model(cells, ridge=None):
+    """Fit the model to binomial cells from conversion_cells.
+
+    Each Newton step solves (X'WX + ridge*I) delta = X'(y - n*p) - ridge*beta
+    over the cells, so the cost grows with the number of distinct
+    situations, not with the number of plays. Returns the model as a dict
+    of arrays (see save_conversion_model). ridge defaults to RIDGE.
+    """
+    ridge = RIDGE if ridge is None else ridge
+    seasons = np.sort(cells["season"].unique())
+    season_code = np.searchsorted(seasons, cells["season"].to_numpy())
+    time_code = pd.Categorical(cells["time_category"], categories=TIME_ORDER).codes
+    X = _design(cells["yardline_100"].to_numpy(dtype="float64"), cells["ydstogo"].to_numpy(dtype="float64"),
+                cells["play_type"].to_numpy() == "pass", time_code, season_code, len(seasons))
+    n = cells["attempts"].to_numpy(dtype="float64")
+    y = cells["conversions"].to_numpy(dtype="float64")
+
+    penalty = np.full(X.shape[1], ridge)
+    penalty[0] = 0
+    beta = np.zeros(X.shape[1])
+    beta[0] = np.log(y.sum() / (n.sum() - y.sum()))
+    for iteration in range(1, MAX_ITERATIONS + 1):
+        p = 1 / (1 + np.exp(-(X @ beta)))
+        gradient = X.T @ (y - n * p) - penalty * beta
+        hessian = (X * (n * p * (1 - p))[:, None]).T @ X + np.diag(penalty)
+        step = np.linalg.solve(hessian, gradient)
+        beta += step
+        if np.abs(step).max() < TOLERANCE:
+            break
+    return {"coef": beta, "seasons": seasons, "iterations": np.array(iteration), "ridge": np.array(ridge)}
+
+
+def _split(model):
+    coef = model["coef"]
+    parts, start = {"intercept": coef[0]}, 1
+    for name, width in _blocks(len(model["seasons"])):
+        parts[name] = coef[start:start + width]
+        start += width
+    return parts
+
+
+def predict(model, yardline_100, ydstogo, play_type, time_category, season):
+    """Conversion probability of individual situations (array-likes of equal length)"""
+    seasons = model["seasons"]
+    season = np.asarray(season)
+    if not np.isin(season, seasons).all():
+        raise ValueError(f"the model covers seasons {seasons[0]}-{seasons[-1]} only")
+    time_code = pd.Categorical(np.asarray(time_category), categories=TIME_ORDER).codes
+    X = _design(np.asarray(yardline_100, dtype="float64"), np.asarray(ydstogo, dtype="float64"),
+                np.asarray(play_type) == "pass", time_code, np.searchsorted(seasons, season), len(seasons))
+    return 1 / (1 + np.exp(-(X @ model["coef"])))
+
+
+def predict_grid(model, yardlines=range(1, 100), distances=range(1, MAX_DISTANCE + 1)):
+    """Conversion probability of every (play type, yardline, distance, time bucket, season).
+
+    Returns an array of shape (len(PLAY_TYPES), yardlines, distances,
+    len(TIME_ORDER), seasons). The per-axis terms are computed once per axis
+    value and summed by broadcasting.
+    """
+    parts = _split(model)
+    yardlines = np.asarray(yardlines, dtype="float64")
+    distances = np.minimum(np.asarray(distances, dtype="float64"), MAX_DISTANCE)
+    distance_terms = _hinges(distances, DISTANCE_KNOTS, 10)
+
+    yard = _hinges(yardlines, YARD_KNOTS, 100) @ parts["yardline"]
+    distance = np.stack([distance_terms @ parts["distance"],
+                         distance_terms @ parts["distance"] + parts["pass"] + distance_terms @ parts["pass_distance"]])
+    time = np.concatenate([[0], parts["time"]])
+    season = np.concatenate([[0], parts["season"]])
+
+    logit = (parts["intercept"]
+             + yard[None, :, None, None, None]
+             + distance[:, None, :, None, None]
+             + time[None, None, None, :, None]
+             + season[None, None, None, None, :])
+    return 1 / (1 + np.exp(-logit))
+
+
+def save_conversion_model(model, cache_dir="cache", key=None):
+    """Write the model (and the key of the cells it was fitted on) to cache_dir"""
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, MODEL_FILE)
+    np.savez(path, key=np.array(key or ""), **model)
+    return path
+
+
+def load_conversion_model(cache_dir="cache", key=None):
+    """The saved model, or None when there is none or it was fitted on other cells than `key`"""
+    path = os.path.join(cache_dir, MODEL_FILE)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as saved:
+        if key is not None and str(saved["key"]) != key:
+            return None
+        return {name: saved[name] for name in saved.files if name != "key"}
+
+
+def load_or_fit_conversion_model(cells, cache_dir="cache"):
+    """The model saved for these cells and hyperparameters, fitted and saved when there is none"""
+    key = cells_key(cells)
+    model = load_conversion_model(cache_dir, key)
+    if model is None:
+        model = fit_conversion_model(cells)
+        save_conversion_model(model, cache_dir, key)
+    return model
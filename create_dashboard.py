@@ -1,13 +1,14 @@
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import os
 from datetime import datetime
 
+from summary import load_summary
+
 def create_executive_dashboard():
     """Create a professional executive dashboard for recruiters/hiring managers"""
     
+    # headline numbers come from the summary written by the last analysis run
+    s = load_summary()
+    years = f"{s['first_season']}-{s['last_season']}"
+
     # Create a comprehensive dashboard HTML file
     dashboard_html = """
     <!DOCTYPE html>
@@ -33,43 +34,59 @@ def create_executive_dashboard():
     <body>
         <div class="header">
             <h1>NFL 4th Down Decision Analysis</h1>
-            <p>Comprehensive Analysis of 4th Down Strategy Evolution (1999-2024)</p>
+            <p>Comprehensive Analysis of 4th Down Strategy Evolution (""" + years + """)</p>
             <p><strong>Data Analyst Portfolio Project</strong> | Generated: """ + datetime.now().strftime("%B %d, %Y") + """</p>
         </div>
 
         <div class="section">
             <h2>Executive Summary</h2>
             <div class="metric">
-                <div class="metric-value">108,866</div>
+                <div class="metric-value">""" + f"{s['total_fourths']:,}" + """</div>
                 <div class="metric-label">Total 4th Down Situations Analyzed</div>
             </div>
             <div class="metric">
-                <div class="metric-value">25+</div>
-                <div class="metric-label">Years of Data (1999-2024)</div>
+                <div class="metric-value">""" + str(s["seasons"]) + """</div>
+                <div class="metric-label">Years of Data (""" + years + """)</div>
             </div>
             <div class="metric">
-                <div class="metric-value">19</div>
+                <div class="metric-value">""" + str(s["charts"]) + """</div>
                 <div class="metric-label">Interactive Visualizations</div>
             </div>
             <div class="metric">
-                <div class="metric-value">6</div>
+                <div class="metric-value">""" + str(s["analyses"]) + """</div>
                 <div class="metric-label">Analysis Dimensions</div>
             </div>
+            <div class="metric">
+                <div class="metric-value">""" + f"{s['go_rate']}%" + """</div>
+                <div class="metric-label">Go-for-it Rate</div>
+            </div>
+            <div class="metric">
+                <div class="metric-value">""" + f"{s['success_rate']}%" + """</div>
+                <div class="metric-label">Conversion Rate When Going for It</div>
+            </div>
+            <div class="metric">
+                <div class="metric-value">""" + f"{s['one_yard_success_rate']}%" + """</div>
+                <div class="metric-label">4th &amp; 1 Success Rate</div>
+            </div>
+            <div class="metric">
+                <div class="metric-value">""" + f"{s['qb_sneak_rate']}%" + """</div>
+                <div class="metric-label">Go-for-it Attempts That Are QB Sneaks</div>
+            </div>
         </div>
 
         <div class="section">
             <h2>Key Business Insights</h2>
             <div class="insight">
                 <h3>Analytics Revolution Impact</h3>
-                <p>Teams have become significantly more aggressive on 4th downs since 2015, reflecting the influence of advanced analytics on NFL decision-making.</p>
+                <p>Teams have become significantly more aggressive on 4th downs since """ + str(s["analytics_era"]) + """, reflecting the influence of advanced analytics on NFL decision-making: the go-for-it rate went from """ + f"{s['go_rate_before_analytics_era']}%" + """ before to """ + f"{s['go_rate_analytics_era']}%" + """ since.</p>
             </div>
             <div class="insight">
                 <h3>Field Position Optimization</h3>
-                <p>Success rates vary dramatically by field position and distance, revealing clear optimization opportunities for teams.</p>
+                <p>Success rates vary dramatically by field position and distance, revealing clear optimization opportunities for teams. 4th &amp; 1 converts """ + f"{s['one_yard_success_rate']}%" + """ of the time.</p>
             </div>
             <div class="insight">
                 <h3>Strategy Evolution</h3>
-                <p>Play-calling strategies have evolved over time, with teams adapting to rule changes and analytical insights.</p>
+                <p>Play-calling strategies have evolved over time, with teams adapting to rule changes and analytical insights. Runs convert """ + f"{s['run_success_rate']}%" + """ of the time vs """ + f"{s['pass_success_rate']}%" + """ for passes, and QB sneaks succeed """ + f"{s['qb_sneak_success_rate']}%" + """ of the time.</p>
             </div>
         </div>
 
@@ -96,8 +113,8 @@ def create_executive_dashboard():
             <h2>Methodology & Technical Approach</h2>
             <div class="methodology">
                 <h3>Data Sources</h3>
-                <p>• NFL play-by-play data from 1999-2024</p>
-                <p>• 108,866+ 4th down situations analyzed</p>
+                <p>• NFL play-by-play data from """ + years + """</p>
+                <p>• """ + f"{s['total_fourths']:,}" + """ 4th down situations analyzed</p>
                 <p>• Comprehensive field position and game situation data</p>
             </div>
             <div class="methodology">
@@ -1,9 +1,13 @@
-import os
-from datetime import datetime
+from summary import load_summary
 
 def create_presentation_summary():
     """Create a concise presentation summary for recruiters"""
     
+    # headline numbers come from the summary written by the last analysis run
+    s = load_summary()
+    years = f"{s['first_season']}-{s['last_season']}"
+    seasons = str(s["seasons"])
+
     presentation_html = """
     <!DOCTYPE html>
     <html>
@@ -36,30 +40,46 @@ def create_presentation_summary():
             <div class="header">
                 <h1>NFL 4th Down Decision Analysis</h1>
                 <p style="font-size: 1.2em; margin: 10px 0;">Data Science Portfolio Project</p>
-                <p>Comprehensive Analysis of 4th Down Strategy Evolution (1999-2024)</p>
+                <p>Comprehensive Analysis of 4th Down Strategy Evolution (""" + years + """)</p>
             </div>
 
             <div class="slide">
                 <h2>Project Overview</h2>
-                <p style="font-size: 1.1em; line-height: 1.6;">This project analyzes NFL 4th down decision-making patterns across 25+ years, revealing how teams' strategies have evolved with the analytics revolution. It demonstrates advanced data analysis skills, statistical modeling, and business insight generation.</p>
+                <p style="font-size: 1.1em; line-height: 1.6;">This project analyzes NFL 4th down decision-making patterns across """ + seasons + """ years, revealing how teams' strategies have evolved with the analytics revolution. It demonstrates advanced data analysis skills, statistical modeling, and business insight generation.</p>
                 
                 <div class="metric-grid">
                     <div class="metric">
-                        <div class="metric-value">108,866</div>
+                        <div class="metric-value">""" + f"{s['total_fourths']:,}" + """</div>
                         <div class="metric-label">4th Down Situations</div>
                     </div>
                     <div class="metric">
-                        <div class="metric-value">25+</div>
+                        <div class="metric-value">""" + seasons + """</div>
                         <div class="metric-label">Years of Data</div>
                     </div>
                     <div class="metric">
-                        <div class="metric-value">19</div>
+                        <div class="metric-value">""" + str(s["charts"]) + """</div>
                         <div class="metric-label">Interactive Charts</div>
                     </div>
                     <div class="metric">
-                        <div class="metric-value">6</div>
+                        <div class="metric-value">""" + str(s["analyses"]) + """</div>
                         <div class="metric-label">Analysis Dimensions</div>
                     </div>
+                    <div class="metric">
+                        <div class="metric-value">""" + f"{s['go_rate']}%" + """</div>
+                        <div class="metric-label">Go-for-it Rate</div>
+                    </div>
+                    <div class="metric">
+                        <div class="metric-value">""" + f"{s['success_rate']}%" + """</div>
+                        <div class="metric-label">Conversion Rate</div>
+                    </div>
+                    <div class="metric">
+                        <div class="metric-value">""" + f"{s['one_yard_success_rate']}%" + """</div>
+                        <div class="metric-label">4th &amp; 1 Success Rate</div>
+                    </div>
+                    <div class="metric">
+                        <div class="metric-value">""" + f"{s['qb_sneak_rate']}%" + """</div>
+                        <div class="metric-label">QB Sneak Share of Attempts</div>
+                    </div>
                 </div>
             </div>
 
@@ -68,17 +88,17 @@ def create_presentation_summary():
                 
                 <div class="insight">
                     <h3>Analytics Revolution Impact</h3>
-                    <p>Teams have become significantly more aggressive on 4th downs since 2015, reflecting the influence of advanced analytics on NFL decision-making.</p>
+                    <p>Teams have become significantly more aggressive on 4th downs since """ + str(s["analytics_era"]) + """, reflecting the influence of advanced analytics on NFL decision-making: the go-for-it rate went from """ + f"{s['go_rate_before_analytics_era']}%" + """ before to """ + f"{s['go_rate_analytics_era']}%" + """ since.</p>
                 </div>
                 
                 <div class="insight">
                     <h3>Field Position Optimization</h3>
-                    <p>Success rates vary dramatically by field position and distance, revealing clear optimization opportunities for teams.</p>
+                    <p>Success rates vary dramatically by field position and distance, revealing clear optimization opportunities for teams. 4th &amp; 1 converts """ + f"{s['one_yard_success_rate']}%" + """ of the time.</p>
                 </div>
                 
                 <div class="insight">
                     <h3>Strategy Evolution</h3>
-                    <p>Play-calling strategies have evolved over time, with teams adapting to rule changes and analytical insights.</p>
+                    <p>Play-calling strategies have evolved over time, with teams adapting to rule changes and analytical insights. Runs convert """ + f"{s['run_success_rate']}%" + """ of the time vs """ + f"{s['pass_success_rate']}%" + """ for passes, and QB sneaks succeed """ + f"{s['qb_sneak_success_rate']}%" + """ of the time.</p>
                 </div>
             </div>
 
@@ -98,7 +118,7 @@ def create_presentation_summary():
                     <strong>Business Intelligence:</strong> Converting data into actionable insights
                 </div>
                 <div class="skill">
-                    <strong>Time Series Analysis:</strong> Identifying trends and patterns over 25+ years
+                    <strong>Time Series Analysis:</strong> Identifying trends and patterns over """ + seasons + """ years
                 </div>
                 <div class="skill">
                     <strong>Multi-dimensional Analysis:</strong> Field position, time, distance, and strategy analysis
@@ -113,7 +133,7 @@ def create_presentation_summary():
                     <li><strong>Success Rate Analysis:</strong> Conversion rates by distance and strategy</li>
                     <li><strong>Game Situation Context:</strong> Time-based and field position patterns</li>
                     <li><strong>Strategic Evolution:</strong> QB sneak usage and multi-dimensional analysis</li>
-                    <li><strong>Yearly Trends:</strong> How strategy has evolved over 25+ years</li>
+                    <li><strong>Yearly Trends:</strong> How strategy has evolved over """ + seasons + """ years</li>
                     <li><strong>Heatmap Analysis:</strong> Multi-dimensional relationship visualization</li>
                 </ul>
             </div>
@@ -0,0 +1,64 @@
+import os
+
+import pandas as pd
+
+# Every table and chart is a slice of the 4th downs along these axes
+CUBE_AXES = ["season", "qtr", "time_category", "field_position", "ydstogo",
+             "play_type", "decision", "is_red_zone", "is_qb_sneak"]
+CUBE_FILE = "fourths_cube.parquet"
+# Row-level flags (see sneaks.classify_qb_sneaks) summed into the cube when present
+FLAG_MEASURES = ["qb_rush", "desc_sneak"]
+# Play-by-play columns the cube axes and measures are derived from
+CUBE_COLUMNS = ["season", "qtr", "game_seconds_remaining", "yardline_100", "ydstogo",
+                "play_type", "fourth_down_converted", "rusher_player_id", "desc", "qb_scramble"]
+
+
+def build_cube(fourths):
+    """Aggregate the row-level 4th downs into one row per combination of CUBE_AXES.
+
+    Measures:
+        plays       number of 4th downs
+        go          go-for-it decisions
+        attempts    plays with a recorded conversion result
+        successful  conversions
+        qb_sneaks   plays flagged as QB sneaks
+    plus a count for each of the FLAG_MEASURES columns the frame has.
+    Missing keys (e.g. no play_type) are kept so the totals match the rows.
+    All measures are counts, so cubes of disjoint row sets add up with merge_cubes.
+    """
+    flags = {flag: (flag, "sum") for flag in FLAG_MEASURES if flag in fourths.columns}
+    cube = fourths.groupby(CUBE_AXES, observed=True, dropna=False).agg(
+        plays=("is_go", "size"),
+        go=("is_go", "sum"),
+        attempts=("fourth_down_converted", "count"),
+        successful=("fourth_down_converted", "sum"),
+        **flags,
+    ).reset_index()
+    # keep the counts wide so summing cells can't overflow the int8/bool inputs
+    measures = [col for col in cube.columns if col not in CUBE_AXES]
+    cube[measures] = cube[measures].astype("int64")
+    cube["qb_sneaks"] = cube["plays"].where(cube["is_qb_sneak"], 0)
+    return cube
+
+
+def merge_cubes(cubes):
+    """Add up cubes built from disjoint sets of rows into the cube of their union"""
+    merged = pd.concat(cubes, ignore_index=True)
+    measures = [col for col in merged.columns if col not in CUBE_AXES]
+    cube = merged.groupby(CUBE_AXES, observed=True, dropna=False)[measures].sum().reset_index()
+    # batches with different play types concat play_type back to strings
+    cube["play_type"] = cube["play_type"].astype("category")
+    return cube
+
+
+def save_cube(cube, cache_dir="cache"):
+    """Write the cube next to the 4th down cache and return its path"""
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, CUBE_FILE)
+    cube.to_parquet(path, index=False)
+    return path
+
+
+def load_cube(cache_dir="cache"):
+    """Read a cube written by save_cube"""
+    return pd.read_parquet(os.path.join(cache_dir, CUBE_FILE))
@@ -0,0 +1,187 @@
+"""Go / punt / field goal recommendations from the historical 4th downs.
+
+The value of a decision in a situation is the mean EPA (nflfastR's expected
+points added) of the 4th downs where teams made that decision in that
+situation. Situations are a dense grid of yardline_100 (1-99), ydstogo (1-15,
+longer distances in the last bin), the time buckets and win probability bins,
+so every lookup is plain array indexing:
+
+    # 4th and 2 at the opponent's 45 with 25 minutes left and a 50% win probability
+    python decisions.py 45 2 1500 0.5
+"""
+import argparse
+import bisect
+import os
+
+import numpy as np
+import pandas as pd
+
+from bucketing import TIME_EDGES, TIME_ORDER, time_category
+
+DECISIONS = ["go", "punt", "field_goal"]
+# play_type -> index into DECISIONS; anything else (penalties, kneels) is not graded
+PLAY_DECISION = {"run": 0, "pass": 0, "punt": 1, "field_goal": 2}
+MAX_YARDLINE = 99
+MAX_YDSTOGO = 15
+# win probability bins: < 0.2, 0.2-0.4, 0.4-0.6, 0.6-0.8, >= 0.8
+WP_EDGES = [0.2, 0.4, 0.6, 0.8]
+WP_ORDER = ["WP < 20%", "WP 20-40%", "WP 40-60%", "WP 60-80%", "WP 80%+"]
+# plays from yardlines this far either side pool into each yardline's estimate
+YARD_WINDOW = 5
+# weight, in plays, of the estimate pooled over all times and win probabilities
+PRIOR_PLAYS = 20
+# a decision gets an estimate only where its shrinkage prior has this many plays: within YARD_WINDOW
+# yards at this distance, over all times and win probabilities; the cell itself may have far fewer
+MIN_PLAYS = 10
+TABLE_FILE = "decision_table.npz"
+
+
+def situation_index(yardline_100, ydstogo, game_seconds_remaining, wp):
+    """Grid indices (yardline, distance, time, wp) of situations, as int arrays.
+
+    Rows with a missing yardline, distance or win probability get -1 in the
+    yardline index and are left out by the callers.
+    """
+    yardline = pd.Series(yardline_100).to_numpy(dtype="float64", na_value=np.nan)
+    distance = pd.Series(ydstogo).to_numpy(dtype="float64", na_value=np.nan)
+    wp = pd.Series(wp).to_numpy(dtype="float64", na_value=np.nan)
+    missing = np.isnan(yardline) | np.isnan(distance) | np.isnan(wp)
+
+    y = np.clip(np.nan_to_num(yardline, nan=1), 1, MAX_YARDLINE).astype(np.int64) - 1
+    d = np.clip(np.nan_to_num(distance, nan=1), 1, MAX_YDSTOGO).astype(np.int64) - 1
+    t = np.asarray(time_category(game_seconds_remaining).codes, dtype=np.int64)
+    w = np.searchsorted(WP_EDGES, np.nan_to_num(wp), side="right")
+    y[missing] = -1
+    return y, d, t, w
+
+
+def _window_sum(counts, axis, half):
+    """Sum of each index's +-half neighbours along one axis, through a cumulative sum"""
+    n = counts.shape[axis]
+    zero = np.zeros_like(np.take(counts, [0], axis=axis))
+    cumulative = np.concatenate([zero, np.cumsum(counts, axis=axis)], axis=axis)
+    idx = np.arange(n)
+    return (np.take(cumulative, np.minimum(idx + half + 1, n), axis=axis)
+            - np.take(cumulative, np.maximum(idx - half, 0), axis=axis))
+
+
+def build_decision_table(fourths):
+    """Expected EPA of going for it, punting and kicking in every grid situation.
+
+    Plays and EPA sums are accumulated per (decision, situation) with one
+    bincount each, pooled over neighbouring yardlines and shrunk towards the
+    estimate over all times and win probabilities, which covers the sparse
+    cells. The MIN_PLAYS gate is on that prior, not on the cell: a decision
+    (almost) never made at a yardline and distance, e.g. a field goal from
+    midfield, gets NaN at every time and win probability and is never
+    recommended, while a cell with a few plays of its own gets an estimate
+    close to its prior. Returns
+    {"ev": (3, yardline, distance, time, wp) float array, "plays": same
+    shape counts, "best": index of the best decision or -1}.
+    """
+    shape = (len(DECISIONS), MAX_YARDLINE, MAX_YDSTOGO, len(TIME_ORDER), len(WP_EDGES) + 1)
+    decision = fourths["play_type"].map(PLAY_DECISION).to_numpy(dtype="float64", na_value=np.nan)
+    epa = fourths["epa"].to_numpy(dtype="float64", na_value=np.nan)
+    y, d, t, w = situation_index(fourths["yardline_100"], fourths["ydstogo"],
+                                 fourths["game_seconds_remaining"], fourths["wp"])
+    keep = ~np.isnan(decision) & ~np.isnan(epa) & (y >= 0)
+
+    flat = np.ravel_multi_index((decision[keep].astype(np.int64), y[keep], d[keep], t[keep], w[keep]), shape)
+    size = int(np.prod(shape))
+    plays = np.bincount(flat, minlength=size).reshape(shape)
+    epa_sum = np.bincount(flat, weights=epa[keep], minlength=size).reshape(shape)
+
+    window_plays = _window_sum(plays, 1, YARD_WINDOW)
+    window_epa = _window_sum(epa_sum, 1, YARD_WINDOW)
+    prior_plays = window_plays.sum(axis=(3, 4), keepdims=True)
+    prior_epa = window_epa.sum(axis=(3, 4), keepdims=True)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        prior = prior_epa / prior_plays
+        ev = (window_epa + PRIOR_PLAYS * prior) / (window_plays + PRIOR_PLAYS)
+    ev = np.where(np.broadcast_to(prior_plays, shape) >= MIN_PLAYS, ev, np.nan)
+
+    best = np.argmax(np.nan_to_num(ev, nan=-np.inf), axis=0).astype(np.int8)
+    best[np.isnan(ev).all(axis=0)] = -1
+    return {"ev": ev, "plays": plays, "best": best}
+
+
+def recommend(table, yardline_100, ydstogo, game_seconds_remaining, wp):
+    """Best decision and the expected EPA of each decision for one situation.
+
+    The grid indices are computed with scalar arithmetic (the same bins as
+    situation_index), so a query is a handful of array reads.
+    """
+    y = min(max(int(yardline_100), 1), MAX_YARDLINE) - 1
+    d = min(max(int(ydstogo), 1), MAX_YDSTOGO) - 1
+    t = len(TIME_EDGES) - bisect.bisect_left(TIME_EDGES, game_seconds_remaining)
+    w = bisect.bisect_right(WP_EDGES, wp)
+    best = int(table["best"][y, d, t, w])
+    return (DECISIONS[best] if best >= 0 else None), dict(zip(DECISIONS, table["ev"][:, y, d, t, w].tolist()))
+
+
+def grade_decisions(table, fourths):
+    """Grade every historical 4th down against the table in one vectorized pass.
+
+    Returns a frame aligned with `fourths` with the decision made, the
+    recommended one, both expected EPAs and the regret (EPA given up by not
+    making the best decision, 0 when it was made). Plays that aren't a
+    go/punt/kick or whose situation or decision has no estimate get NaN.
+    """
+    decision = fourths["play_type"].map(PLAY_DECISION).to_numpy(dtype="float64", na_value=np.nan)
+    y, d, t, w = situation_index(fourths["yardline_100"], fourths["ydstogo"],
+                                 fourths["game_seconds_remaining"], fourths["wp"])
+    valid = ~np.isnan(decision) & (y >= 0)
+    made = np.where(valid, decision, 0).astype(np.int64)
+    y = np.where(valid, y, 0)
+
+    ev = table["ev"][:, y, d, t, w]
+    rows = np.arange(len(made))
+    made_ev = ev[made, rows]
+    best = table["best"][y, d, t, w].astype(np.int64)
+    best_ev = ev[np.maximum(best, 0), rows]
+    graded = valid & ~np.isnan(made_ev) & (best >= 0)
+
+    names = np.array(DECISIONS, dtype=object)
+    return pd.DataFrame({
+        "decision": np.where(graded, names[made], None),
+        "recommended": np.where(graded, names[np.maximum(best, 0)], None),
+        "decision_ev": np.where(graded, made_ev, np.nan),
+        "best_ev": np.where(graded, best_ev, np.nan),
+        "regret": np.where(graded, best_ev - made_ev, np.nan),
+    }, index=fourths.index)
+
+
+def save_decision_table(table, cache_dir="cache"):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, TABLE_FILE)
+    np.savez_compressed(path, **table)
+    return path
+
+
+def load_decision_table(path=os.path.join("cache", TABLE_FILE)):
+    """The table saved by the decisions analysis (run fourth_down_scripts.py first)"""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{path} not found, run `python fourth_down_scripts.py --only decisions` first")
+    with np.load(path) as saved:
+        return {name: saved[name] for name in saved.files}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recommend go, punt or field goal for a 4th down")
+    parser.add_argument("yardline_100", type=int, help="yards from the opponent's end zone")
+    parser.add_argument("ydstogo", type=int, help="yards to go for a first down")
+    parser.add_argument("game_seconds_remaining", type=float, help="seconds left in the game")
+    parser.add_argument("wp", type=float, help="offense's win probability, 0-1")
+    parser.add_argument("--table", default=os.path.join("cache", TABLE_FILE))
+    args = parser.parse_args(argv)
+
+    best, ev = recommend(load_decision_table(args.table), args.yardline_100, args.ydstogo,
+                         args.game_seconds_remaining, args.wp)
+    for decision, value in ev.items():
+        print(f"{decision:<12}{'n/a' if np.isnan(value) else f'{value:+.2f} EPA':>12}")
+    print(f"Recommendation: {best or 'no estimate for this situation'}")
+
+
+if __name__ == "__main__":
+    main()
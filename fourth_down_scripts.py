@@ -1,592 +1,1169 @@
-import pandas as pd
-import plotly.express as px
+"""NFL 4th down decision analysis (1999-2024).
+
+Each section of the analysis is registered as a named analysis with the
+play-by-play columns it needs. Running the script executes all of them;
+`--only heatmaps,qb_sneak` runs a subset and only loads what that subset
+needs. The module can also be imported and driven through run_analyses().
+"""
+import argparse
+import contextlib
+import io
 import os
+import tempfile
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+import conversion
+import decisions
+import intervals
+import rates
+import teams
+import win_probability
+from bucketing import FIELD_ORDER, TIME_ORDER, add_situation_categories
+from build_graph import (capture_output, code_hash, figure_hash, frame_fingerprint, load_graph,
+                         load_results, node_key, results_path, save_graph, save_results)
+from conversion import PLAY_TYPES, conversion_cells, load_or_fit_conversion_model, predict, predict_grid
+from cube import CUBE_COLUMNS, build_cube, save_cube
+from decisions import WP_ORDER, build_decision_table, grade_decisions, save_decision_table
+from intervals import INTERVAL_COLUMNS, error_bars, heatmap_hover
+from instrumentation import REPORT_FILE, flame_summary, reset, stage, write_report
+from pbp_loader import available_columns, load_fourths
+from schema import apply_schema, memory_mb
+from sneaks import classify_qb_sneaks, qb_player_ids
+from store import load_store, store_key, store_path, stored_columns, write_store
+from streaming import stream_cube
+from rates import add_indicators, go_rate_table, rate_table, success_rate_table
+from render import PLOTLY_JS, export_images, image_paths, render_charts
+from summary import build_summary, write_summary
+from teams import ROLLING_SEASONS, current_teams, team_counts, team_season_table, team_table
+from win_probability import (FINE_WP_BINS, MIN_CELL_PLAYS, MINUTES, WP_DECILES, field_bins, grid_counts, grid_go_rate,
+                             grid_rates, minute_bins, time_bins, wp_bins, wp_decile_table, wp_labels, yardline_bins)
 
 # load multiple seasons
-years = [1999, 2000, 2001, 2002, 2003, 2004, 2005, 
-        2006, 2007, 2008, 2009, 2010, 2011, 2012, 
-        2013, 2014, 2015, 2016, 2017, 2018, 2019, 2020, 
+years = [1999, 2000, 2001, 2002, 2003, 2004, 2005,
+        2006, 2007, 2008, 2009, 2010, 2011, 2012,
+        2013, 2014, 2015, 2016, 2017, 2018, 2019, 2020,
         2021, 2022, 2023, 2024]
-all_fourths = []
-
-for year in years:
-    file_path = f"pbp_data/play_by_play_{year}.parquet"
-    if os.path.exists(file_path):
-        df = pd.read_parquet(file_path)
-        focus_cols = ["season","week","posteam","defteam","yardline_100","ydstogo","down","play_type","wp","fourth_down_converted","fourth_down_failed","qtr","game_seconds_remaining"]
-        fourths = df.loc[df["down"] == 4, focus_cols].copy()
-        all_fourths.append(fourths)
-        print(f"Loaded {len(fourths)} 4th downs from {year}")
-
-# combine all years
-fourths = pd.concat(all_fourths, ignore_index=True)
-print(f"\nTotal 4th downs across all years: {len(fourths)}")
-print(fourths.head())
-
-# simple chart: how often teams go for it vs kick
-fourths["decision"] = fourths["play_type"].map(lambda x: "go" if x in ["run","pass"] else "kick")
-counts = fourths.groupby("decision").size().reset_index(name="count")
-
-fig = px.bar(counts, x="decision", y="count", title="Go vs Kick (1999-2024)")
-fig.write_html("first_chart.html")
-print("chart saved as first_chart.html")
-
-# yearly trends chart
-yearly_counts = fourths.groupby(["season", "decision"]).size().reset_index(name="count")
-fig2 = px.line(yearly_counts, x="season", y="count", color="decision", 
-               title="4th Down Decision Trends by Year (1999-2024)",
-               markers=True)
-fig2.write_html("yearly_trends.html")
-print("yearly trends chart saved as yearly_trends.html")
-
-# Success rate analysis
-print("\n=== SUCCESS RATE ANALYSIS ===")
-
-# Filter to only "go for it" attempts (run/pass plays)
-go_attempts = fourths[fourths["decision"] == "go"].copy()
-print(f"Total 'go for it' attempts: {len(go_attempts)}")
-
-# Calculate success rate
-successful = go_attempts["fourth_down_converted"].sum()
-total_attempts = len(go_attempts)
-success_rate = (successful / total_attempts) * 100 if total_attempts > 0 else 0
-
-print(f"Successful conversions: {successful}")
-print(f"Success rate: {success_rate:.1f}%")
-
-# Success rate by distance
-print("\n=== SUCCESS RATE BY DISTANCE ===")
-distance_success = go_attempts.groupby("ydstogo").agg({
-    "fourth_down_converted": ["count", "sum"]
-}).round(2)
-distance_success.columns = ["attempts", "successful"]
-distance_success["success_rate"] = (distance_success["successful"] / distance_success["attempts"] * 100).round(1)
-distance_success = distance_success[distance_success["attempts"] >= 10]  # Only show distances with 10+ attempts
-print(distance_success)
-
-# Create success rate visualization
-fig3 = px.bar(distance_success.reset_index(), 
-              x="ydstogo", y="success_rate",
-              title="4th Down Success Rate by Distance to Go (1999-2024)",
-              labels={"ydstogo": "Yards to Go", "success_rate": "Success Rate (%)"})
-fig3.write_html("success_rate_by_distance.html")
-print("Success rate chart saved as success_rate_by_distance.html")
-
-# Time-based aggression analysis
-print("\n=== TIME-BASED AGGRESSION ANALYSIS ===")
-
-# Create time categories
-def categorize_time(seconds_remaining):
-    if seconds_remaining > 2700:  # First half
-        return "1st Half"
-    elif seconds_remaining > 1800:  # 3rd Quarter
-        return "3rd Quarter"
-    elif seconds_remaining > 900:   # Early 4th Quarter
-        return "Early 4th Quarter"
-    elif seconds_remaining > 300:   # Late 4th Quarter
-        return "Late 4th Quarter"
-    else:  # Final 5 minutes
-        return "Final 5 Minutes"
-
-fourths["time_category"] = fourths["game_seconds_remaining"].apply(categorize_time)
-
-# Calculate go-for-it rate by time
-time_aggression = fourths.groupby("time_category").agg({
-    "decision": lambda x: (x == "go").sum() / len(x) * 100
-}).round(1)
-time_aggression.columns = ["go_for_it_rate"]
-time_aggression = time_aggression.sort_values("go_for_it_rate", ascending=False)
-
-print("Go-for-it rate by time in game:")
-print(time_aggression)
-
-# Also show by quarter
-quarter_aggression = fourths.groupby("qtr").agg({
-    "decision": lambda x: (x == "go").sum() / len(x) * 100
-}).round(1)
-quarter_aggression.columns = ["go_for_it_rate"]
-print("\nGo-for-it rate by quarter:")
-print(quarter_aggression)
-
-# Create visualization
-fig4 = px.bar(time_aggression.reset_index(), 
-              x="time_category", y="go_for_it_rate",
-              title="4th Down Go-for-it Rate by Time in Game (1999-2024)",
-              labels={"time_category": "Time in Game", "go_for_it_rate": "Go-for-it Rate (%)"})
-fig4.write_html("time_aggression.html")
-print("Time aggression chart saved as time_aggression.html")
-
-# Run vs Pass analysis on 4th downs
-print("\n=== RUN VS PASS ON 4TH DOWNS ===")
-
-# Filter to only "go for it" attempts and categorize by run/pass
-go_attempts = fourths[fourths["decision"] == "go"].copy()
-go_attempts["play_strategy"] = go_attempts["play_type"].map(lambda x: "run" if x == "run" else "pass" if x == "pass" else "other")
-
-# Overall run vs pass breakdown
-strategy_counts = go_attempts["play_strategy"].value_counts()
-print("Play type breakdown on 4th down go-for-it attempts:")
-print(strategy_counts)
-
-# Success rates by strategy
-strategy_success = go_attempts.groupby("play_strategy").agg({
-    "fourth_down_converted": ["count", "sum"]
-}).round(2)
-strategy_success.columns = ["attempts", "successful"]
-strategy_success["success_rate"] = (strategy_success["successful"] / strategy_success["attempts"] * 100).round(1)
-strategy_success = strategy_success[strategy_success["attempts"] >= 100]  # Only show strategies with 100+ attempts
-
-print("\nSuccess rates by play strategy:")
-print(strategy_success)
-
-# Run vs Pass by distance
-print("\n=== RUN VS PASS BY DISTANCE ===")
-distance_strategy = go_attempts.groupby(["ydstogo", "play_strategy"]).agg({
-    "fourth_down_converted": ["count", "sum"]
-}).round(2)
-distance_strategy.columns = ["attempts", "successful"]
-distance_strategy["success_rate"] = (distance_strategy["successful"] / distance_strategy["attempts"] * 100).round(1)
-
-# Pivot to compare run vs pass by distance
-distance_comparison = distance_strategy["success_rate"].unstack(fill_value=0)
-distance_comparison = distance_comparison[(distance_comparison["run"] >= 20) | (distance_comparison["pass"] >= 20)]  # Min 20 attempts
-print("Success rate by distance and strategy (run vs pass):")
-print(distance_comparison)
-
-# Create visualization
-fig5 = px.bar(strategy_success.reset_index(), 
-              x="play_strategy", y="success_rate",
-              title="4th Down Success Rate: Run vs Pass (1999-2024)",
-              labels={"play_strategy": "Play Strategy", "success_rate": "Success Rate (%)"})
-fig5.write_html("run_vs_pass_success.html")
-print("Run vs pass success chart saved as run_vs_pass_success.html")
-
-# Distance comparison chart
-fig6 = px.bar(distance_comparison.reset_index(), 
-              x="ydstogo", y=["run", "pass"],
-              title="4th Down Success Rate by Distance: Run vs Pass (1999-2024)",
-              labels={"ydstogo": "Yards to Go", "value": "Success Rate (%)"},
-              barmode="group")
-fig6.write_html("run_vs_pass_by_distance.html")
-print("Run vs pass by distance chart saved as run_vs_pass_by_distance.html")
-
-# Field position analysis
-print("\n=== FIELD POSITION ANALYSIS ===")
-
-# Create field position categories
-def categorize_field_position(yardline_100):
-    if yardline_100 <= 10:  # Own goal line area
-        return "Own 1-10"
-    elif yardline_100 <= 20:  # Own territory
-        return "Own 11-20"
-    elif yardline_100 <= 30:  # Own territory
-        return "Own 21-30"
-    elif yardline_100 <= 40:  # Own territory
-        return "Own 31-40"
-    elif yardline_100 <= 50:  # Midfield
-        return "Own 41-50"
-    elif yardline_100 <= 60:  # Opponent territory
-        return "Opp 40-49"
-    elif yardline_100 <= 70:  # Opponent territory
-        return "Opp 30-39"
-    elif yardline_100 <= 80:  # Opponent territory
-        return "Opp 20-29"
-    elif yardline_100 <= 90:  # Red zone
-        return "Opp 10-19"
-    else:  # Goal line area
-        return "Opp 1-9"
-
-fourths["field_position"] = fourths["yardline_100"].apply(categorize_field_position)
-
-# Go-for-it rate by field position
-field_aggression = fourths.groupby("field_position").agg({
-    "decision": lambda x: (x == "go").sum() / len(x) * 100
-}).round(1)
-field_aggression.columns = ["go_for_it_rate"]
-field_aggression = field_aggression.sort_values("go_for_it_rate", ascending=False)
-
-print("Go-for-it rate by field position:")
-print(field_aggression)
-
-# Success rate by field position (for go-for-it attempts)
-go_attempts["field_position"] = go_attempts["yardline_100"].apply(categorize_field_position)
-field_success = go_attempts.groupby("field_position").agg({
-    "fourth_down_converted": ["count", "sum"]
-}).round(2)
-field_success.columns = ["attempts", "successful"]
-field_success["success_rate"] = (field_success["successful"] / field_success["attempts"] * 100).round(1)
-field_success = field_success[field_success["attempts"] >= 50]  # Only show positions with 50+ attempts
-
-print("\nSuccess rate by field position (go-for-it attempts):")
-print(field_success)
-
-# Create field position order for better visualization
-field_order = ["Own 1-10", "Own 11-20", "Own 21-30", "Own 31-40", "Own 41-50", 
-               "Opp 40-49", "Opp 30-39", "Opp 20-29", "Opp 10-19", "Opp 1-9"]
-
-# Reorder data for visualization
-field_aggression_ordered = field_aggression.reindex(field_order)
-field_success_ordered = field_success.reindex(field_order)
-
-# Create visualizations
-fig7 = px.bar(field_aggression_ordered.reset_index(), 
-              x="field_position", y="go_for_it_rate",
-              title="4th Down Go-for-it Rate by Field Position (1999-2024)",
-              labels={"field_position": "Field Position", "go_for_it_rate": "Go-for-it Rate (%)"})
-fig7.update_xaxes(tickangle=45)
-fig7.write_html("field_position_aggression.html")
-print("Field position aggression chart saved as field_position_aggression.html")
-
-fig8 = px.bar(field_success_ordered.reset_index(), 
-              x="field_position", y="success_rate",
-              title="4th Down Success Rate by Field Position (1999-2024)",
-              labels={"field_position": "Field Position", "success_rate": "Success Rate (%)"})
-fig8.update_xaxes(tickangle=45)
-fig8.write_html("field_position_success.html")
-print("Field position success chart saved as field_position_success.html")
-
-# Red zone vs non-red zone analysis
-print("\n=== RED ZONE VS NON-RED ZONE ===")
-fourths["is_red_zone"] = fourths["yardline_100"] >= 80
-
-red_zone_analysis = fourths.groupby("is_red_zone").agg({
-    "decision": lambda x: (x == "go").sum() / len(x) * 100
-}).round(1)
-red_zone_analysis.index = ["Non-Red Zone", "Red Zone"]
-red_zone_analysis.columns = ["go_for_it_rate"]
-
-print("Go-for-it rate: Red Zone vs Non-Red Zone")
-print(red_zone_analysis)
-
-# Yearly trends for all key metrics
-print("\n=== YEARLY TRENDS ANALYSIS ===")
-
-# 1. Yearly success rates
-print("1. Success Rate Trends by Year")
-yearly_success = go_attempts.groupby("season").agg({
-    "fourth_down_converted": ["count", "sum"]
-}).round(2)
-yearly_success.columns = ["attempts", "successful"]
-yearly_success["success_rate"] = (yearly_success["successful"] / yearly_success["attempts"] * 100).round(1)
-print(yearly_success[["attempts", "success_rate"]])
-
-# 2. Yearly run vs pass trends
-print("\n2. Run vs Pass Trends by Year")
-go_attempts["play_strategy"] = go_attempts["play_type"].map(lambda x: "run" if x == "run" else "pass" if x == "pass" else "other")
-yearly_strategy = go_attempts.groupby(["season", "play_strategy"]).size().unstack(fill_value=0)
-yearly_strategy_pct = yearly_strategy.div(yearly_strategy.sum(axis=1), axis=0) * 100
-print("Run vs Pass percentage by year:")
-print(yearly_strategy_pct[["run", "pass"]].round(1))
-
-# 3. Yearly field position aggression trends
-print("\n3. Field Position Aggression Trends by Year")
-fourths["field_position"] = fourths["yardline_100"].apply(categorize_field_position)
-yearly_field_aggression = fourths.groupby(["season", "field_position"]).agg({
-    "decision": lambda x: (x == "go").sum() / len(x) * 100
-}).round(1)
-yearly_field_aggression.columns = ["go_for_it_rate"]
-
-# Show midfield and red zone trends specifically
-midfield_trends = yearly_field_aggression.loc[(slice(None), ["Own 41-50", "Opp 40-49"]), :].unstack(level=1)
-red_zone_trends = yearly_field_aggression.loc[(slice(None), ["Opp 10-19", "Opp 1-9"]), :].unstack(level=1)
-print("Midfield go-for-it rate trends:")
-print(midfield_trends.round(1))
-print("\nRed zone go-for-it rate trends:")
-print(red_zone_trends.round(1))
-
-# 4. Yearly time-based aggression trends
-print("\n4. Time-Based Aggression Trends by Year")
-fourths["time_category"] = fourths["game_seconds_remaining"].apply(categorize_time)
-yearly_time_aggression = fourths.groupby(["season", "time_category"]).agg({
-    "decision": lambda x: (x == "go").sum() / len(x) * 100
-}).round(1)
-yearly_time_aggression.columns = ["go_for_it_rate"]
-
-# Show first half vs final 5 minutes trends
-time_trends = yearly_time_aggression.loc[(slice(None), ["1st Half", "Final 5 Minutes"]), :].unstack(level=1)
-print("First Half vs Final 5 Minutes go-for-it rate trends:")
-print(time_trends.round(1))
-
-# Create comprehensive yearly trends visualization
-fig9 = px.line(yearly_success.reset_index(), 
-               x="season", y="success_rate",
-               title="4th Down Success Rate Trends by Year (1999-2024)",
-               markers=True)
-fig9.write_html("yearly_success_trends.html")
-print("Yearly success trends chart saved as yearly_success_trends.html")
-
-# Run vs Pass trends visualization
-fig10 = px.line(yearly_strategy_pct.reset_index(), 
-                x="season", y=["run", "pass"],
-                title="Run vs Pass Strategy Trends by Year (1999-2024)",
-                markers=True)
-fig10.write_html("yearly_strategy_trends.html")
-print("Yearly strategy trends chart saved as yearly_strategy_trends.html")
-
-# Field position trends visualization (midfield focus)
-midfield_trends_clean = midfield_trends.reset_index()
-midfield_trends_clean.columns = ["season", "Own_41_50", "Opp_40_49"]
-fig11 = px.line(midfield_trends_clean, 
-                x="season", y=["Own_41_50", "Opp_40_49"],
-                title="Midfield 4th Down Aggression Trends by Year (1999-2024)",
-                markers=True)
-fig11.write_html("yearly_field_position_trends.html")
-print("Yearly field position trends chart saved as yearly_field_position_trends.html")
-
-# Time-based trends visualization
-time_trends_clean = time_trends.reset_index()
-time_trends_clean.columns = ["season", "First_Half", "Final_5_Minutes"]
-fig12 = px.line(time_trends_clean, 
-                x="season", y=["First_Half", "Final_5_Minutes"],
-                title="Time-Based 4th Down Aggression Trends by Year (1999-2024)",
-                markers=True)
-fig12.write_html("yearly_time_trends.html")
-print("Yearly time trends chart saved as yearly_time_trends.html")
-
-# Heatmap Analysis
-print("\n=== HEATMAP ANALYSIS ===")
-
-# 1. Field Position vs Distance Heatmap (Go-for-it rates)
-print("1. Creating Field Position vs Distance Heatmap")
-field_distance_heatmap = fourths.groupby(["field_position", "ydstogo"]).agg({
-    "decision": lambda x: (x == "go").sum() / len(x) * 100
-}).round(1)
-field_distance_heatmap.columns = ["go_for_it_rate"]
-
-# Pivot for heatmap
-field_distance_pivot = field_distance_heatmap.unstack(level=1, fill_value=0)
-field_distance_pivot.columns = field_distance_pivot.columns.droplevel(0)
-
-# Create heatmap
-fig13 = px.imshow(field_distance_pivot, 
-                  title="4th Down Go-for-it Rate Heatmap: Field Position vs Distance (1999-2024)",
-                  labels=dict(x="Yards to Go", y="Field Position", color="Go-for-it Rate (%)"),
-                  aspect="auto")
-fig13.write_html("field_distance_heatmap.html")
-print("Field position vs distance heatmap saved as field_distance_heatmap.html")
-
-# 2. Field Position vs Distance Heatmap (Success rates)
-print("2. Creating Field Position vs Distance Success Rate Heatmap")
-go_attempts["field_position"] = go_attempts["yardline_100"].apply(categorize_field_position)
-field_distance_success = go_attempts.groupby(["field_position", "ydstogo"]).agg({
-    "fourth_down_converted": ["count", "sum"]
-}).round(2)
-field_distance_success.columns = ["attempts", "successful"]
-field_distance_success["success_rate"] = (field_distance_success["successful"] / field_distance_success["attempts"] * 100).round(1)
-
-# Filter for sufficient sample sizes
-field_distance_success = field_distance_success[field_distance_success["attempts"] >= 20]
-field_distance_success_pivot = field_distance_success["success_rate"].unstack(level=1, fill_value=0)
-
-# Create success rate heatmap
-fig14 = px.imshow(field_distance_success_pivot, 
-                  title="4th Down Success Rate Heatmap: Field Position vs Distance (1999-2024)",
-                  labels=dict(x="Yards to Go", y="Field Position", color="Success Rate (%)"),
-                  aspect="auto")
-fig14.write_html("field_distance_success_heatmap.html")
-print("Field position vs distance success rate heatmap saved as field_distance_success_heatmap.html")
-
-# 3. Time vs Field Position Heatmap
-print("3. Creating Time vs Field Position Heatmap")
-fourths["time_category"] = fourths["game_seconds_remaining"].apply(categorize_time)
-time_field_heatmap = fourths.groupby(["time_category", "field_position"]).agg({
-    "decision": lambda x: (x == "go").sum() / len(x) * 100
-}).round(1)
-time_field_heatmap.columns = ["go_for_it_rate"]
-
-# Pivot for heatmap
-time_field_pivot = time_field_heatmap.unstack(level=1, fill_value=0)
-time_field_pivot.columns = time_field_pivot.columns.droplevel(0)
-
-# Create time vs field position heatmap
-fig15 = px.imshow(time_field_pivot, 
-                  title="4th Down Go-for-it Rate Heatmap: Time vs Field Position (1999-2024)",
-                  labels=dict(x="Field Position", y="Time in Game", color="Go-for-it Rate (%)"),
-                  aspect="auto")
-fig15.write_html("time_field_heatmap.html")
-print("Time vs field position heatmap saved as time_field_heatmap.html")
-
-# 4. Yearly Trends Heatmap (Field Position)
-print("4. Creating Yearly Field Position Trends Heatmap")
-yearly_field_heatmap = fourths.groupby(["season", "field_position"]).agg({
-    "decision": lambda x: (x == "go").sum() / len(x) * 100
-}).round(1)
-yearly_field_heatmap.columns = ["go_for_it_rate"]
-
-# Pivot for heatmap
-yearly_field_pivot = yearly_field_heatmap.unstack(level=1, fill_value=0)
-yearly_field_pivot.columns = yearly_field_pivot.columns.droplevel(0)
-
-# Create yearly field position heatmap
-fig16 = px.imshow(yearly_field_pivot, 
-                  title="4th Down Go-for-it Rate Heatmap: Year vs Field Position (1999-2024)",
-                  labels=dict(x="Field Position", y="Year", color="Go-for-it Rate (%)"),
-                  aspect="auto")
-fig16.write_html("yearly_field_heatmap.html")
-print("Yearly field position heatmap saved as yearly_field_heatmap.html")
-
-# QB Sneak Analysis
-print("\n=== QB SNEAK ANALYSIS ===")
-
-# First, let's check what columns we have for QB sneaks
-print("Checking available QB sneak columns...")
-sample_df = pd.read_parquet('pbp_data/play_by_play_2017.parquet')
-qb_sneak_cols = [col for col in sample_df.columns if 'sneak' in col.lower() or 'qb' in col.lower()]
-print(f"QB-related columns: {qb_sneak_cols}")
-
-# Load data with QB and rusher information for sneak identification
-print("Loading data with QB and rusher information...")
-all_fourths_with_sneaks = []
-
-for year in years:
-    file_path = f"pbp_data/play_by_play_{year}.parquet"
-    if os.path.exists(file_path):
-        df = pd.read_parquet(file_path)
-        # Include QB and rusher columns for sneak identification
-        focus_cols = ["season","week","posteam","defteam","yardline_100","ydstogo","down","play_type","wp","fourth_down_converted","fourth_down_failed","qtr","game_seconds_remaining","passer_player_name","rusher_player_name","desc"]
-        available_cols = [col for col in focus_cols if col in df.columns]
-        fourths_with_sneaks = df.loc[df["down"] == 4, available_cols].copy()
-        all_fourths_with_sneaks.append(fourths_with_sneaks)
-        print(f"Loaded {len(fourths_with_sneaks)} 4th downs from {year}")
-
-# Combine all years
-fourths_with_sneaks = pd.concat(all_fourths_with_sneaks, ignore_index=True)
-print(f"\nTotal 4th downs with QB/rusher data: {len(fourths_with_sneaks)}")
-
-# Categorize decisions
-fourths_with_sneaks["decision"] = fourths_with_sneaks["play_type"].map(lambda x: "go" if x in ["run","pass"] else "kick")
-
-# Filter to go-for-it attempts
-go_attempts_with_sneaks = fourths_with_sneaks[fourths_with_sneaks["decision"] == "go"].copy()
-
-# Identify QB sneaks: rusher name = passer name AND yards to go <= 2
-print("Identifying QB sneaks using rusher = passer method...")
-
-# Debug: Check what we have in the data
-print(f"Total go-for-it attempts: {len(go_attempts_with_sneaks)}")
-print(f"Attempts with rusher data: {go_attempts_with_sneaks['rusher_player_name'].notna().sum()}")
-print(f"Attempts with passer data: {go_attempts_with_sneaks['passer_player_name'].notna().sum()}")
-print(f"Attempts with ydstogo <= 2: {(go_attempts_with_sneaks['ydstogo'] <= 2).sum()}")
-
-# Check for exact matches
-exact_matches = (go_attempts_with_sneaks["rusher_player_name"] == go_attempts_with_sneaks["passer_player_name"]).sum()
-print(f"Exact rusher=passer matches: {exact_matches}")
-
-# More flexible approach: Look for QB sneaks in short yardage situations
-# QB sneaks are typically run plays where the QB is the rusher
-go_attempts_with_sneaks["is_qb_sneak"] = (
-    (go_attempts_with_sneaks["play_type"] == "run") &
-    (go_attempts_with_sneaks["ydstogo"] <= 2) &
-    (go_attempts_with_sneaks["rusher_player_name"].notna())
-)
-
-# Also try the original method for comparison
-go_attempts_with_sneaks["is_qb_sneak_original"] = (
-    (go_attempts_with_sneaks["rusher_player_name"] == go_attempts_with_sneaks["passer_player_name"]) &
-    (go_attempts_with_sneaks["ydstogo"] <= 2) &
-    (go_attempts_with_sneaks["rusher_player_name"].notna()) &
-    (go_attempts_with_sneaks["passer_player_name"].notna())
-)
-
-print(f"QB sneaks (run plays, ydstogo <= 2): {go_attempts_with_sneaks['is_qb_sneak'].sum()}")
-print(f"QB sneaks (rusher=passer method): {go_attempts_with_sneaks['is_qb_sneak_original'].sum()}")
-
-# QB Sneak Analysis
-total_qb_sneaks_found = go_attempts_with_sneaks["is_qb_sneak"].sum()
-print(f"Found {total_qb_sneaks_found} QB sneaks using rusher=passer method")
-
-if total_qb_sneaks_found > 0:
-    print("\n1. Overall QB Sneak Statistics")
-    total_go_attempts = len(go_attempts_with_sneaks)
-    qb_sneaks = go_attempts_with_sneaks[go_attempts_with_sneaks["is_qb_sneak"] == True]
-    total_qb_sneaks = len(qb_sneaks)
-    
-    print(f"Total go-for-it attempts: {total_go_attempts}")
-    print(f"Total QB sneaks: {total_qb_sneaks}")
-    print(f"QB sneak percentage: {(total_qb_sneaks/total_go_attempts*100):.1f}%")
-    
-    # QB Sneak success rate
-    if total_qb_sneaks > 0:
-        qb_sneak_successful = qb_sneaks["fourth_down_converted"].sum()
-        qb_sneak_success_rate = (qb_sneak_successful / total_qb_sneaks) * 100
-        print(f"QB sneak success rate: {qb_sneak_success_rate:.1f}%")
-        
-        # Compare to non-sneak attempts
-        non_sneaks = go_attempts_with_sneaks[go_attempts_with_sneaks["is_qb_sneak"] == False]
-        non_sneak_successful = non_sneaks["fourth_down_converted"].sum()
-        non_sneak_success_rate = (non_sneak_successful / len(non_sneaks)) * 100 if len(non_sneaks) > 0 else 0
-        print(f"Non-sneak success rate: {non_sneak_success_rate:.1f}%")
-        
-        # QB Sneak by distance
-        print("\n2. QB Sneak by Distance")
-        qb_sneak_distance = qb_sneaks.groupby("ydstogo").agg({
-            "fourth_down_converted": ["count", "sum"]
-        }).round(2)
-        qb_sneak_distance.columns = ["attempts", "successful"]
-        qb_sneak_distance["success_rate"] = (qb_sneak_distance["successful"] / qb_sneak_distance["attempts"] * 100).round(1)
-        qb_sneak_distance = qb_sneak_distance[qb_sneak_distance["attempts"] >= 5]  # Min 5 attempts
-        print("QB Sneak success rate by distance:")
-        print(qb_sneak_distance)
-        
-        # Yearly QB Sneak trends
-        print("\n3. Yearly QB Sneak Trends")
-        yearly_qb_sneaks = go_attempts_with_sneaks.groupby("season").agg({
-            "is_qb_sneak": ["count", "sum"]
-        }).round(2)
-        yearly_qb_sneaks.columns = ["total_attempts", "qb_sneaks"]
-        yearly_qb_sneaks["qb_sneak_pct"] = (yearly_qb_sneaks["qb_sneaks"] / yearly_qb_sneaks["total_attempts"] * 100).round(1)
-        
-        # QB Sneak success rate by year
-        yearly_qb_sneak_success = qb_sneaks.groupby("season").agg({
-            "fourth_down_converted": ["count", "sum"]
-        }).round(2)
-        yearly_qb_sneak_success.columns = ["attempts", "successful"]
-        yearly_qb_sneak_success["success_rate"] = (yearly_qb_sneak_success["successful"] / yearly_qb_sneak_success["attempts"] * 100).round(1)
-        
-        print("Yearly QB sneak trends:")
-        print(yearly_qb_sneaks[["total_attempts", "qb_sneaks", "qb_sneak_pct"]])
-        print("\nYearly QB sneak success rates:")
-        print(yearly_qb_sneak_success[["attempts", "success_rate"]])
-        
-        # Create visualizations
-        fig17 = px.bar(qb_sneak_distance.reset_index(), 
-                      x="ydstogo", y="success_rate",
-                      title="QB Sneak Success Rate by Distance (1999-2024)",
-                      labels={"ydstogo": "Yards to Go", "success_rate": "Success Rate (%)"})
-        fig17.write_html("qb_sneak_success_by_distance.html")
-        print("QB sneak success by distance chart saved as qb_sneak_success_by_distance.html")
-        
-        fig18 = px.line(yearly_qb_sneaks.reset_index(), 
-                       x="season", y="qb_sneak_pct",
-                       title="QB Sneak Usage Trends by Year (1999-2024)",
+focus_cols = ["season","week","posteam","defteam","yardline_100","ydstogo","down","play_type","wp","fourth_down_converted","fourth_down_failed","qtr","game_seconds_remaining"]
+
+# name -> {"func": ..., "columns": [...]}, in the order the analyses run
+ANALYSES = {}
+# engine of the row-level pipeline (see polars_backend.py); Polars is optional and opt-in, since it
+# reads the raw season files on every cold build instead of going through the per-season extract cache
+BACKENDS = ["pandas", "polars"]
+DEFAULT_BACKEND = "pandas"
+
+
+def analysis(name, columns=(), charts=()):
+    """Register a function as a named analysis.
+
+    `columns` lists the play-by-play columns it needs on top of the ones the
+    aggregate cube is built from, and `charts` the file names of the charts
+    it can build. The function gets the dict returned by load_data() and
+    returns a dict of its result tables; its charts go into data["figures"]
+    and are written by the rendering stage.
+    """
+    def register(func):
+        ANALYSES[name] = {"func": func, "columns": list(columns), "charts": list(charts)}
+        return func
+    return register
+
+
+def _px():
+    # plotly is only imported once a chart is actually built
+    import plotly.express as px
+    return px
+
+
+def required_columns(names):
+    """Play-by-play columns needed to run the given analyses, in focus_cols order"""
+    needed = set(CUBE_COLUMNS)
+    for name in names:
+        needed.update(ANALYSES[name]["columns"])
+    ordered = [col for col in focus_cols if col in needed]
+    return ordered + sorted(needed - set(ordered))
+
+
+def load_data(names, data_dir="pbp_data", workers=1, cache_dir="cache", use_cache=True,
+              stream=False, max_rows=100_000, backend=DEFAULT_BACKEND, ids_cache_dir=None):
+    """Load the 4th downs the given analyses need and build the aggregate cube.
+
+    With stream=True the cube is built from parquet record batches of at most
+    max_rows rows and no row-level frame is kept ("fourths" is None); the
+    tables come out identical since every analysis reads the cube.
+    Otherwise the prepared frame (dtypes, buckets, indicators) is
+    memory-mapped from the store (see store.py) when an earlier run built it
+    from the same season files and quarterbacks, and written there, with the
+    columns of the store it replaces, when it had to be built.
+    backend="polars" builds it, and the cube, as one lazy Polars query over
+    the raw season files instead (see polars_backend.py), bypassing the
+    extract cache; the pandas path is the reference.
+    Every path looks the seasons' quarterbacks up in the 4th down cache
+    manifest of ids_cache_dir (default: cache_dir when use_cache is on).
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown backend: {backend} (choose from {', '.join(BACKENDS)})")
+    # column availability comes from the parquet footers, no data is read
+    pbp_columns = available_columns(years, data_dir)
+    load_cols = [col for col in required_columns(names) if col in pbp_columns]
+    if ids_cache_dir is None and use_cache:
+        ids_cache_dir = cache_dir
+
+    # QB sneaks are flagged against these seasons' quarterbacks, which also key the store
+    with stage("load/qb_ids"):
+        if backend == "polars":
+            import polars_backend
+
+            qb_ids = polars_backend.qb_player_ids(years, data_dir, ids_cache_dir)
+        else:
+            qb_ids = qb_player_ids(years, data_dir, ids_cache_dir)
+    prepare = partial(classify_qb_sneaks, qb_ids=qb_ids)
+
+    if stream:
+        fourths = None
+        cube = stream_cube(years, load_cols, data_dir, max_rows, prepare=prepare)
+        print(f"\nTotal 4th downs across all years: {cube['plays'].sum()}")
+    else:
+        # the prepared frame of an earlier run is memory-mapped from the store when its sources haven't changed;
+        # it always carries the focus columns, so other readers (query_service.py) find them whoever built it
+        load_cols += [col for col in focus_cols if col in pbp_columns and col not in load_cols]
+        key = store_key(years, data_dir, qb_ids)
+        with stage("load/store") as record:
+            fourths = load_store(cache_dir, key, load_cols) if use_cache else None
+            record["rows"] = None if fourths is None else len(fourths)
+        stored, cube = fourths is not None, None
+        # a rebuilt store keeps the columns the previous one was loaded with, as the extract cache does
+        store_cols = list(load_cols)
+        if use_cache and not stored:
+            store_cols += [col for col in stored_columns(cache_dir) if col in pbp_columns and col not in store_cols]
+        if stored:
+            print(f"4th down store: {len(fourths)} prepared rows memory-mapped from {store_path(cache_dir)}")
+            print(f"\nTotal 4th downs across all years: {len(fourths)}")
+            print(fourths[[col for col in focus_cols if col in fourths.columns]].head())
+        elif backend == "polars":
+            # scan, filter, flags, dtypes, buckets, indicators and the cube's group-by in one lazy query
+            with stage("load/polars") as record:
+                fourths, cube = polars_backend.load_prepared(years, store_cols, data_dir, qb_ids=qb_ids)
+                record["rows"] = len(fourths)
+            print(f"\nTotal 4th downs across all years: {len(fourths)}")
+            print(f"4th down frame memory: {memory_mb(fourths):.1f} MB")
+            print(fourths[[col for col in focus_cols if col in fourths.columns]].head())
+        else:
+            # single pass: only the 4th down rows and the columns the analyses need are decoded
+            fourths = load_fourths(years, store_cols, data_dir, workers=workers,
+                                   cache_dir=cache_dir if use_cache else None, prepare=prepare)
+            print(f"\nTotal 4th downs across all years: {len(fourths)}")
+
+            # compact dtypes: categoricals, small ints, float32 and nullable booleans
+            memory_before = memory_mb(fourths)
+            with stage("categorize/schema", rows=len(fourths)):
+                fourths = apply_schema(fourths)
+            print(f"4th down frame memory: {memory_before:.1f} MB -> {memory_mb(fourths):.1f} MB")
+            print(fourths[[col for col in focus_cols if col in fourths.columns]].head())
+
+            # time and field position buckets and the indicators, computed once for every analysis
+            with stage("categorize/buckets", rows=len(fourths)):
+                fourths = add_situation_categories(fourths)
+            with stage("categorize/indicators", rows=len(fourths)):
+                fourths = add_indicators(fourths)
+        if use_cache and not stored:
+            with stage("load/write_store", rows=len(fourths)):
+                write_store(fourths, cache_dir, key, store_cols)
+            # this run's frame is the one a store hit would give it
+            fourths = fourths.drop(columns=[col for col in store_cols if col not in load_cols])
+
+        # every table and chart is a slice of this aggregate cube
+        if cube is None:
+            with stage("aggregate/cube") as record:
+                cube = build_cube(fourths)
+                record["rows"] = len(cube)
+    cube_path = save_cube(cube, cache_dir)
+    print(f"Aggregate cube: {len(cube)} cells saved to {cube_path}")
+
+    return {
+        "fourths": fourths,
+        "cube": cube,
+        # go-for-it attempts only; for these play_type is the run/pass strategy
+        "go_cube": cube[cube["decision"] == "go"].rename(columns={"play_type": "play_strategy"}),
+        "pbp_columns": pbp_columns,
+        "cache_dir": cache_dir,
+        "charts": True,
+        # output filename -> finished figure, written by render_charts after the analyses
+        "figures": {},
+    }
+
+
+@analysis("decision_split", charts=["first_chart.html", "yearly_trends.html"])
+def decision_split(data):
+    cube = data["cube"]
+
+    # simple chart: how often teams go for it vs kick
+    counts = cube.groupby("decision")["plays"].sum().reset_index(name="count")
+
+    # yearly trends chart
+    yearly_counts = cube.groupby(["season", "decision"])["plays"].sum().reset_index(name="count")
+
+    if data["charts"]:
+        px = _px()
+        fig = px.bar(counts, x="decision", y="count", title="Go vs Kick (1999-2024)")
+        data["figures"]["first_chart.html"] = fig
+
+        fig2 = px.line(yearly_counts, x="season", y="count", color="decision",
+                       title="4th Down Decision Trends by Year (1999-2024)",
                        markers=True)
-        fig18.write_html("qb_sneak_usage_trends.html")
-        print("QB sneak usage trends chart saved as qb_sneak_usage_trends.html")
-        
-        fig19 = px.line(yearly_qb_sneak_success.reset_index(), 
-                       x="season", y="success_rate",
-                       title="QB Sneak Success Rate Trends by Year (1999-2024)",
+        data["figures"]["yearly_trends.html"] = fig2
+
+    return {"counts": counts, "yearly_counts": yearly_counts}
+
+
+@analysis("distance_success", charts=["success_rate_by_distance.html"])
+def distance_success_analysis(data):
+    go_cube = data["go_cube"]
+
+    # Success rate analysis
+    print("\n=== SUCCESS RATE ANALYSIS ===")
+
+    # "go for it" attempts (run/pass plays)
+    total_attempts = go_cube["plays"].sum()
+    print(f"Total 'go for it' attempts: {total_attempts}")
+
+    # Calculate success rate
+    successful = go_cube["successful"].sum()
+    success_rate = (successful / total_attempts) * 100 if total_attempts > 0 else 0
+
+    print(f"Successful conversions: {successful}")
+    print(f"Success rate: {success_rate:.1f}%")
+
+    # Success rate by distance
+    print("\n=== SUCCESS RATE BY DISTANCE ===")
+    distance_success = success_rate_table(go_cube, "ydstogo", min_count=10)  # Only show distances with 10+ attempts
+    print(distance_success)
+
+    # Create success rate visualization
+    if data["charts"]:
+        fig3 = _px().bar(error_bars(distance_success, "success_rate"),
+                         x="ydstogo", y="success_rate", error_y="error_plus", error_y_minus="error_minus",
+                         hover_data=["attempts"] + INTERVAL_COLUMNS,
+                         title="4th Down Success Rate by Distance to Go (1999-2024)",
+                         labels={"ydstogo": "Yards to Go", "success_rate": "Success Rate (%)"})
+        data["figures"]["success_rate_by_distance.html"] = fig3
+
+    return {"distance_success": distance_success}
+
+
+@analysis("time_aggression", charts=["time_aggression.html"])
+def time_aggression_analysis(data):
+    cube = data["cube"]
+
+    # Time-based aggression analysis
+    print("\n=== TIME-BASED AGGRESSION ANALYSIS ===")
+
+    # Calculate go-for-it rate by time
+    time_aggression = go_rate_table(cube, "time_category", intervals=True)
+    time_aggression = time_aggression.sort_values("go_for_it_rate", ascending=False)
+
+    print("Go-for-it rate by time in game:")
+    print(time_aggression)
+
+    # Also show by quarter
+    quarter_aggression = go_rate_table(cube, "qtr", intervals=True)
+    print("\nGo-for-it rate by quarter:")
+    print(quarter_aggression)
+
+    # Create visualization
+    if data["charts"]:
+        fig4 = _px().bar(error_bars(time_aggression, "go_for_it_rate"),
+                         x="time_category", y="go_for_it_rate", error_y="error_plus", error_y_minus="error_minus",
+                         hover_data=["plays"] + INTERVAL_COLUMNS,
+                         title="4th Down Go-for-it Rate by Time in Game (1999-2024)",
+                         labels={"time_category": "Time in Game", "go_for_it_rate": "Go-for-it Rate (%)"})
+        data["figures"]["time_aggression.html"] = fig4
+
+    return {"time_aggression": time_aggression, "quarter_aggression": quarter_aggression}
+
+
+@analysis("run_vs_pass", charts=["run_vs_pass_success.html", "run_vs_pass_by_distance.html"])
+def run_vs_pass_analysis(data):
+    go_cube = data["go_cube"]
+
+    # Run vs Pass analysis on 4th downs
+    print("\n=== RUN VS PASS ON 4TH DOWNS ===")
+
+    # Overall run vs pass breakdown
+    strategy_counts = go_cube.groupby("play_strategy")["plays"].sum().sort_values(ascending=False).rename("count")
+    print("Play type breakdown on 4th down go-for-it attempts:")
+    print(strategy_counts)
+
+    # Success rates by strategy
+    strategy_success = success_rate_table(go_cube, "play_strategy", min_count=100)  # Only show strategies with 100+ attempts
+
+    print("\nSuccess rates by play strategy:")
+    print(strategy_success)
+
+    # Run vs Pass by distance
+    print("\n=== RUN VS PASS BY DISTANCE ===")
+    distance_strategy = success_rate_table(go_cube, ["ydstogo", "play_strategy"])
+
+    # Pivot to compare run vs pass by distance
+    distance_comparison = distance_strategy["success_rate"].unstack(fill_value=0)
+    distance_comparison = distance_comparison[(distance_comparison["run"] >= 20) | (distance_comparison["pass"] >= 20)]  # Min 20 attempts
+    print("Success rate by distance and strategy (run vs pass):")
+    print(distance_comparison)
+
+    if data["charts"]:
+        px = _px()
+        # Create visualization
+        fig5 = px.bar(error_bars(strategy_success, "success_rate"),
+                      x="play_strategy", y="success_rate", error_y="error_plus", error_y_minus="error_minus",
+                      hover_data=["attempts"] + INTERVAL_COLUMNS,
+                      title="4th Down Success Rate: Run vs Pass (1999-2024)",
+                      labels={"play_strategy": "Play Strategy", "success_rate": "Success Rate (%)"})
+        data["figures"]["run_vs_pass_success.html"] = fig5
+
+        # Distance comparison chart, one bar per strategy with its own interval
+        distance_bars = error_bars(distance_strategy.loc[distance_comparison.index], "success_rate")
+        fig6 = px.bar(distance_bars[distance_bars["play_strategy"].isin(["run", "pass"])],
+                      x="ydstogo", y="success_rate", color="play_strategy",
+                      error_y="error_plus", error_y_minus="error_minus",
+                      hover_data=["attempts"] + INTERVAL_COLUMNS,
+                      category_orders={"play_strategy": ["run", "pass"]},
+                      title="4th Down Success Rate by Distance: Run vs Pass (1999-2024)",
+                      labels={"ydstogo": "Yards to Go", "success_rate": "Success Rate (%)",
+                              "play_strategy": "Play Strategy"},
+                      barmode="group")
+        data["figures"]["run_vs_pass_by_distance.html"] = fig6
+
+    return {"strategy_counts": strategy_counts, "strategy_success": strategy_success,
+            "distance_comparison": distance_comparison}
+
+
+@analysis("field_position", charts=["field_position_aggression.html", "field_position_success.html"])
+def field_position_analysis(data):
+    cube, go_cube = data["cube"], data["go_cube"]
+
+    # Field position analysis
+    print("\n=== FIELD POSITION ANALYSIS ===")
+
+    # Go-for-it rate by field position
+    field_aggression = go_rate_table(cube, "field_position", intervals=True)
+    field_aggression = field_aggression.sort_values("go_for_it_rate", ascending=False)
+
+    print("Go-for-it rate by field position:")
+    print(field_aggression)
+
+    # Success rate by field position (for go-for-it attempts)
+    field_success = success_rate_table(go_cube, "field_position", min_count=50)  # Only show positions with 50+ attempts
+
+    print("\nSuccess rate by field position (go-for-it attempts):")
+    print(field_success)
+
+    # Reorder data for visualization
+    field_aggression_ordered = field_aggression.reindex(FIELD_ORDER)
+    field_success_ordered = field_success.reindex(FIELD_ORDER)
+
+    # Create visualizations
+    if data["charts"]:
+        px = _px()
+        fig7 = px.bar(error_bars(field_aggression_ordered, "go_for_it_rate"),
+                      x="field_position", y="go_for_it_rate", error_y="error_plus", error_y_minus="error_minus",
+                      hover_data=["plays"] + INTERVAL_COLUMNS,
+                      title="4th Down Go-for-it Rate by Field Position (1999-2024)",
+                      labels={"field_position": "Field Position", "go_for_it_rate": "Go-for-it Rate (%)"})
+        fig7.update_xaxes(tickangle=45)
+        data["figures"]["field_position_aggression.html"] = fig7
+
+        fig8 = px.bar(error_bars(field_success_ordered, "success_rate"),
+                      x="field_position", y="success_rate", error_y="error_plus", error_y_minus="error_minus",
+                      hover_data=["attempts"] + INTERVAL_COLUMNS,
+                      title="4th Down Success Rate by Field Position (1999-2024)",
+                      labels={"field_position": "Field Position", "success_rate": "Success Rate (%)"})
+        fig8.update_xaxes(tickangle=45)
+        data["figures"]["field_position_success.html"] = fig8
+
+    return {"field_aggression": field_aggression_ordered, "field_success": field_success_ordered}
+
+
+@analysis("red_zone")
+def red_zone(data):
+    # Red zone vs non-red zone analysis
+    print("\n=== RED ZONE VS NON-RED ZONE ===")
+    red_zone_analysis = go_rate_table(data["cube"], "is_red_zone", intervals=True)
+    red_zone_analysis.index = ["Non-Red Zone", "Red Zone"]
+
+    print("Go-for-it rate: Red Zone vs Non-Red Zone")
+    print(red_zone_analysis)
+
+    return {"red_zone_analysis": red_zone_analysis}
+
+
+@analysis("yearly_trends", charts=["yearly_success_trends.html", "yearly_strategy_trends.html",
+          "yearly_field_position_trends.html", "yearly_time_trends.html"])
+def yearly_trends(data):
+    cube, go_cube = data["cube"], data["go_cube"]
+
+    # Yearly trends for all key metrics
+    print("\n=== YEARLY TRENDS ANALYSIS ===")
+
+    # 1. Yearly success rates
+    print("1. Success Rate Trends by Year")
+    yearly_success = success_rate_table(go_cube, "season")
+    print(yearly_success[["attempts", "success_rate"] + INTERVAL_COLUMNS])
+
+    # 2. Yearly run vs pass trends
+    print("\n2. Run vs Pass Trends by Year")
+    yearly_strategy = go_cube.groupby(["season", "play_strategy"])["plays"].sum().unstack(fill_value=0)
+    yearly_strategy_pct = yearly_strategy.div(yearly_strategy.sum(axis=1), axis=0) * 100
+    print("Run vs Pass percentage by year:")
+    print(yearly_strategy_pct[["run", "pass"]].round(1))
+
+    # 3. Yearly field position aggression trends
+    print("\n3. Field Position Aggression Trends by Year")
+    yearly_field_aggression = go_rate_table(cube, ["season", "field_position"])
+
+    # Show midfield and red zone trends specifically
+    midfield_trends = yearly_field_aggression.loc[(slice(None), ["Own 41-50", "Opp 40-49"]), :].unstack(level=1)
+    red_zone_trends = yearly_field_aggression.loc[(slice(None), ["Opp 10-19", "Opp 1-9"]), :].unstack(level=1)
+    print("Midfield go-for-it rate trends:")
+    print(midfield_trends.round(1))
+    print("\nRed zone go-for-it rate trends:")
+    print(red_zone_trends.round(1))
+
+    # 4. Yearly time-based aggression trends
+    print("\n4. Time-Based Aggression Trends by Year")
+    yearly_time_aggression = go_rate_table(cube, ["season", "time_category"])
+
+    # Show first half vs final 5 minutes trends
+    time_trends = yearly_time_aggression.loc[(slice(None), ["1st Half", "Final 5 Minutes"]), :].unstack(level=1)
+    print("First Half vs Final 5 Minutes go-for-it rate trends:")
+    print(time_trends.round(1))
+
+    if data["charts"]:
+        px = _px()
+        # Create comprehensive yearly trends visualization
+        fig9 = px.line(error_bars(yearly_success, "success_rate"),
+                       x="season", y="success_rate", error_y="error_plus", error_y_minus="error_minus",
+                       hover_data=["attempts"] + INTERVAL_COLUMNS,
+                       title="4th Down Success Rate Trends by Year (1999-2024)",
                        markers=True)
-        fig19.write_html("qb_sneak_success_trends.html")
-        print("QB sneak success trends chart saved as qb_sneak_success_trends.html")
-        
-else:
-    print("QB sneak column not found. Let's try to identify sneaks from play descriptions...")
-    
-    # Alternative: Try to identify sneaks from play descriptions
-    if "desc" in fourths_with_sneaks.columns:
-        print("Analyzing play descriptions for QB sneaks...")
-        # Look for common QB sneak patterns in descriptions
-        sneak_patterns = ["sneak", "qb sneak", "quarterback sneak"]
-        fourths_with_sneaks["is_sneak"] = fourths_with_sneaks["desc"].str.lower().str.contains("|".join(sneak_patterns), na=False)
-        
-        total_sneaks = fourths_with_sneaks["is_sneak"].sum()
-        print(f"Found {total_sneaks} potential QB sneaks from play descriptions")
-        
-        if total_sneaks > 0:
-            sneaks = fourths_with_sneaks[fourths_with_sneaks["is_sneak"] == True]
-            sneak_successful = sneaks["fourth_down_converted"].sum()
-            sneak_success_rate = (sneak_successful / total_sneaks) * 100
-            print(f"QB sneak success rate (from descriptions): {sneak_success_rate:.1f}%")
+        data["figures"]["yearly_success_trends.html"] = fig9
+
+        # Run vs Pass trends visualization
+        fig10 = px.line(yearly_strategy_pct.reset_index(),
+                        x="season", y=["run", "pass"],
+                        title="Run vs Pass Strategy Trends by Year (1999-2024)",
+                        markers=True)
+        data["figures"]["yearly_strategy_trends.html"] = fig10
+
+        # Field position trends visualization (midfield focus)
+        midfield_trends_clean = midfield_trends.reset_index()
+        midfield_trends_clean.columns = ["season", "Own_41_50", "Opp_40_49"]
+        fig11 = px.line(midfield_trends_clean,
+                        x="season", y=["Own_41_50", "Opp_40_49"],
+                        title="Midfield 4th Down Aggression Trends by Year (1999-2024)",
+                        markers=True)
+        data["figures"]["yearly_field_position_trends.html"] = fig11
+
+        # Time-based trends visualization
+        time_trends_clean = time_trends.reset_index()
+        time_trends_clean.columns = ["season", "First_Half", "Final_5_Minutes"]
+        fig12 = px.line(time_trends_clean,
+                        x="season", y=["First_Half", "Final_5_Minutes"],
+                        title="Time-Based 4th Down Aggression Trends by Year (1999-2024)",
+                        markers=True)
+        data["figures"]["yearly_time_trends.html"] = fig12
+
+    return {"yearly_success": yearly_success, "yearly_strategy_pct": yearly_strategy_pct,
+            "midfield_trends": midfield_trends, "red_zone_trends": red_zone_trends,
+            "time_trends": time_trends}
+
+
+@analysis("heatmaps", charts=["field_distance_heatmap.html", "field_distance_success_heatmap.html",
+          "time_field_heatmap.html", "yearly_field_heatmap.html"])
+def heatmaps(data):
+    cube, go_cube = data["cube"], data["go_cube"]
+    px = _px() if data["charts"] else None
+
+    # Heatmap Analysis
+    print("\n=== HEATMAP ANALYSIS ===")
+
+    # 1. Field Position vs Distance Heatmap (Go-for-it rates)
+    print("1. Creating Field Position vs Distance Heatmap")
+    field_distance_heatmap = go_rate_table(cube, ["field_position", "ydstogo"], intervals=True)
+
+    # Pivot for heatmap
+    field_distance_pivot = field_distance_heatmap["go_for_it_rate"].unstack(level=1, fill_value=0)
+
+    # Create heatmap
+    if px:
+        fig13 = px.imshow(field_distance_pivot,
+                          title="4th Down Go-for-it Rate Heatmap: Field Position vs Distance (1999-2024)",
+                          labels=dict(x="Yards to Go", y="Field Position", color="Go-for-it Rate (%)"),
+                          aspect="auto")
+        heatmap_hover(fig13, field_distance_heatmap, field_distance_pivot, count="plays")
+        data["figures"]["field_distance_heatmap.html"] = fig13
+
+    # 2. Field Position vs Distance Heatmap (Success rates)
+    print("2. Creating Field Position vs Distance Success Rate Heatmap")
+    # Only cells with sufficient sample sizes (20+ attempts)
+    field_distance_success = success_rate_table(go_cube, ["field_position", "ydstogo"], min_count=20)
+    field_distance_success_pivot = field_distance_success["success_rate"].unstack(level=1, fill_value=0)
+
+    # Create success rate heatmap
+    if px:
+        fig14 = px.imshow(field_distance_success_pivot,
+                          title="4th Down Success Rate Heatmap: Field Position vs Distance (1999-2024)",
+                          labels=dict(x="Yards to Go", y="Field Position", color="Success Rate (%)"),
+                          aspect="auto")
+        heatmap_hover(fig14, field_distance_success, field_distance_success_pivot)
+        data["figures"]["field_distance_success_heatmap.html"] = fig14
+
+    # 3. Time vs Field Position Heatmap
+    print("3. Creating Time vs Field Position Heatmap")
+    time_field_heatmap = go_rate_table(cube, ["time_category", "field_position"], intervals=True)
+
+    # Pivot for heatmap
+    time_field_pivot = time_field_heatmap["go_for_it_rate"].unstack(level=1, fill_value=0)
+
+    # Create time vs field position heatmap
+    if px:
+        fig15 = px.imshow(time_field_pivot,
+                          title="4th Down Go-for-it Rate Heatmap: Time vs Field Position (1999-2024)",
+                          labels=dict(x="Field Position", y="Time in Game", color="Go-for-it Rate (%)"),
+                          aspect="auto")
+        heatmap_hover(fig15, time_field_heatmap, time_field_pivot, count="plays")
+        data["figures"]["time_field_heatmap.html"] = fig15
+
+    # 4. Yearly Trends Heatmap (Field Position)
+    print("4. Creating Yearly Field Position Trends Heatmap")
+    yearly_field_heatmap = go_rate_table(cube, ["season", "field_position"], intervals=True)
+
+    # Pivot for heatmap
+    yearly_field_pivot = yearly_field_heatmap["go_for_it_rate"].unstack(level=1, fill_value=0)
+
+    # Create yearly field position heatmap
+    if px:
+        fig16 = px.imshow(yearly_field_pivot,
+                          title="4th Down Go-for-it Rate Heatmap: Year vs Field Position (1999-2024)",
+                          labels=dict(x="Field Position", y="Year", color="Go-for-it Rate (%)"),
+                          aspect="auto")
+        heatmap_hover(fig16, yearly_field_heatmap, yearly_field_pivot, count="plays")
+        data["figures"]["yearly_field_heatmap.html"] = fig16
+
+    return {"field_distance_pivot": field_distance_pivot,
+            "field_distance_success_pivot": field_distance_success_pivot,
+            "time_field_pivot": time_field_pivot, "yearly_field_pivot": yearly_field_pivot}
+
+
+@analysis("qb_sneak", charts=["qb_sneak_success_by_distance.html", "qb_sneak_usage_trends.html",
+          "qb_sneak_success_trends.html"])
+def qb_sneak(data):
+    go_cube = data["go_cube"]
+    results = {}
+
+    # QB Sneak Analysis
+    print("\n=== QB SNEAK ANALYSIS ===")
+
+    # QB-related columns straight from the parquet footers
+    qb_sneak_cols = [col for col in data["pbp_columns"] if 'sneak' in col.lower() or 'qb' in col.lower()]
+    print(f"QB-related columns: {qb_sneak_cols}")
+
+    # is_qb_sneak is classified once at ingest from player ids and descriptions (sneaks.py)
+    print("Identifying QB sneaks from rusher player IDs and play descriptions...")
+    short_yardage = go_cube[(go_cube["ydstogo"] <= 2).fillna(False)]
+    print(f"Total go-for-it attempts: {go_cube['plays'].sum()}")
+    print(f"Attempts with ydstogo <= 2: {short_yardage['plays'].sum()}")
+    if "qb_rush" in go_cube.columns:
+        print(f"Short-yardage attempts with a QB as rusher: {short_yardage['qb_rush'].sum()}")
+        print(f"Attempts described as sneaks: {go_cube['desc_sneak'].sum()}")
+
+    total_qb_sneaks_found = go_cube["qb_sneaks"].sum()
+    print(f"Found {total_qb_sneaks_found} QB sneaks")
+
+    if total_qb_sneaks_found > 0:
+        print("\n1. Overall QB Sneak Statistics")
+        total_go_attempts = go_cube["plays"].sum()
+        qb_sneaks = go_cube[go_cube["is_qb_sneak"] == True]
+        total_qb_sneaks = qb_sneaks["plays"].sum()
+
+        print(f"Total go-for-it attempts: {total_go_attempts}")
+        print(f"Total QB sneaks: {total_qb_sneaks}")
+        print(f"QB sneak percentage: {(total_qb_sneaks/total_go_attempts*100):.1f}%")
+
+        # QB Sneak success rate
+        if total_qb_sneaks > 0:
+            qb_sneak_successful = qb_sneaks["successful"].sum()
+            qb_sneak_success_rate = (qb_sneak_successful / total_qb_sneaks) * 100
+            print(f"QB sneak success rate: {qb_sneak_success_rate:.1f}%")
+
+            # Compare to non-sneak attempts
+            non_sneaks = go_cube[go_cube["is_qb_sneak"] == False]
+            non_sneak_successful = non_sneaks["successful"].sum()
+            non_sneak_plays = non_sneaks["plays"].sum()
+            non_sneak_success_rate = (non_sneak_successful / non_sneak_plays) * 100 if non_sneak_plays > 0 else 0
+            print(f"Non-sneak success rate: {non_sneak_success_rate:.1f}%")
+
+            # QB Sneak by distance
+            print("\n2. QB Sneak by Distance")
+            qb_sneak_distance = success_rate_table(qb_sneaks, "ydstogo", min_count=5)  # Min 5 attempts
+            print("QB Sneak success rate by distance:")
+            print(qb_sneak_distance)
+
+            # Yearly QB Sneak trends
+            print("\n3. Yearly QB Sneak Trends")
+            yearly_qb_sneaks = rate_table(go_cube, "season", "qb_sneaks", rate_name="qb_sneak_pct", denominator="plays")
+            yearly_qb_sneaks.columns = ["total_attempts", "qb_sneaks", "qb_sneak_pct"]
+
+            # QB Sneak success rate by year
+            yearly_qb_sneak_success = success_rate_table(qb_sneaks, "season")
+
+            print("Yearly QB sneak trends:")
+            print(yearly_qb_sneaks[["total_attempts", "qb_sneaks", "qb_sneak_pct"]])
+            print("\nYearly QB sneak success rates:")
+            print(yearly_qb_sneak_success[["attempts", "success_rate"] + INTERVAL_COLUMNS])
+
+            results = {"qb_sneak_distance": qb_sneak_distance, "yearly_qb_sneaks": yearly_qb_sneaks,
+                       "yearly_qb_sneak_success": yearly_qb_sneak_success}
+
+            # Create visualizations
+            if data["charts"]:
+                px = _px()
+                fig17 = px.bar(error_bars(qb_sneak_distance, "success_rate"),
+                               x="ydstogo", y="success_rate", error_y="error_plus", error_y_minus="error_minus",
+                               hover_data=["attempts"] + INTERVAL_COLUMNS,
+                               title="QB Sneak Success Rate by Distance (1999-2024)",
+                               labels={"ydstogo": "Yards to Go", "success_rate": "Success Rate (%)"})
+                data["figures"]["qb_sneak_success_by_distance.html"] = fig17
+
+                fig18 = px.line(yearly_qb_sneaks.reset_index(),
+                                x="season", y="qb_sneak_pct",
+                                title="QB Sneak Usage Trends by Year (1999-2024)",
+                                markers=True)
+                data["figures"]["qb_sneak_usage_trends.html"] = fig18
+
+                fig19 = px.line(error_bars(yearly_qb_sneak_success, "success_rate"),
+                                x="season", y="success_rate", error_y="error_plus", error_y_minus="error_minus",
+                                hover_data=["attempts"] + INTERVAL_COLUMNS,
+                                title="QB Sneak Success Rate Trends by Year (1999-2024)",
+                                markers=True)
+                data["figures"]["qb_sneak_success_trends.html"] = fig19
+
     else:
-        print("No QB sneak data available in this dataset")
+        print("No QB sneaks found: the data has no rusher player IDs or sneak descriptions")
+
+    return results
+
+
+@analysis("decisions", columns=["posteam", "wp", "epa"],
+          charts=["decision_regret_by_team.html", "decision_go_edge_heatmap.html"])
+def decision_engine(data):
+    fourths = data["fourths"]
+
+    # Go / punt / field goal recommendations from the historical expected points
+    print("\n=== DECISION ENGINE ===")
+    if fourths is None:
+        print("The decision engine grades individual plays, run without --stream")
+        return {}
+    if "epa" not in fourths.columns or "wp" not in fourths.columns:
+        print("No epa/wp columns in the data: the decision engine needs nflfastR's expected points and win probability")
+        return {}
+
+    table = build_decision_table(fourths)
+    table_path = save_decision_table(table, data["cache_dir"])
+    print(f"Decision table: {table['best'].size} situations, {(table['best'] >= 0).sum()} with a recommendation, "
+          f"saved to {table_path}")
+
+    # every historical decision against the table at once; relocated franchises count as one team
+    graded = grade_decisions(table, fourths).join(fourths[["season"]].assign(posteam=current_teams(fourths["posteam"])))
+    graded = graded.dropna(subset=["regret"])
+    graded["followed"] = graded["decision"] == graded["recommended"]
+    graded["missed_go"] = (graded["recommended"] == "go") & (graded["decision"] != "go")
+    print(f"Graded {len(graded)} of {len(fourths)} 4th downs")
+    print(f"Recommendation followed: {graded['followed'].mean() * 100:.1f}%")
+    print(f"Decision regret: {graded['regret'].mean():.3f} EPA per decision, {graded['regret'].sum():.1f} EPA in total")
+    print(f"Kicked when the table says go: {graded['missed_go'].sum()} times")
+
+    print("\n1. Recommended (rows) vs actual (columns) decisions")
+    decision_matrix = pd.crosstab(graded["recommended"], graded["decision"])
+    print(decision_matrix)
+
+    def regret_table(by):
+        return graded.groupby(by, observed=True).agg(
+            decisions=("regret", "size"), followed_pct=("followed", "mean"), missed_go=("missed_go", "sum"),
+            mean_regret=("regret", "mean"), total_regret=("regret", "sum"))
+
+    print("\n2. Decision regret by year")
+    yearly_regret = regret_table("season")
+    yearly_regret["followed_pct"] = (yearly_regret["followed_pct"] * 100).round(1)
+    print(yearly_regret.round(3))
+
+    print("\n3. Decision regret by team (most EPA given up per decision first)")
+    team_regret = regret_table("posteam").sort_values("mean_regret", ascending=False)
+    team_regret["followed_pct"] = (team_regret["followed_pct"] * 100).round(1)
+    print(team_regret.round(3))
+
+    if data["charts"]:
+        px = _px()
+        fig20 = px.bar(team_regret.reset_index(), x="posteam", y="mean_regret",
+                       hover_data=["decisions", "followed_pct", "missed_go", "total_regret"],
+                       title="4th Down Decision Regret by Team (EPA given up per decision)",
+                       labels={"posteam": "Team", "mean_regret": "Mean Regret (EPA)"})
+        data["figures"]["decision_regret_by_team.html"] = fig20
+
+        # EPA edge of going for it over the best kick, in a tied 3rd quarter
+        ev = table["ev"][:, :, :, TIME_ORDER.index("3rd Quarter"), WP_ORDER.index("WP 40-60%")]
+        go_edge = pd.DataFrame((ev[0] - np.fmax(ev[1], ev[2])).T,
+                               index=pd.RangeIndex(1, ev.shape[2] + 1, name="ydstogo"),
+                               columns=pd.RangeIndex(1, ev.shape[1] + 1, name="yardline_100"))
+        fig21 = px.imshow(go_edge, color_continuous_scale="RdBu", color_continuous_midpoint=0,
+                          title="Expected EPA of Going for It vs Kicking (3rd quarter, 40-60% win probability)",
+                          labels=dict(x="Yards from Opponent End Zone", y="Yards to Go", color="Go Edge (EPA)"),
+                          aspect="auto")
+        data["figures"]["decision_go_edge_heatmap.html"] = fig21
+
+    return {"decision_matrix": decision_matrix, "yearly_regret": yearly_regret, "team_regret": team_regret}
+
+
+@analysis("conversion_model", columns=["yardline_100"], charts=["conversion_probability_heatmap.html"])
+def conversion_model(data):
+    fourths = data["fourths"]
+
+    # Smoothed conversion probabilities instead of raw per-bin rates
+    print("\n=== CONVERSION PROBABILITY MODEL ===")
+    if fourths is None:
+        print("The conversion model is fitted on individual plays, run without --stream")
+        return {}
+    cells = conversion_cells(fourths)
+    if cells.empty:
+        print("No go-for-it attempts with a recorded result to fit on")
+        return {}
+
+    # the fitted model is cached next to the cube, keyed by the cells and hyperparameters it was fitted with
+    model = load_or_fit_conversion_model(cells, data["cache_dir"])
+    print(f"Logistic model on {len(cells)} situation cells ({cells['attempts'].sum()} attempts), "
+          f"{int(model['iterations'])} Newton steps")
+
+    # in-sample check: mean predicted vs observed conversion rate by distance
+    print("\n1. Model vs observed success rate by distance")
+    cells["predicted"] = predict(model, cells["yardline_100"], cells["ydstogo"], cells["play_type"],
+                                 cells["time_category"], cells["season"]) * cells["attempts"]
+    calibration = cells.groupby("ydstogo")[["attempts", "conversions", "predicted"]].sum()
+    calibration["success_rate"] = (calibration["conversions"] / calibration["attempts"] * 100).round(1)
+    calibration["model_rate"] = (calibration["predicted"] / calibration["attempts"] * 100).round(1)
+    calibration = calibration[["attempts", "success_rate", "model_rate"]]
+    print(calibration)
+
+    # every situation of the latest season at once, mixed over run/pass by the
+    # observed pass share at each distance and over the time buckets by attempts
+    grid = predict_grid(model)[..., -1]
+    distances = np.arange(1, grid.shape[2] + 1)
+    mix = cells.assign(ydstogo=cells["ydstogo"].clip(upper=distances[-1])).pivot_table(
+        index="ydstogo", columns="play_type", values="attempts", aggfunc="sum", fill_value=0)
+    mix = mix.reindex(index=distances, columns=PLAY_TYPES, fill_value=0) + mix.sum().reindex(PLAY_TYPES) / 100
+    play_weights = (mix / mix.to_numpy().sum(axis=1, keepdims=True)).to_numpy().T
+    time_weights = cells.groupby("time_category", observed=False)["attempts"].sum().reindex(TIME_ORDER).fillna(0)
+    time_weights = (time_weights / time_weights.sum()).to_numpy()
+    surface = np.einsum("pydt,pd,t->dy", grid, play_weights, time_weights)
+    conversion_surface = pd.DataFrame((surface * 100).round(1),
+                                      index=pd.Index(distances, name="ydstogo"),
+                                      columns=pd.Index(np.arange(1, grid.shape[1] + 1), name="yardline_100"))
+    season = int(model["seasons"][-1])
+    print(f"\n2. Modelled {season} conversion rate (%) by distance, selected yardlines")
+    print(conversion_surface.loc[[1, 2, 3, 5, 10, 15, 20], [1, 5, 10, 25, 50, 75, 95]])
+
+    if data["charts"]:
+        fig22 = _px().imshow(conversion_surface,
+                             title=f"Modelled 4th Down Conversion Probability ({season})",
+                             labels=dict(x="Yards from Opponent End Zone", y="Yards to Go",
+                                         color="Conversion Probability (%)"),
+                             aspect="auto")
+        data["figures"]["conversion_probability_heatmap.html"] = fig22
+
+    return {"calibration": calibration, "conversion_surface": conversion_surface}
+
+
+@analysis("team_aggression", columns=["posteam"], charts=["team_aggression_heatmap.html"])
+def team_aggression(data):
+    fourths = data["fourths"]
+
+    # Go-for-it and conversion tendencies of each team against the league in the same situations
+    print("\n=== TEAM AGGRESSION ANALYSIS ===")
+    if fourths is None:
+        print("The team breakdown counts individual plays by posteam, run without --stream")
+        return {}
+    if "posteam" not in fourths.columns:
+        print("No posteam column in the data")
+        return {}
+
+    counts, team_names, seasons = team_counts(fourths)
+    team_seasons = team_season_table(counts, team_names, seasons)
+    team_ranking = team_table(counts, team_names)
+    print(f"{len(team_names)} teams x {len(seasons)} seasons; index 100 = league average in the same "
+          f"season, field position, distance and time bucket")
+
+    print("\n1. Teams ranked by aggression index (all seasons)")
+    print(team_ranking)
+
+    print(f"\n2. Most aggressive team-seasons ({ROLLING_SEASONS}-season rolling index alongside)")
+    qualified = team_seasons[team_seasons["plays"] >= team_seasons["plays"].median() / 2]
+    print(qualified.nlargest(10, "aggression_index")[
+        ["plays", "go_rate", "success_rate", "aggression_index", "conversion_index", "rolling_aggression_index"]])
+
+    if data["charts"]:
+        aggression = team_seasons["aggression_index"].unstack("season").reindex(team_ranking.index)
+        fig23 = _px().imshow(aggression, color_continuous_scale="RdBu_r", color_continuous_midpoint=100,
+                             title="4th Down Aggression Index by Team and Season (100 = league average)",
+                             labels=dict(x="Season", y="Team", color="Aggression Index"),
+                             aspect="auto")
+        data["figures"]["team_aggression_heatmap.html"] = fig23
+
+    return {"team_ranking": team_ranking, "team_seasons": team_seasons}
+
+
+@analysis("win_probability", columns=["wp"], charts=["wp_rates_by_decile.html", "wp_field_position_heatmap.html",
+          "wp_yardline_heatmap.html", "wp_time_heatmap.html", "wp_field_position_success_heatmap.html",
+          "wp_time_success_heatmap.html"])
+def win_probability_analysis(data):
+    fourths = data["fourths"]
+
+    # Aggression and conversion conditioned on the offense's pre-snap win probability
+    print("\n=== WIN PROBABILITY ANALYSIS ===")
+    if fourths is None:
+        print("The win probability grids bin individual plays, run without --stream")
+        return {}
+    if "wp" not in fourths.columns:
+        print("No wp column in the data: this analysis needs nflfastR's win probability")
+        return {}
+
+    print("1. Go-for-it and success rates by win probability decile")
+    wp_deciles = wp_decile_table(fourths)
+    print(wp_deciles)
+
+    decile = wp_bins(fourths["wp"])
+    decile_index = pd.Index(wp_labels(), name="wp_decile")
+    go_rate, success_rate = grid_rates(grid_counts(fourths, decile, WP_DECILES,
+                                                   field_bins(fourths["field_position"]), len(FIELD_ORDER)))
+    field_columns = pd.Index(FIELD_ORDER, name="field_position")
+    wp_field = pd.DataFrame(go_rate, index=decile_index, columns=field_columns).round(1)
+    wp_field_success = pd.DataFrame(success_rate, index=decile_index, columns=field_columns).round(1)
+    print("\n2. Go-for-it rate (%) by win probability decile and field position")
+    print(wp_field)
+    print(f"\n3. Success rate (%) by win probability decile and field position ({MIN_CELL_PLAYS}+ attempts)")
+    print(wp_field_success)
+
+    go_rate, success_rate = grid_rates(grid_counts(fourths, decile, WP_DECILES,
+                                                   time_bins(fourths["time_category"]), len(TIME_ORDER)))
+    time_columns = pd.Index(TIME_ORDER, name="time_category")
+    wp_time = pd.DataFrame(go_rate, index=decile_index, columns=time_columns).round(1)
+    wp_time_success = pd.DataFrame(success_rate, index=decile_index, columns=time_columns).round(1)
+    print("\n4. Go-for-it rate (%) by win probability decile and time remaining")
+    print(wp_time)
+    print(f"\n5. Success rate (%) by win probability decile and time remaining ({MIN_CELL_PLAYS}+ attempts)")
+    print(wp_time_success)
+
+    # fine surfaces for the heatmaps: 2-point win probability bins by yardline and by minute left
+    with stage("analysis/win_probability/fine_grids", rows=len(fourths)):
+        fine = wp_bins(fourths["wp"], FINE_WP_BINS)
+        wp_index = pd.Index(wp_labels(FINE_WP_BINS), name="wp")
+        go_rate = grid_go_rate(grid_counts(fourths, fine, FINE_WP_BINS, yardline_bins(fourths["yardline_100"]), 99))
+        wp_yardline = pd.DataFrame(go_rate, index=wp_index, columns=pd.RangeIndex(1, 100, name="yardline_100"))
+        go_rate = grid_go_rate(grid_counts(fourths, fine, FINE_WP_BINS,
+                                           minute_bins(fourths["game_seconds_remaining"]), MINUTES))
+        wp_minutes = pd.DataFrame(go_rate, index=wp_index, columns=pd.RangeIndex(MINUTES, name="minutes_left"))
+
+    if data["charts"]:
+        px = _px()
+        fig24 = px.line(wp_deciles.reset_index(), x="wp_decile", y=["go_rate", "success_rate"],
+                        hover_data=["plays", "attempts"] + INTERVAL_COLUMNS,
+                        title="4th Down Go-for-it and Success Rates by Win Probability",
+                        labels={"wp_decile": "Offense Win Probability", "value": "Rate (%)"}, markers=True)
+        data["figures"]["wp_rates_by_decile.html"] = fig24
+
+        fig25 = px.imshow(wp_field, title="Go-for-it Rate by Win Probability and Field Position",
+                          labels=dict(x="Field Position", y="Win Probability", color="Go-for-it Rate (%)"),
+                          aspect="auto")
+        data["figures"]["wp_field_position_heatmap.html"] = fig25
+
+        fig26 = px.imshow(wp_yardline, origin="lower",
+                          title="Go-for-it Rate by Win Probability and Yardline",
+                          labels=dict(x="Yards from Opponent End Zone", y="Win Probability",
+                                      color="Go-for-it Rate (%)"),
+                          aspect="auto")
+        data["figures"]["wp_yardline_heatmap.html"] = fig26
+
+        fig27 = px.imshow(wp_minutes, origin="lower",
+                          title="Go-for-it Rate by Win Probability and Minutes Remaining",
+                          labels=dict(x="Minutes Remaining", y="Win Probability", color="Go-for-it Rate (%)"),
+                          aspect="auto")
+        fig27.update_xaxes(autorange="reversed")
+        data["figures"]["wp_time_heatmap.html"] = fig27
+
+        fig28 = px.imshow(wp_field_success, title="Success Rate by Win Probability and Field Position",
+                          labels=dict(x="Field Position", y="Win Probability", color="Success Rate (%)"),
+                          aspect="auto")
+        data["figures"]["wp_field_position_success_heatmap.html"] = fig28
+
+        fig29 = px.imshow(wp_time_success, title="Success Rate by Win Probability and Time Remaining",
+                          labels=dict(x="Time Remaining", y="Win Probability", color="Success Rate (%)"),
+                          aspect="auto")
+        data["figures"]["wp_time_success_heatmap.html"] = fig29
+
+    return {"wp_deciles": wp_deciles, "wp_field": wp_field, "wp_field_success": wp_field_success,
+            "wp_time": wp_time, "wp_time_success": wp_time_success,
+            "wp_yardline": wp_yardline, "wp_minutes": wp_minutes}
+
+
+def _analysis_key(name, data):
+    """Input key of an analysis: data fingerprint, parameters and code hash"""
+    spec = ANALYSES[name]
+    # every analysis reads the cube, so it stands in for the data, plus the
+    # row-level columns of the analyses that read more than the cube
+    rows = None
+    if spec["columns"] and data["fourths"] is not None:
+        row_cols = [col for col in CUBE_COLUMNS + spec["columns"] if col in data["fourths"].columns]
+        rows = frame_fingerprint(data["fourths"][row_cols])
+    return node_key(data=frame_fingerprint(data["cube"]), rows=rows, pbp_columns=sorted(data["pbp_columns"]),
+                    params={"years": years, "columns": spec["columns"]},
+                    code=code_hash(spec["func"], rates, intervals, decisions, conversion, teams, win_probability))
+
+
+def _chart_outputs(filename, charts_dir, images_dir, image_formats):
+    """Files written for one chart: its HTML and, when exporting, its static images"""
+    paths = [os.path.join(charts_dir, filename)]
+    if images_dir:
+        paths += image_paths(filename, images_dir, image_formats)
+    return paths
+
+
+def _outputs_exist(node, graph, cache_dir, charts, charts_dir, images_dir, image_formats):
+    if not os.path.exists(results_path(cache_dir, node["name"])):
+        return False
+    if not charts:
+        return True
+    # charts were not built on the run that stored these tables
+    if node["figures"] is None or not os.path.exists(os.path.join(charts_dir, PLOTLY_JS)):
+        return False
+    # every chart file must have been written by an earlier run and still be there
+    return all(path in graph["charts"] and os.path.exists(path)
+               for filename in node["figures"]
+               for path in _chart_outputs(filename, charts_dir, images_dir, image_formats))
+
+
+def _output_is_fresh(graph, path, fig_key):
+    return graph["charts"].get(path) == fig_key and os.path.exists(path)
+
+
+def _print_build_summary(rebuilt, reused, charts_rebuilt, charts_reused):
+    print("\n=== BUILD SUMMARY ===")
+    print(f"Tables rebuilt ({len(rebuilt)}): {', '.join(rebuilt) or '-'}")
+    print(f"Tables reused ({len(reused)}): {', '.join(reused) or '-'}")
+    print(f"Charts rebuilt ({len(charts_rebuilt)}): {', '.join(charts_rebuilt) or '-'}")
+    print(f"Charts reused ({len(charts_reused)}): {', '.join(charts_reused) or '-'}")
+
+
+def run_analyses(names=None, data_dir="pbp_data", workers=1, cache_dir="cache", use_cache=True,
+                 charts=True, charts_dir=".", render_workers=None, rebuild=False,
+                 images_dir=None, image_formats=("png",), stream=False, max_rows=100_000,
+                 report=None, flame=False, backend=DEFAULT_BACKEND):
+    """Run the named analyses (all of them by default) and return their result tables.
+
+    With charts=True the figures are written to charts_dir afterwards by
+    render_charts, on render_workers processes (default: one per CPU).
+    With images_dir set they are also exported there as static images, under
+    the file names the README uses. stream/max_rows select the bounded-memory
+    load (see load_data), backend the engine that builds the 4th down frame.
+
+    Runs are incremental: an analysis whose data fingerprint, parameters and
+    code hash match the last run (recorded in cache_dir/build_graph.json) is
+    not re-run, its stored tables and output are reused instead. Likewise an
+    HTML chart or image is only rewritten when its figure changed. rebuild=True
+    ignores the recorded graph.
+
+    Every stage (season loads, bucketing, the cube, each analysis, each chart
+    write) is timed and written as a run report to `report`, JSON or CSV by
+    extension (default: cache_dir/run_report.json). flame=True also prints
+    the stage timings as a tree.
+    """
+    names = list(ANALYSES) if names is None else list(names)
+    unknown = [name for name in names if name not in ANALYSES]
+    if unknown:
+        raise ValueError(f"unknown analyses: {', '.join(unknown)} (choose from {', '.join(ANALYSES)})")
+    if images_dir and not charts:
+        raise ValueError("exporting images needs the charts, drop --no-charts")
+
+    reset()
+    data = load_data(names, data_dir, workers, cache_dir, use_cache, stream, max_rows, backend)
+    data["charts"] = charts
+    graph = {"analyses": {}, "charts": {}} if rebuild else load_graph(cache_dir)
+    results, rebuilt, reused, charts_reused = {}, [], [], []
+
+    # run in registration order so the output reads the same whatever order --only lists
+    for name in [name for name in ANALYSES if name in names]:
+        with stage(f"analysis/{name}"):
+            key = _analysis_key(name, data)
+            node = graph["analyses"].get(name)
+            if node and node["key"] == key and _outputs_exist(node, graph, cache_dir, charts, charts_dir,
+                                                              images_dir, image_formats):
+                results[name], output = load_results(cache_dir, name)
+                print(output, end="")
+                reused.append(name)
+                if charts:
+                    charts_reused.extend(node["figures"])
+                continue
+
+            before = set(data["figures"])
+            # wide enough for the rate tables with their interval columns
+            with capture_output() as output, pd.option_context("display.width", 160, "display.max_columns", None):
+                results[name] = ANALYSES[name]["func"](data)
+            save_results(cache_dir, name, results[name], output.getvalue())
+            figures = [filename for filename in data["figures"] if filename not in before]
+            undeclared = [filename for filename in figures if filename not in ANALYSES[name]["charts"]]
+            if undeclared:
+                raise ValueError(f"{name} built charts it does not declare: {', '.join(undeclared)}")
+            graph["analyses"][name] = {"name": name, "key": key, "figures": figures if charts else None}
+            rebuilt.append(name)
+
+    charts_rebuilt = []
+    if charts:
+        stale_html, stale_images, fig_keys = {}, {}, {}
+        plotly_js_exists = os.path.exists(os.path.join(charts_dir, PLOTLY_JS))
+        for filename, fig in data["figures"].items():
+            fig_key = fig_keys[filename] = figure_hash(fig)
+            html_path, *images = _chart_outputs(filename, charts_dir, images_dir, image_formats)
+            if not (plotly_js_exists and _output_is_fresh(graph, html_path, fig_key)):
+                stale_html[filename] = fig
+            if not all(_output_is_fresh(graph, path, fig_key) for path in images):
+                stale_images[filename] = fig
+            if filename in stale_html or filename in stale_images:
+                charts_rebuilt.append(filename)
+            else:
+                charts_reused.append(filename)
+        render_charts(stale_html, charts_dir, render_workers)
+        if images_dir:
+            export_images(stale_images, images_dir, image_formats)
+        # record the hashes only once the files are written
+        for filename, fig_key in fig_keys.items():
+            for path in _chart_outputs(filename, charts_dir, images_dir, image_formats):
+                graph["charts"][path] = fig_key
+
+    save_graph(graph, cache_dir)
+    _print_build_summary(rebuilt, reused, charts_rebuilt, charts_reused)
+
+    # headline numbers for create_dashboard.py and create_presentation.py; the chart count is every chart
+    # the analyses declare, so it is the same with --no-charts, --only or reused analyses
+    chart_count = sum(len(spec["charts"]) for spec in ANALYSES.values())
+    summary_path = write_summary(build_summary(data["cube"], len(ANALYSES), chart_count), cache_dir)
+    print(f"Summary metrics saved to {summary_path}")
+    if flame:
+        flame_summary()
+    report_path = write_report(report or os.path.join(cache_dir, REPORT_FILE))
+    print(f"Run report saved to {report_path}")
+    return results
+
+
+def _mismatch(label, check, left, right):
+    try:
+        check(left, right)
+    except AssertionError as e:
+        return f"{label}: {str(e).strip().splitlines()[0]}"
+    return None
+
+
+def check_backend_parity(names=None, data_dir="pbp_data", cache_dir="cache"):
+    """Run the named analyses (all by default) on every backend and compare the outputs with pandas'.
+
+    Each backend builds the 4th down frame and the cube from the raw season
+    files (no store, no extract cache; only the seasons' quarterbacks come
+    from cache_dir's manifest) and the analyses run on them without charts. Returns the mismatches, "backend: what differs" strings, empty
+    when the frame, the cube and every result table are identical.
+    """
+    names = list(ANALYSES) if names is None else list(names)
+    outputs = {}
+    for backend in BACKENDS:
+        with tempfile.TemporaryDirectory() as scratch_dir, contextlib.redirect_stdout(io.StringIO()):
+            data = load_data(names, data_dir, cache_dir=scratch_dir, use_cache=False, backend=backend,
+                             ids_cache_dir=cache_dir)
+            data["charts"] = False
+            results = {name: ANALYSES[name]["func"](data) for name in ANALYSES if name in names}
+        outputs[backend] = data, results
+
+    reference, reference_results = outputs["pandas"]
+    mismatches = []
+    for backend in BACKENDS[1:]:
+        data, results = outputs[backend]
+        checks = [("fourths", pd.testing.assert_frame_equal, reference["fourths"], data["fourths"]),
+                  ("cube", pd.testing.assert_frame_equal, reference["cube"], data["cube"])]
+        for name, tables in reference_results.items():
+            for table, expected in (tables or {}).items():
+                actual = results[name][table]
+                check = (pd.testing.assert_frame_equal if isinstance(expected, pd.DataFrame)
+                         else pd.testing.assert_series_equal if isinstance(expected, pd.Series)
+                         else np.testing.assert_equal)
+                checks.append((f"{name}/{table}", check, expected, actual))
+        for label, check, expected, actual in checks:
+            mismatch = _mismatch(label, check, expected, actual)
+            if mismatch:
+                mismatches.append(f"{backend}: {mismatch}")
+    return mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="NFL 4th down decision analysis")
+    parser.add_argument("--only",
+                        help="comma separated analyses to run (default: all): " + ", ".join(ANALYSES))
+    parser.add_argument("--no-charts", action="store_true",
+                        help="print the tables only, without building the HTML charts")
+    parser.add_argument("--charts-dir", default=".",
+                        help="directory the HTML charts are written to (default: current directory)")
+    parser.add_argument("--render-workers", type=int, default=os.cpu_count(),
+                        help="processes writing the HTML charts (default: one per CPU)")
+    parser.add_argument("--export-images", nargs="?", const="chart_images", metavar="DIR",
+                        help="also export the charts as static images (default dir: chart_images)")
+    parser.add_argument("--image-format", default="png",
+                        help="comma separated image formats to export, e.g. png,svg (default: png)")
+    parser.add_argument("--data-dir", default="pbp_data",
+                        help="directory of the play_by_play_{year}.parquet files (default: pbp_data)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of seasons to decode in parallel (default: 1)")
+    parser.add_argument("--cache-dir", default="cache",
+                        help="directory of the 4th down extract cache and aggregate cube (default: cache)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="always decode the raw play-by-play files")
+    parser.add_argument("--stream", action="store_true",
+                        help="build the cube from record batches in bounded memory instead of loading all 4th downs")
+    parser.add_argument("--max-rows", type=int, default=100_000,
+                        help="rows per record batch in --stream mode (default: 100000)")
+    parser.add_argument("--backend", choices=BACKENDS, default=DEFAULT_BACKEND,
+                        help=f"engine that builds the 4th down frame and the cube (default: {DEFAULT_BACKEND})")
+    parser.add_argument("--check-parity", action="store_true",
+                        help="compare every backend's frame, cube and tables with pandas' and exit")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="re-run every analysis and rewrite every chart, even if unchanged")
+    parser.add_argument("--report", metavar="PATH",
+                        help="where to write the stage timings, .json or .csv (default: cache/run_report.json)")
+    parser.add_argument("--flame", action="store_true",
+                        help="print the stage timings as a tree at the end of the run")
+    args = parser.parse_args(argv)
+
+    names = args.only.split(",") if args.only else None
+    if args.check_parity:
+        mismatches = check_backend_parity(names, args.data_dir, args.cache_dir)
+        for mismatch in mismatches:
+            print(mismatch)
+        print(f"Backends {'differ' if mismatches else 'agree'}: {', '.join(BACKENDS)}")
+        raise SystemExit(1 if mismatches else 0)
+    try:
+        run_analyses(names, args.data_dir, args.workers, args.cache_dir,
+                     use_cache=not args.no_cache, charts=not args.no_charts,
+                     charts_dir=args.charts_dir, render_workers=args.render_workers,
+                     rebuild=args.rebuild, images_dir=args.export_images,
+                     image_formats=args.image_format.split(","),
+                     stream=args.stream, max_rows=args.max_rows,
+                     report=args.report, flame=args.flame, backend=args.backend)
+    except (ValueError, RuntimeError) as e:
+        parser.error(str(e))
+
+
+if __name__ == "__main__":
+    main()
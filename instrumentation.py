@@ -0,0 +1,140 @@
+import csv
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# How often the background thread samples the RSS for the peak memory deltas
+SAMPLE_SECONDS = 0.01
+REPORT_FILE = "run_report.json"
+REPORT_FIELDS = ["stage", "wall_seconds", "cpu_seconds", "peak_memory_delta_mb", "rows"]
+
+# Finished stage records, in the order they finished
+_records = []
+# Stages still running; the sampler raises their "_peak"
+_running = []
+_lock = threading.Lock()
+_sampler = None
+
+
+def rss_mb():
+    """Current resident set size in MB (the peak so far where /proc is missing)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and KB elsewhere
+        return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+
+
+def _sample():
+    while True:
+        time.sleep(SAMPLE_SECONDS)
+        rss = rss_mb()
+        with _lock:
+            for record in _running:
+                record["_peak"] = max(record["_peak"], rss)
+
+
+def _start_sampler():
+    global _sampler
+    with _lock:
+        if _sampler is None:
+            _sampler = threading.Thread(target=_sample, name="rss-sampler", daemon=True)
+            _sampler.start()
+
+
+@contextmanager
+def stage(name, rows=None):
+    """Record the block as one pipeline stage.
+
+    Measures wall time, process CPU time and the peak RSS above the RSS at
+    the start of the block. `name` is a "/"-separated path (e.g. "load/2017")
+    that flame_summary nests on. Yields the record, so a row count only known
+    at the end can be set with record["rows"] = n. Safe to use from threads.
+    """
+    _start_sampler()
+    start_rss = rss_mb()
+    record = {"stage": name, "rows": rows, "_start": start_rss, "_peak": start_rss}
+    with _lock:
+        _running.append(record)
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield record
+    finally:
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+        end_rss = rss_mb()
+        with _lock:
+            _running.remove(record)
+        peak = max(record.pop("_peak"), end_rss)
+        record["wall_seconds"] = round(wall, 4)
+        record["cpu_seconds"] = round(cpu, 4)
+        record["peak_memory_delta_mb"] = round(peak - record.pop("_start"), 1)
+        _records.append(record)
+
+
+def record(name, wall_seconds, cpu_seconds=None, peak_memory_delta_mb=None, rows=None):
+    """Add a stage measured elsewhere, e.g. in a worker process"""
+    _records.append({"stage": name, "rows": rows, "wall_seconds": round(wall_seconds, 4),
+                     "cpu_seconds": None if cpu_seconds is None else round(cpu_seconds, 4),
+                     "peak_memory_delta_mb": peak_memory_delta_mb})
+
+
+def records():
+    """The finished stages, as dicts with the REPORT_FIELDS keys"""
+    return [{field: rec.get(field) for field in REPORT_FIELDS} for rec in _records]
+
+
+def reset():
+    _records.clear()
+
+
+def write_report(path):
+    """Write the stages to `path`, as CSV when it ends in .csv and as JSON otherwise"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if path.endswith(".csv"):
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS)
+            writer.writeheader()
+            writer.writerows(records())
+    else:
+        with open(path, "w") as f:
+            json.dump({"stages": records()}, f, indent=2)
+    return path
+
+
+def flame_summary(width=40):
+    """Print the stages as a tree of wall times with bars relative to the whole run.
+
+    A stage's time is its own record when it has one, otherwise the sum of
+    the stages nested under it.
+    """
+    tree = {}
+    for rec in _records:
+        node = tree
+        for part in rec["stage"].split("/"):
+            node = node.setdefault(part, {"children": {}, "wall": None, "rows": None})
+            last = node
+            node = node["children"]
+        last["wall"] = (last["wall"] or 0) + rec["wall_seconds"]
+        last["rows"] = rec["rows"]
+
+    def total(node):
+        return node["wall"] if node["wall"] is not None else sum(total(c) for c in node["children"].values())
+
+    run_total = sum(total(node) for node in tree.values()) or 1.0
+
+    def show(children, depth):
+        for name, node in children.items():
+            seconds = total(node)
+            bar = "#" * round(seconds / run_total * width)
+            rows = f"  {node['rows']} rows" if node["rows"] is not None else ""
+            print(f"{'  ' * depth + name:<40} {bar:<{width}} {seconds:8.3f}s {seconds / run_total * 100:5.1f}%{rows}")
+            show(node["children"], depth + 1)
+
+    print("\n=== STAGE TIMINGS ===")
+    show(tree, 0)
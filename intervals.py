@@ -0,0 +1,84 @@
+import numpy as np
+
+# two-sided 95% normal quantile
+Z_95 = 1.959963984540054
+BOOTSTRAP_RESAMPLES = 2000
+# resamples x cells drawn per batch, bounds the bootstrap's memory (~32 MB of int64)
+BOOTSTRAP_BATCH = 4_000_000
+INTERVAL_COLUMNS = ["wilson_low", "wilson_high", "boot_low", "boot_high"]
+
+
+def wilson_interval(successes, trials, z=Z_95):
+    """Wilson score interval (%) of successes / trials, elementwise over count arrays.
+
+    Cells without trials get NaN.
+    """
+    successes = np.asarray(successes, dtype=float)
+    trials = np.asarray(trials, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        p = successes / trials
+        denom = 1 + z ** 2 / trials
+        center = (p + z ** 2 / (2 * trials)) / denom
+        half = z * np.sqrt(p * (1 - p) / trials + z ** 2 / (4 * trials ** 2)) / denom
+    return (center - half) * 100, (center + half) * 100
+
+
+def bootstrap_interval(successes, trials, resamples=BOOTSTRAP_RESAMPLES, level=0.95, seed=0):
+    """Percentile bootstrap interval (%) of successes / trials for every cell at once.
+
+    Resampling a cell's n plays with replacement gives Binomial(n, p) successes,
+    so each batch draws a (resamples, cells) matrix of binomial counts in one
+    NumPy call instead of looping over cells or plays. Cells are processed in
+    batches of BOOTSTRAP_BATCH draws. A fixed seed keeps reruns identical.
+    """
+    successes = np.asarray(successes, dtype=float)
+    trials = np.asarray(trials, dtype=np.int64)
+    low = np.full(len(trials), np.nan)
+    high = np.full(len(trials), np.nan)
+    cells = np.flatnonzero(trials > 0)
+    if len(cells) == 0:
+        return low, high
+
+    rng = np.random.default_rng(seed)
+    tails = [(1 - level) / 2 * 100, (1 + level) / 2 * 100]
+    step = max(1, BOOTSTRAP_BATCH // resamples)
+    for start in range(0, len(cells), step):
+        batch = cells[start:start + step]
+        n = trials[batch]
+        draws = rng.binomial(n, successes[batch] / n, size=(resamples, len(batch)))
+        low[batch], high[batch] = np.percentile(draws / n * 100, tails, axis=0)
+    return low, high
+
+
+def add_intervals(table, successes="successful", trials="attempts"):
+    """Add the Wilson and bootstrap 95% intervals (%) of every row of a rate table"""
+    table = table.copy()
+    wilson = wilson_interval(table[successes], table[trials])
+    boot = bootstrap_interval(table[successes], table[trials])
+    for name, values in zip(INTERVAL_COLUMNS, [*wilson, *boot]):
+        table[name] = np.round(values, 1)
+    return table
+
+
+def error_bars(table, rate_name):
+    """Reset the index and add the Wilson interval as error bar lengths for plotly express"""
+    bars = table.reset_index()
+    bars["error_plus"] = bars["wilson_high"] - bars[rate_name]
+    bars["error_minus"] = bars[rate_name] - bars["wilson_low"]
+    return bars
+
+
+def heatmap_hover(fig, table, pivot, count="attempts"):
+    """Put each cell's count and intervals into the hover of a px.imshow heatmap.
+
+    `table` is the two-level rate table and `pivot` the frame the heatmap
+    was drawn from; the cells are matched on the pivot's index and columns.
+    """
+    layers = [table[col].unstack(level=1).reindex(index=pivot.index, columns=pivot.columns)
+              for col in [count] + INTERVAL_COLUMNS]
+    fig.update_traces(
+        customdata=np.dstack([layer.to_numpy(dtype=float) for layer in layers]),
+        hovertemplate=("%{y}, %{x}<br>%{z:.1f}%<br>" + count + ": %{customdata[0]:.0f}"
+                       "<br>95% Wilson: %{customdata[1]:.1f} - %{customdata[2]:.1f}"
+                       "<br>95% bootstrap: %{customdata[3]:.1f} - %{customdata[4]:.1f}<extra></extra>"))
+    return fig
@@ -0,0 +1,278 @@
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from instrumentation import stage
+
+CACHE_FILE = "fourths.parquet"
+MANIFEST_FILE = "fourths_manifest.json"
+
+
+def pbp_path(year, data_dir="pbp_data"):
+    """Path of the nflverse play-by-play parquet file for one season"""
+    return os.path.join(data_dir, f"play_by_play_{year}.parquet")
+
+
+def available_columns(years, data_dir="pbp_data"):
+    """Union of the column names across the season files, read from the parquet footers only"""
+    columns = []
+    for year in years:
+        file_path = pbp_path(year, data_dir)
+        if os.path.exists(file_path):
+            for name in pq.read_schema(file_path).names:
+                if name not in columns:
+                    columns.append(name)
+    return columns
+
+
+def _row_groups_with_down(metadata, down):
+    """Indices of the row groups whose "down" statistics can contain the given down"""
+    down_idx = metadata.schema.names.index("down")
+    keep = []
+    for i in range(metadata.num_row_groups):
+        stats = metadata.row_group(i).column(down_idx).statistics
+        # No statistics means we can't rule the row group out
+        if stats is None or not stats.has_min_max:
+            keep.append(i)
+        elif stats.min <= down <= stats.max:
+            keep.append(i)
+    return keep
+
+
+def read_season_table(file_path, columns, down=4):
+    """Read only the requested columns of the 4th down plays in one season file.
+
+    Row groups that can't hold a 4th down (by their parquet min/max statistics)
+    are never decoded, and the remaining ones are decoded for `columns` only.
+    Columns missing from this season's file are skipped (concat fills them with NaN).
+    Returns the Arrow table plus a small dict of load stats.
+    """
+    start = time.perf_counter()
+    parquet_file = pq.ParquetFile(file_path)
+    metadata = parquet_file.metadata
+    row_groups = _row_groups_with_down(metadata, down)
+
+    columns = [c for c in columns if c in metadata.schema.names]
+    read_cols = columns if "down" in columns else columns + ["down"]
+    table = parquet_file.read_row_groups(row_groups, columns=read_cols)
+    table = table.filter(pc.equal(table["down"], down)).select(columns)
+
+    # Bytes read = compressed size of the column chunks we actually touched
+    col_idx = [metadata.schema.names.index(c) for c in read_cols]
+    bytes_read = sum(
+        metadata.row_group(i).column(j).total_compressed_size
+        for i in row_groups
+        for j in col_idx
+    )
+    stats = {
+        "rows": table.num_rows,
+        "row_groups_read": len(row_groups),
+        "row_groups_total": metadata.num_row_groups,
+        "bytes_read": bytes_read,
+        "seconds": time.perf_counter() - start,
+    }
+    return table, stats
+
+
+def load_season_fourths(file_path, columns, down=4):
+    """Same as read_season_table but returns a pandas DataFrame"""
+    table, stats = read_season_table(file_path, columns, down)
+    return table.to_pandas(), stats
+
+
+def _read_seasons(file_paths, columns, workers=1):
+    """Decode the given (year, path) season files, in parallel when workers > 1.
+
+    pyarrow releases the GIL while decompressing so a thread pool is enough.
+    Results come back in the order of `file_paths` so the output is deterministic.
+    """
+    def load(year_path):
+        year, path = year_path
+        with stage(f"load/{year}") as record:
+            table, stats = read_season_table(path, columns)
+            record["rows"] = stats["rows"]
+        return table, stats
+
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(load, file_paths))
+    else:
+        results = [load(year_path) for year_path in file_paths]
+
+    for (year, _), (_, stats) in zip(file_paths, results):
+        print(f"Loaded {stats['rows']} 4th downs from {year} "
+              f"({stats['bytes_read'] / 1e6:.1f} MB read, "
+              f"{stats['row_groups_read']}/{stats['row_groups_total']} row groups, "
+              f"{stats['seconds']:.2f}s)")
+    return [table for table, _ in results]
+
+
+def _existing_season_files(years, data_dir):
+    file_paths = [(year, pbp_path(year, data_dir)) for year in years]
+    return [(year, path) for year, path in file_paths if os.path.exists(path)]
+
+
+def load_fourths(years, columns, data_dir="pbp_data", workers=1, cache_dir=None, prepare=None):
+    """Load the 4th down plays for every available season into one DataFrame.
+
+    With workers > 1 the seasons are decoded concurrently, and the results are
+    still concatenated in season order. With a cache_dir the extract is served
+    from the 4th down cache (see load_fourths_table_cached). `prepare` is an
+    optional function applied to the combined Arrow table before it is
+    converted to pandas.
+    """
+    start = time.perf_counter()
+    if cache_dir:
+        table = load_fourths_table_cached(years, columns, data_dir, cache_dir, workers)
+    else:
+        file_paths = _existing_season_files(years, data_dir)
+        tables = _read_seasons(file_paths, columns, workers)
+        with stage("load/concat") as record:
+            table = pa.concat_tables(tables, promote_options="default")
+            record["rows"] = table.num_rows
+    print(f"Loaded {table.num_rows} 4th downs in {time.perf_counter() - start:.2f}s "
+          f"with {workers} worker(s)")
+    if prepare is not None:
+        with stage("load/prepare", rows=table.num_rows):
+            table = prepare(table)
+    with stage("load/to_pandas", rows=table.num_rows):
+        return table.to_pandas()
+
+
+def _file_sha256(file_path):
+    sha = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def _source_entry(file_path, columns):
+    """Manifest entry keying a season by its source file's size, mtime and sha256"""
+    file_stat = os.stat(file_path)
+    return {"size": file_stat.st_size, "mtime_ns": file_stat.st_mtime_ns, "sha256": _file_sha256(file_path),
+            "columns": list(columns)}
+
+
+def _read_manifest(manifest_path):
+    """(text, entries) of the manifest, ("", {}) when there is none"""
+    if not os.path.exists(manifest_path):
+        return "", {}
+    with open(manifest_path) as f:
+        manifest_text = f.read()
+    return manifest_text, json.loads(manifest_text)
+
+
+def _cache_entry_is_fresh(entry, file_path, columns):
+    """Check a manifest entry against the source file's size, mtime and hash.
+
+    Size and mtime are compared first; the file is only hashed when the mtime
+    moved, so a touched-but-identical file is still a cache hit.
+    """
+    # a slice extracted with more columns can serve a narrower request
+    if entry is None or not set(columns) <= set(entry["columns"]):
+        return False
+    file_stat = os.stat(file_path)
+    if entry["size"] != file_stat.st_size:
+        return False
+    if entry["mtime_ns"] == file_stat.st_mtime_ns:
+        return True
+    if entry["sha256"] == _file_sha256(file_path):
+        entry["mtime_ns"] = file_stat.st_mtime_ns
+        return True
+    return False
+
+
+def load_fourths_table_cached(years, columns, data_dir="pbp_data", cache_dir="cache", workers=1):
+    """Load the 4th down extract through a persistent per-season cache.
+
+    The cache is a single parquet file plus a JSON manifest that keys each
+    season's slice by its source file's size, mtime and sha256 and by the
+    projected column list. Only seasons whose key changed (or that are new,
+    or were cached without one of the requested columns) are decoded from
+    the raw play-by-play files; a warm run decodes none.
+    """
+    cache_path = os.path.join(cache_dir, CACHE_FILE)
+    manifest_path = os.path.join(cache_dir, MANIFEST_FILE)
+    # the manifest can exist without the extract when only per-season values were cached (cached_season_values)
+    manifest_text, manifest = _read_manifest(manifest_path)
+    cached = pq.read_table(cache_path) if os.path.exists(cache_path) and manifest else None
+
+    # rebuilt slices keep every column already cached so narrower runs don't shrink the cache
+    cache_columns = list(columns)
+    for entry in manifest.values():
+        cache_columns += [col for col in entry["columns"] if col not in cache_columns]
+
+    file_paths = _existing_season_files(years, data_dir)
+    stale = [(year, path) for year, path in file_paths
+             if cached is None or not _cache_entry_is_fresh(manifest.get(str(year)), path, columns)]
+    fresh_tables = dict(zip([year for year, _ in stale], _read_seasons(stale, cache_columns, workers)))
+
+    slices = []
+    new_manifest = {}
+    for year, path in file_paths:
+        if year in fresh_tables:
+            table = fresh_tables[year]
+            table = table.append_column("_source_year", pa.array([year] * table.num_rows, pa.int16()))
+            entry = _source_entry(path, cache_columns)
+            # values derived from an unchanged source (see cached_season_values) stay valid
+            old_entry = manifest.get(str(year))
+            if old_entry and old_entry["sha256"] == entry["sha256"]:
+                entry.update({name: value for name, value in old_entry.items() if name not in entry})
+            new_manifest[str(year)] = entry
+        else:
+            table = cached.filter(pc.equal(cached["_source_year"], year))
+            new_manifest[str(year)] = manifest[str(year)]
+        slices.append(table)
+
+    with stage("load/concat") as record:
+        table = pa.concat_tables(slices, promote_options="default")
+        record["rows"] = table.num_rows
+    print(f"4th down cache: {len(file_paths) - len(stale)} seasons reused, {len(stale)} rebuilt")
+    served = [col for col in columns if col in table.column_names]
+    if stale or len(new_manifest) != len(manifest):
+        os.makedirs(cache_dir, exist_ok=True)
+        pq.write_table(table, cache_path, compression="zstd")
+    new_manifest_text = json.dumps(new_manifest, indent=2)
+    if new_manifest_text != manifest_text:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(manifest_path, "w") as f:
+            f.write(new_manifest_text)
+    return table.select(served)
+
+
+def cached_season_values(file_paths, cache_dir, name, compute):
+    """Per-season values derived from the source files, kept in the 4th down cache manifest.
+
+    `compute(file_path)` returns a JSON-able value for one season file. It is
+    stored under `name` in the season's manifest entry and reused while the
+    entry is fresh (same size, mtime and sha256), so it is only recomputed for
+    seasons whose source changed. A season without a current entry gets one
+    with no extracted columns, which load_fourths_table_cached fills in
+    later, keeping the values.
+    """
+    manifest_path = os.path.join(cache_dir, MANIFEST_FILE)
+    manifest_text, manifest = _read_manifest(manifest_path)
+
+    values = {}
+    for year, path in file_paths:
+        entry = manifest.get(str(year))
+        if not _cache_entry_is_fresh(entry, path, []):
+            entry = manifest[str(year)] = _source_entry(path, [])
+        if name not in entry:
+            with stage(f"load/{name}/{year}"):
+                entry[name] = compute(path)
+        values[year] = entry[name]
+
+    new_manifest_text = json.dumps(manifest, indent=2)
+    if new_manifest_text != manifest_text:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(manifest_path, "w") as f:
+            f.write(new_manifest_text)
+    return values
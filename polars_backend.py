@@ -0,0 +1,182 @@
+"""Lazy Polars execution of the row-level pipeline: load, QB sneak flags, dtypes, buckets, indicators, cube.
+
+The pandas modules (pbp_loader, sneaks, schema, bucketing, rates, cube) are
+the reference. This module expresses the same steps as one lazy Polars query
+over the season files, so Polars pushes the column projection and the
+down == 4 filter into the parquet scan, runs the row-level expressions and the
+cube's group-by on all cores, and only then hands pandas the finished frame and
+cube, with the pandas path's columns, dtypes and categories (see
+fourth_down_scripts.check_backend_parity).
+"""
+import os
+
+import pandas as pd
+import polars as pl
+import pyarrow as pa
+
+from bucketing import FIELD_EDGES, FIELD_ORDER, TIME_EDGES, TIME_ORDER
+from cube import CUBE_AXES, FLAG_MEASURES
+from pbp_loader import _existing_season_files, cached_season_values, pbp_path
+from rates import GO_PLAY_TYPES
+from schema import FOURTHS_DTYPES
+from sneaks import GSIS_ID_PATTERN, MIN_QB_PASSES, SEASON_KEY, SNEAK_PATTERN, roster_path
+
+# schema.FOURTHS_DTYPES as Polars types; categories are made in pandas, from strings
+POLARS_DTYPES = {"int16": pl.Int16, "Int8": pl.Int8, "float32": pl.Float32, "boolean": pl.Boolean,
+                 "category": pl.String}
+# pandas dtypes of the derived columns (Arrow's int8/bool come back nullable otherwise)
+DERIVED_DTYPES = {"is_qb_sneak": "bool", "qb_rush": "bool", "desc_sneak": "bool",
+                  "is_go": "int8", "decision": "str", "is_red_zone": "bool"}
+_NULLABLE = {pa.int8(): pd.Int8Dtype(), pa.bool_(): pd.BooleanDtype()}
+
+
+def _columns(path):
+    return pl.scan_parquet(path).collect_schema().names()
+
+
+def _id_codes(ids):
+    """sneaks.player_id_codes as a Polars expression"""
+    ids = ids.cast(pl.String)
+    return pl.when(ids.str.contains(GSIS_ID_PATTERN)).then(ids.str.replace_all("-", "", literal=True)).cast(pl.Int32)
+
+
+def _season_keys(season, ids):
+    """sneaks.season_player_keys as a Polars expression"""
+    return season.cast(pl.Int64) * SEASON_KEY + ids.cast(pl.Int64)
+
+
+def season_passer_ids(pbp):
+    """sneaks.season_passer_ids: sorted ids of the players with MIN_QB_PASSES+ passes in one season file"""
+    passers = (pl.scan_parquet(pbp).select(_id_codes(pl.col("passer_player_id")).alias("id")).drop_nulls()
+               .group_by("id").len().filter(pl.col("len") >= MIN_QB_PASSES).collect())
+    return sorted(passers["id"].to_list())
+
+
+def qb_player_ids(years, data_dir="pbp_data", cache_dir=None):
+    """sneaks.qb_player_ids: (season, player) keys of roster QBs, or of a season's main passers without a roster.
+
+    The passers share sneaks' per-season cache in the 4th down cache manifest.
+    """
+    scans, passer_seasons = [], []
+    for year in years:
+        roster, pbp = roster_path(year, data_dir), pbp_path(year, data_dir)
+        if os.path.exists(roster):
+            scans.append(pl.scan_parquet(roster).filter(pl.col("position") == "QB")
+                         .select(_season_keys(pl.lit(year), _id_codes(pl.col("gsis_id"))).alias("key")))
+        elif os.path.exists(pbp) and "passer_player_id" in _columns(pbp):
+            passer_seasons.append((year, pbp))
+    if cache_dir:
+        passers = cached_season_values(passer_seasons, cache_dir, f"qb_passers_{MIN_QB_PASSES}", season_passer_ids)
+    else:
+        passers = {year: season_passer_ids(pbp) for year, pbp in passer_seasons}
+    scans += [pl.LazyFrame({"key": [year * SEASON_KEY + player for player in ids]}, schema={"key": pl.Int64})
+              for year, ids in passers.items()]
+    if not scans:
+        return pl.Series("key", [], pl.Int64)
+    return pl.concat(scans).unique().drop_nulls().collect()["key"]
+
+
+def scan_fourths(years, columns, data_dir="pbp_data", down=4):
+    """Lazy frame of the 4th downs of every available season, `columns` only.
+
+    A column missing from some seasons is null there, as in the pandas
+    concat; columns no season has are left out.
+    """
+    scans, available = [], set()
+    for _, path in _existing_season_files(years, data_dir):
+        present = [col for col in columns if col in _columns(path)]
+        available.update(present)
+        scans.append(pl.scan_parquet(path).filter(pl.col("down") == down).select(present))
+    return pl.concat(scans, how="diagonal_relaxed").select([col for col in columns if col in available])
+
+
+def prepare_fourths(fourths, qb_ids):
+    """The pandas path's row-level steps on a lazy frame of 4th downs.
+
+    sneaks.classify_qb_sneaks, schema.apply_schema,
+    bucketing.add_situation_categories (as integer codes) and
+    rates.add_indicators, adding the columns in the same order.
+    """
+    schema = fourths.collect_schema()
+
+    def column_or(name, default):
+        return pl.col(name) if name in schema else pl.lit(default)
+
+    rusher = _id_codes(column_or("rusher_player_id", None))
+    qb_rush = _season_keys(pl.col("season"), rusher).is_in(qb_ids.implode()).fill_null(False)
+    desc_sneak = column_or("desc", None).cast(pl.String).str.contains(f"(?i){SNEAK_PATTERN}").fill_null(False)
+    short_run = ((pl.col("play_type") == "run") & (pl.col("ydstogo") <= 2)).fill_null(False)
+    scramble = (column_or("qb_scramble", 0) == 1).fill_null(False)
+    fourths = fourths.with_columns(
+        is_qb_sneak=short_run & (qb_rush | desc_sneak) & ~scramble, qb_rush=qb_rush, desc_sneak=desc_sneak)
+
+    # NaN is missing to pandas but compares greater than any number in Polars
+    casts = []
+    for col, dtype in FOURTHS_DTYPES.items():
+        if col in schema:
+            values = pl.col(col).fill_nan(None) if schema[col].is_float() else pl.col(col)
+            casts.append(values.cast(POLARS_DTYPES[dtype]))
+    fourths = fourths.with_columns(casts)
+
+    # bucket code = number of edges below the value, as np.searchsorted(side="left")
+    seconds, yardline = pl.col("game_seconds_remaining"), pl.col("yardline_100")
+    time_code = len(TIME_EDGES) - pl.sum_horizontal([(seconds > edge).fill_null(False) for edge in TIME_EDGES])
+    field_code = pl.when(yardline.is_null()).then(len(FIELD_EDGES)).otherwise(
+        pl.sum_horizontal([yardline > edge for edge in FIELD_EDGES]))
+    is_go = pl.col("play_type").is_in(GO_PLAY_TYPES).fill_null(False)
+    return fourths.with_columns(
+        time_category=time_code.cast(pl.Int8), field_position=field_code.cast(pl.Int8),
+    ).with_columns(
+        is_go=is_go.cast(pl.Int8),
+        decision=pl.when(is_go).then(pl.lit("go")).otherwise(pl.lit("kick")),
+        is_red_zone=(yardline >= 80).fill_null(False),
+    )
+
+
+def _bucket_categories(frame):
+    frame["time_category"] = pd.Categorical.from_codes(frame["time_category"].to_numpy(dtype="int8"),
+                                                       categories=TIME_ORDER, ordered=True)
+    frame["field_position"] = pd.Categorical.from_codes(frame["field_position"].to_numpy(dtype="int8"),
+                                                        categories=FIELD_ORDER, ordered=True)
+    return frame
+
+
+def to_pandas(fourths):
+    """The prepared Polars frame as the pandas path's frame: same columns, dtypes and categories"""
+    frame = fourths.to_arrow().to_pandas(types_mapper=_NULLABLE.get)
+    dtypes = {col: dtype for col, dtype in FOURTHS_DTYPES.items() if dtype == "category" and col in frame.columns}
+    dtypes.update({col: dtype for col, dtype in DERIVED_DTYPES.items() if col in frame.columns})
+    return _bucket_categories(frame.astype(dtypes))
+
+
+def build_cube(fourths, play_types):
+    """cube.build_cube on the prepared Polars frame, as a pandas frame.
+
+    One group-by over CUBE_AXES, sorted like pandas' (category codes, missing
+    keys last). `play_types` are the categories of the pandas frame's
+    play_type column, which the cube's play_type keeps.
+    """
+    flags = {flag: pl.col(flag).sum() for flag in FLAG_MEASURES if flag in fourths.columns}
+    cube = (fourths.group_by(CUBE_AXES)
+            .agg(plays=pl.len(), go=pl.col("is_go").sum(), attempts=pl.col("fourth_down_converted").count(),
+                 successful=pl.col("fourth_down_converted").sum(), **flags)
+            .sort(CUBE_AXES, nulls_last=True))
+    measures = [col for col in cube.columns if col not in CUBE_AXES]
+    cube = cube.with_columns(pl.col(measures).cast(pl.Int64)).to_arrow().to_pandas(types_mapper=_NULLABLE.get)
+    cube = _bucket_categories(cube.astype({"play_type": pd.CategoricalDtype(play_types), "decision": "str",
+                                           "is_red_zone": "bool", "is_qb_sneak": "bool"}))
+    cube["qb_sneaks"] = cube["plays"].where(cube["is_qb_sneak"], 0)
+    return cube
+
+
+def load_prepared(years, columns, data_dir="pbp_data", cache_dir=None, qb_ids=None):
+    """The prepared 4th down frame and its cube, both as pandas frames, from one lazy query.
+
+    `qb_ids` are the seasons' quarterbacks from qb_player_ids, looked up
+    (in cache_dir's 4th down cache manifest, if given) when not passed.
+    """
+    if qb_ids is None:
+        qb_ids = qb_player_ids(years, data_dir, cache_dir)
+    fourths = prepare_fourths(scan_fourths(years, columns, data_dir), qb_ids).collect()
+    frame = to_pandas(fourths)
+    return frame, build_cube(fourths, frame["play_type"].cat.categories)
@@ -0,0 +1,315 @@
+"""Local HTTP/JSON service answering ad-hoc 4th down questions from memory.
+
+The 4th downs are loaded once (through the same cache as the analysis) and
+pre-aggregated into one row per combination of DIMENSIONS; every query
+filters and groups that table, so answers take milliseconds instead of a
+pipeline run. Endpoints, all GET:
+
+    /query       filters as DIMENSION=values plus group_by=dim1,dim2
+                 values are comma lists ("play_type=run,pass"); the numeric
+                 dimensions also take ranges ("season=2018-2024", "season=2018-");
+                 a leading "-" is a sign ("ydstogo=-1" is the value -1); a repeated
+                 key adds values ("play_type=run&play_type=pass")
+    /dimensions  the dimensions and the values they take
+    /metrics     request counts and latency percentiles per endpoint
+    /health      liveness and row counts
+
+    python query_service.py --port 8000
+    curl 'localhost:8000/query?field_position=Opp 30-39&ydstogo=2&time_category=Final 5 Minutes&season=2018-&group_by=season'
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import OrderedDict, defaultdict, deque
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from bucketing import add_situation_categories
+from pbp_loader import available_columns, load_fourths
+from rates import add_indicators
+from schema import apply_schema
+from sneaks import qb_player_ids
+from store import load_store, store_key, store_path
+
+DIMENSIONS = ["season", "week", "posteam", "qtr", "field_position", "ydstogo", "play_type", "time_category"]
+NUMERIC_DIMENSIONS = ["season", "week", "qtr", "ydstogo"]
+MEASURES = ["plays", "go", "attempts", "successful"]
+LOAD_COLUMNS = ["season", "week", "posteam", "qtr", "game_seconds_remaining", "yardline_100", "ydstogo",
+                "play_type", "fourth_down_converted"]
+# latencies kept per endpoint for the percentiles
+LATENCY_WINDOW = 10_000
+RESULT_CACHE_SIZE = 1024
+
+
+class QueryError(ValueError):
+    """A malformed query, answered with HTTP 400"""
+
+
+def build_aggregates(fourths):
+    """One row per combination of the available DIMENSIONS with the MEASURES counts"""
+    dims = [dim for dim in DIMENSIONS if dim in fourths.columns]
+    converted = fourths["fourth_down_converted"]
+    is_go = fourths["is_go"] == 1
+    measures = fourths[dims].assign(
+        plays=1,
+        go=is_go.astype("int64"),
+        attempts=(is_go & converted.notna()).astype("int64"),
+        successful=(is_go & (converted == 1)).fillna(False).astype("int64"),
+    )
+    return measures.groupby(dims, observed=True, dropna=False)[MEASURES].sum().reset_index()
+
+
+def _parse_filter(dim, values):
+    if _is_range(dim, values):
+        # a leading "-" is a negative number's sign, the range separator is the next one
+        separator = values.find("-", 1)
+        low, high = values[:separator].strip(), values[separator + 1:].strip()
+        try:
+            return ("range", float(low) if low else -np.inf, float(high) if high else np.inf)
+        except ValueError:
+            raise QueryError(f"bad range for {dim}: {values!r}") from None
+    items = [item.strip() for item in values.split(",") if item.strip()]
+    if dim in NUMERIC_DIMENSIONS:
+        try:
+            items = [float(item) for item in items]
+        except ValueError:
+            raise QueryError(f"{dim} takes numbers or a low-high range, got {values!r}") from None
+    return ("in", items)
+
+
+def _is_range(dim, values):
+    """Whether a filter value is a low-high range of a numeric dimension (see _parse_filter)"""
+    return dim in NUMERIC_DIMENSIONS and values.find("-", 1) > 0
+
+
+def _rates(sums):
+    """Measures plus go_rate and success_rate (%), None where undefined"""
+    plays, go, attempts, successful = (np.asarray(sums[m]) for m in MEASURES)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        go_rate = np.round(go / plays * 100, 1)
+        success_rate = np.round(successful / attempts * 100, 1)
+    columns = {"plays": plays, "go": go, "attempts": attempts, "successful": successful,
+               "go_rate": go_rate, "success_rate": success_rate}
+    return [{name: (None if np.isnan(values[i]) else values[i].item()) for name, values in columns.items()}
+            for i in range(len(plays))]
+
+
+class QueryService:
+    """The aggregates plus the request metrics, shared by every connection.
+
+    Each dimension is kept as integer codes into its sorted distinct values,
+    so a filter is a lookup of the allowed codes and a group-by is one
+    bincount per measure over the combinations of codes that occur, all in
+    NumPy.
+    """
+
+    def __init__(self, aggregates):
+        self.aggregates = aggregates
+        self.dimensions = [dim for dim in DIMENSIONS if dim in aggregates.columns]
+        self.measures = {m: aggregates[m].to_numpy(dtype="int64") for m in MEASURES}
+        self.codes, self.values = {}, {}
+        for dim in self.dimensions:
+            codes, values = pd.factorize(aggregates[dim], sort=True, use_na_sentinel=True)
+            # missing values get the last code, shown as null
+            self.codes[dim] = np.where(codes < 0, len(values), codes)
+            self.values[dim] = list(values.tolist()) + [None]
+        self.started = time.time()
+        self.latencies = defaultdict(lambda: deque(maxlen=LATENCY_WINDOW))
+        self.counts = defaultdict(int)
+        self.errors = 0
+        self.connections = 0
+        self._results = OrderedDict()
+
+    def _allowed_codes(self, dim, values):
+        """Boolean lookup over a dimension's codes: which of its values pass the filter"""
+        kind, *spec = _parse_filter(dim, values)
+        if kind == "range":
+            low, high = spec
+            return np.array([value is not None and low <= value <= high for value in self.values[dim]])
+        wanted = set(spec[0])
+        return np.array([value in wanted for value in self.values[dim]])
+
+    def query(self, params):
+        """Filter and group the aggregates; params is a list of (name, value) pairs"""
+        group_by, filters = [], {}
+        for name, value in params:
+            if name == "group_by":
+                dims = [dim.strip() for dim in value.split(",") if dim.strip()]
+                group_by += [dim for dim in dict.fromkeys(dims) if dim not in group_by]
+            elif name in filters:
+                # a repeated key adds values: ?play_type=run&play_type=pass is play_type=run,pass
+                if _is_range(name, filters[name]) or _is_range(name, value):
+                    raise QueryError(f"{name} is given more than once; a range can't be combined with other values")
+                filters[name] = f"{filters[name]},{value}"
+            else:
+                filters[name] = value
+        for dim in list(filters) + group_by:
+            if dim not in self.dimensions:
+                raise QueryError(f"unknown dimension {dim!r} (choose from {', '.join(self.dimensions)})")
+
+        # identical questions are answered from a small LRU cache
+        key = (tuple(sorted(filters.items())), tuple(group_by))
+        if key in self._results:
+            self._results.move_to_end(key)
+            return self._results[key]
+
+        mask = np.ones(len(self.aggregates), dtype=bool)
+        for dim, values in filters.items():
+            mask &= self._allowed_codes(dim, values)[self.codes[dim]]
+        selected = {m: values[mask] for m, values in self.measures.items()}
+
+        result = {"filters": filters, "group_by": group_by,
+                  "total": _rates({m: [values.sum()] for m, values in selected.items()})[0]}
+        if group_by:
+            shape = [len(self.values[dim]) for dim in group_by]
+            # the full cross-product of the dimensions is too large to allocate, so only
+            # the combinations that occur get a group, in the order of their raveled codes
+            raveled = np.ravel_multi_index([self.codes[dim][mask] for dim in group_by], shape)
+            present, group = np.unique(raveled, return_inverse=True)
+            sums = {m: np.bincount(group, weights=values, minlength=len(present)).astype("int64")
+                    for m, values in selected.items()}
+            rows = _rates(sums)
+            for row, index in zip(rows, zip(*np.unravel_index(present, shape))):
+                row.update({dim: self.values[dim][i] for dim, i in zip(group_by, index)})
+            result["rows"] = [{**{dim: row.pop(dim) for dim in group_by}, **row} for row in rows]
+
+        self._results[key] = result
+        if len(self._results) > RESULT_CACHE_SIZE:
+            self._results.popitem(last=False)
+        return result
+
+    def describe(self):
+        values = {}
+        for dim in self.dimensions:
+            present = [value for value in self.values[dim] if value is not None]
+            values[dim] = present[:1] + present[-1:] if dim in NUMERIC_DIMENSIONS else present
+        return {"dimensions": values, "numeric": [dim for dim in NUMERIC_DIMENSIONS if dim in values],
+                "measures": MEASURES}
+
+    def metrics(self):
+        endpoints = {}
+        for path, latencies in self.latencies.items():
+            ms = np.array(latencies) * 1000
+            p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+            endpoints[path] = {"requests": self.counts[path], "p50_ms": round(p50, 3), "p95_ms": round(p95, 3),
+                               "p99_ms": round(p99, 3), "max_ms": round(ms.max(), 3)}
+        return {"uptime_seconds": round(time.time() - self.started, 1), "open_connections": self.connections,
+                "errors": self.errors, "cached_results": len(self._results), "endpoints": endpoints}
+
+    def handle(self, target):
+        """Route one request target to (status, JSON-able body)"""
+        url = urlsplit(target)
+        path = unquote(url.path)
+        if path == "/query":
+            return 200, self.query(parse_qsl(url.query, keep_blank_values=True))
+        if path == "/dimensions":
+            return 200, self.describe()
+        if path == "/metrics":
+            return 200, self.metrics()
+        if path == "/health":
+            return 200, {"status": "ok", "aggregate_rows": len(self.aggregates),
+                         "plays": int(self.aggregates["plays"].sum())}
+        return 404, {"error": f"no endpoint {path}"}
+
+    async def serve_connection(self, reader, writer):
+        """Answer requests on one connection until the client closes it (keep-alive).
+
+        Queries take milliseconds, so they run on the event loop itself; the
+        loop interleaves the connections of concurrent clients between requests.
+        """
+        self.connections += 1
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                # GET only; a body sent anyway is skipped
+                await reader.readexactly(int(headers.get("content-length", 0)))
+
+                start = time.perf_counter()
+                method, target, *_ = request_line.decode("latin-1").split() + ["", ""]
+                if method != "GET":
+                    status, body = 405, {"error": "only GET is supported"}
+                else:
+                    try:
+                        status, body = self.handle(target)
+                    except QueryError as e:
+                        status, body = 400, {"error": str(e)}
+                    except Exception as e:
+                        # a failing request is answered and counted, the connection stays up
+                        status, body = 500, {"error": f"internal error: {type(e).__name__}: {e}"}
+                payload = json.dumps(body).encode("utf-8")
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(
+                    f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + payload)
+                await writer.drain()
+
+                path = urlsplit(target).path
+                self.latencies[path].append(time.perf_counter() - start)
+                self.counts[path] += 1
+                self.errors += status >= 400
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+
+def load_service(years, data_dir="pbp_data", cache_dir="cache", workers=1):
+    """Load the 4th downs once and build the service's aggregates.
+
+    The prepared frame is memory-mapped from the analysis run's store when it
+    is current, otherwise it is built through the 4th down cache.
+    """
+    pbp_columns = available_columns(years, data_dir)
+    columns = [col for col in LOAD_COLUMNS if col in pbp_columns]
+    key = store_key(years, data_dir, qb_player_ids(years, data_dir, cache_dir))
+    fourths = load_store(cache_dir, key, columns)
+    if fourths is None:
+        fourths = load_fourths(years, columns, data_dir, workers=workers, cache_dir=cache_dir)
+        fourths = add_indicators(add_situation_categories(apply_schema(fourths)))
+    else:
+        print(f"4th down store: {len(fourths)} prepared rows memory-mapped from {store_path(cache_dir)}")
+    return QueryService(build_aggregates(fourths))
+
+
+async def serve(service, host="127.0.0.1", port=8000):
+    server = await asyncio.start_server(service.serve_connection, host, port)
+    host, port = server.sockets[0].getsockname()[:2]
+    print(f"Serving {int(service.aggregates['plays'].sum())} 4th downs "
+          f"({len(service.aggregates)} aggregate rows) on http://{host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    from fourth_down_scripts import years
+
+    parser = argparse.ArgumentParser(description="Serve 4th down aggregates over HTTP/JSON on localhost")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000, help="port to listen on, 0 picks a free one (default: 8000)")
+    parser.add_argument("--data-dir", default="pbp_data")
+    parser.add_argument("--cache-dir", default="cache")
+    parser.add_argument("--workers", type=int, default=1, help="seasons decoded in parallel at startup")
+    args = parser.parse_args(argv)
+
+    service = load_service(years, args.data_dir, args.cache_dir, args.workers)
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
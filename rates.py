@@ -0,0 +1,69 @@
+import numpy as np
+
+from intervals import add_intervals
+
+GO_PLAY_TYPES = ["run", "pass"]
+
+
+def add_indicators(fourths):
+    """Add the indicator columns the rate tables and the cube aggregate over"""
+    fourths["is_go"] = fourths["play_type"].isin(GO_PLAY_TYPES).astype("int8")
+    fourths["decision"] = np.where(fourths["is_go"] == 1, "go", "kick")
+    # missing yardlines/distances (pd.NA in the nullable Int columns) count as False
+    fourths["is_red_zone"] = (fourths["yardline_100"] >= 80).fillna(False).astype(bool)
+    # QB sneaks are classified on the Arrow table at ingest (see sneaks.classify_qb_sneaks)
+    if "is_qb_sneak" not in fourths.columns:
+        fourths["is_qb_sneak"] = False
+    return fourths
+
+
+def outcome_arrays(fourths):
+    """Go-for-it, attempt (go with a recorded result) and conversion flags of every row.
+
+    float64 arrays, ready to be the weights of np.bincount grids.
+    """
+    go = fourths["is_go"].to_numpy(dtype="float64")
+    converted = fourths["fourth_down_converted"].to_numpy(dtype="float64", na_value=np.nan)
+    attempt = go * ~np.isnan(converted)
+    return go, attempt, attempt * np.nan_to_num(converted)
+
+
+def rate_table(df, by, numerator, min_count=0, rate_name="success_rate", counts=True,
+               denominator=None, intervals=False):
+    """Percentage of rows per group where `numerator` is set.
+
+    Runs on the native groupby count/sum path, no per-group Python calls.
+    With a `denominator` the frame is already aggregated (e.g. the cube) and
+    both columns are summed instead of counting rows.
+    Returns attempts / successful / rate_name columns, or only the rate
+    column when counts=False. Groups with fewer than min_count attempts
+    are dropped. intervals=True adds the Wilson and bootstrap 95% intervals
+    of every group (see intervals.add_intervals).
+    """
+    if denominator is None:
+        table = df.groupby(by, observed=True)[numerator].agg(["count", "sum"])
+    else:
+        table = df.groupby(by, observed=True)[[denominator, numerator]].sum()
+    table.columns = ["attempts", "successful"]
+    table[rate_name] = (table["successful"] / table["attempts"] * 100).round(1)
+    if min_count:
+        table = table[table["attempts"] >= min_count]
+    if intervals:
+        table = add_intervals(table)
+    return table if counts else table[[rate_name]]
+
+
+def success_rate_table(cube, by, min_count=0):
+    """Conversion rate (%) per group from a cube of go-for-it attempts, with its 95% intervals"""
+    return rate_table(cube, by, "successful", min_count, denominator="attempts", intervals=True)
+
+
+def go_rate_table(cube, by, min_count=0, intervals=False):
+    """Go-for-it rate (%) per group from the cube, as a single go_for_it_rate column.
+
+    intervals=True also returns the plays and go-for-it attempts per group
+    and the rate's 95% intervals.
+    """
+    table = rate_table(cube, by, "go", min_count, rate_name="go_for_it_rate", counts=intervals,
+                       denominator="plays", intervals=intervals)
+    return table.rename(columns={"attempts": "plays", "successful": "go"})
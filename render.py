@@ -0,0 +1,137 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from instrumentation import record, stage
+
+PLOTLY_JS = "plotly.min.js"
+
+# HTML chart -> static image name used by the README (extension is per format)
+IMAGE_NAMES = {
+    "first_chart.html": "GoVsKick(199-2024)",
+    "yearly_trends.html": "4thDownDevisionTrend",
+    "success_rate_by_distance.html": "SuccessRateByDistance",
+    "time_aggression.html": "AttRateByTime",
+    "run_vs_pass_success.html": "RunVsPassSuccessRate",
+    "run_vs_pass_by_distance.html": "AttSucessRateByRunvsPass",
+    "field_position_aggression.html": "4thAttByFieldPos",
+    "field_position_success.html": "SuccessRateByFieldPos",
+    "yearly_success_trends.html": "AttSuccessRatePerYear",
+    "yearly_strategy_trends.html": "RunVSPassTrendByYear",
+    "yearly_field_position_trends.html": "Midfield4thDownAggressionByYear",
+    "yearly_time_trends.html": "AttAggressionByTimeYearly",
+    "field_distance_heatmap.html": "4thAttFieldPosHeatmap",
+    "field_distance_success_heatmap.html": "FieldPosVsDistHeatmap",
+    "time_field_heatmap.html": "AttByTimeAndFieldPos",
+    "yearly_field_heatmap.html": "AttRateByYearAndFieldPos",
+    "qb_sneak_success_by_distance.html": "QBSneakSuccessRateVsYTG",
+    "qb_sneak_usage_trends.html": "QBSneakUsageYearly",
+    "qb_sneak_success_trends.html": "QBSneakSuccessRateYearly",
+}
+# size of the images already in chart_images/
+IMAGE_WIDTH, IMAGE_HEIGHT = 1454, 715
+
+
+def write_plotly_js(out_dir="."):
+    """Write the plotly.js bundle the HTML charts share, once per output directory"""
+    import plotly.offline
+
+    path = os.path.join(out_dir, PLOTLY_JS)
+    bundle = plotly.offline.get_plotlyjs()
+    # skip the write when the bundle on disk is already this plotly version's
+    if not os.path.exists(path) or os.path.getsize(path) != len(bundle.encode("utf-8")):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(bundle)
+    return path
+
+
+def _render_one(filename, fig_dict, out_dir):
+    """Write one figure as HTML that references the shared plotly.js (runs in a worker)"""
+    import plotly.io as pio
+
+    start, cpu = time.perf_counter(), time.process_time()
+    path = os.path.join(out_dir, filename)
+    pio.write_html(fig_dict, path, include_plotlyjs=PLOTLY_JS)
+    return filename, time.perf_counter() - start, time.process_time() - cpu, os.path.getsize(path)
+
+
+def render_charts(figures, out_dir=".", workers=None):
+    """Write every figure in `figures` (filename -> plotly Figure) as HTML.
+
+    Figures are handed to a process pool as plain dicts and serialized
+    concurrently. Instead of embedding plotly.js in each file they all load
+    one shared plotly.min.js next to them. Returns a list of
+    (filename, seconds, bytes) in the order of `figures`.
+    """
+    if not figures:
+        return []
+    os.makedirs(out_dir, exist_ok=True)
+    write_plotly_js(out_dir)
+
+    start = time.perf_counter()
+    with stage("render", rows=len(figures)):
+        with stage("render/to_dict", rows=len(figures)):
+            jobs = [(filename, fig.to_dict(), out_dir) for filename, fig in figures.items()]
+        workers = workers or os.cpu_count() or 1
+        if workers > 1 and len(jobs) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+                timed = list(pool.map(_render_one, *zip(*jobs)))
+        else:
+            timed = [_render_one(*job) for job in jobs]
+    # write_html ran in the workers, so their timings are recorded from the results
+    results = []
+    for filename, seconds, cpu_seconds, size in timed:
+        record(f"render/{filename}", seconds, cpu_seconds)
+        results.append((filename, seconds, size))
+
+    print("\n=== CHART RENDERING ===")
+    for filename, seconds, size in results:
+        print(f"{filename:<40} {size / 1e3:>8.1f} KB  {seconds:.2f}s")
+    total_size = sum(size for _, _, size in results)
+    print(f"Rendered {len(results)} charts ({total_size / 1e6:.1f} MB) in "
+          f"{time.perf_counter() - start:.2f}s with {min(workers, len(jobs))} worker(s)")
+    return results
+
+
+def image_paths(filename, out_dir="chart_images", formats=("png",)):
+    """Static image paths of one HTML chart, one per format"""
+    stem = IMAGE_NAMES.get(filename, os.path.splitext(filename)[0])
+    return [os.path.join(out_dir, f"{stem}.{fmt}") for fmt in formats]
+
+
+def export_images(figures, out_dir="chart_images", formats=("png",), tabs=4):
+    """Write every figure in `figures` (filename -> plotly Figure) as static images.
+
+    All images go through one Kaleido session, i.e. one headless Chrome with
+    `tabs` pages rendering concurrently, instead of a browser launch per
+    image. plotly.js comes from the installed plotly package and MathJax is
+    off, so nothing is fetched from the network. Returns the written paths.
+    """
+    if not figures:
+        return []
+    import kaleido
+    from kaleido.errors import ChromeNotFoundError
+
+    os.makedirs(out_dir, exist_ok=True)
+    specs = []
+    for filename, fig in figures.items():
+        fig_dict = fig.to_dict()
+        for fmt, path in zip(formats, image_paths(filename, out_dir, formats)):
+            specs.append({"fig": fig_dict, "path": path,
+                          "opts": {"format": fmt, "width": IMAGE_WIDTH, "height": IMAGE_HEIGHT, "scale": 1}})
+
+    start = time.perf_counter()
+    try:
+        with stage("export_images", rows=len(specs)):
+            errors = kaleido.write_fig_from_object_sync(
+                specs, kopts={"n": min(tabs, len(specs)), "mathjax": False})
+    except ChromeNotFoundError:
+        raise RuntimeError("static image export needs Chrome; run `plotly_get_chrome` once to install it") from None
+    if errors:
+        raise RuntimeError(f"{len(errors)} image(s) failed to export: {errors[0]}")
+
+    paths = [spec["path"] for spec in specs]
+    print("\n=== IMAGE EXPORT ===")
+    print(f"Exported {len(paths)} images ({', '.join(formats)}) to {out_dir} in "
+          f"{time.perf_counter() - start:.2f}s")
+    return paths
@@ -0,0 +1,30 @@
+# Compact dtypes for the combined 4th down frame. The nullable Int/boolean
+# types keep missing values (e.g. no yardline on some penalties) without
+# falling back to float64.
+FOURTHS_DTYPES = {
+    "season": "int16",
+    "week": "Int8",
+    "posteam": "category",
+    "defteam": "category",
+    "yardline_100": "Int8",
+    "ydstogo": "Int8",
+    "down": "Int8",
+    "play_type": "category",
+    "wp": "float32",
+    "epa": "float32",
+    "fourth_down_converted": "boolean",
+    "fourth_down_failed": "boolean",
+    "qtr": "Int8",
+    "game_seconds_remaining": "float32",
+}
+
+
+def memory_mb(df):
+    """Deep memory usage of a DataFrame in MB"""
+    return df.memory_usage(deep=True).sum() / 1e6
+
+
+def apply_schema(fourths):
+    """Cast the columns of the 4th down frame that appear in FOURTHS_DTYPES"""
+    dtypes = {col: dtype for col, dtype in FOURTHS_DTYPES.items() if col in fourths.columns}
+    return fourths.astype(dtypes)
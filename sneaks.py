@@ -0,0 +1,119 @@
+import os
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from pbp_loader import cached_season_values, pbp_path
+
+# One case-insensitive pattern for "sneak", "QB sneak", "quarterback sneak", ...
+# compiled once into the match options and applied to the Arrow strings directly
+SNEAK_PATTERN = "sneak"
+SNEAK_MATCH = pc.MatchSubstringOptions(SNEAK_PATTERN, ignore_case=True)
+# nflverse GSIS player ids look like "00-0033873"
+GSIS_ID_PATTERN = r"^\d{2}-\d{7}$"
+# Columns the classifier reads, when the season files have them
+SNEAK_COLUMNS = ["rusher_player_id", "desc", "qb_scramble"]
+# Without a roster a player is one of a season's quarterbacks from this many passes that season,
+# so a running back's or receiver's trick-play passes don't make him one
+MIN_QB_PASSES = 10
+# A (season, player) pair as one int64: season * SEASON_KEY + the player's id code
+SEASON_KEY = 1_000_000_000
+
+
+def roster_path(year, data_dir="pbp_data"):
+    """Path of the nflverse roster file for one season (optional)"""
+    return os.path.join(data_dir, f"roster_{year}.parquet")
+
+
+def player_id_codes(ids):
+    """GSIS player ids as int32 (e.g. "00-0033873" -> 33873); missing or malformed ids are null"""
+    ids = pc.cast(ids, pa.string())
+    valid = pc.match_substring_regex(ids, GSIS_ID_PATTERN)
+    digits = pc.replace_substring(ids, "-", "")
+    return pc.cast(pc.if_else(valid, digits, pa.scalar(None, pa.string())), pa.int32())
+
+
+def season_player_keys(season, ids):
+    """(season, player id code) pairs as int64 keys (see SEASON_KEY); null where the id is"""
+    return pc.add(pc.multiply(pc.cast(season, pa.int64()), SEASON_KEY), pc.cast(ids, pa.int64()))
+
+
+def season_passer_ids(pbp):
+    """Sorted integer ids of the players with at least MIN_QB_PASSES passes in one season file.
+
+    Only the id column is read, one record batch at a time.
+    """
+    codes = [player_id_codes(batch.column(0))
+             for batch in pq.ParquetFile(pbp).iter_batches(columns=["passer_player_id"])]
+    if not codes:
+        return []
+    counts = pc.value_counts(pc.drop_null(pa.concat_arrays(codes)))
+    passers = counts.field("values").filter(pc.greater_equal(counts.field("counts"), MIN_QB_PASSES))
+    return sorted(passers.to_pylist())
+
+
+def _roster_qb_ids(roster):
+    table = pq.read_table(roster, columns=["gsis_id", "position"])
+    return pc.drop_null(pc.unique(player_id_codes(table.filter(pc.equal(table["position"], "QB"))["gsis_id"])))
+
+
+def qb_player_ids(years, data_dir="pbp_data", cache_dir=None):
+    """The quarterbacks of each of the given seasons, as (season, player) keys (see season_player_keys).
+
+    Uses the roster's position == "QB" where a roster_{year}.parquet exists,
+    otherwise the players with at least MIN_QB_PASSES passes that season.
+    Counting the passes of every play of a season is the expensive part, so
+    with a cache_dir the passers are kept per season in the 4th down cache
+    manifest and only re-read for seasons whose file changed (see
+    pbp_loader.cached_season_values).
+    """
+    keys, passer_seasons = [], []
+    for year in years:
+        roster, pbp = roster_path(year, data_dir), pbp_path(year, data_dir)
+        if os.path.exists(roster):
+            ids = _roster_qb_ids(roster)
+            keys.append(season_player_keys(pa.repeat(pa.scalar(year), len(ids)), ids))
+        elif os.path.exists(pbp) and "passer_player_id" in pq.read_schema(pbp).names:
+            passer_seasons.append((year, pbp))
+    if cache_dir:
+        # the threshold is part of the name, so changing it recomputes the cached passers
+        passers = cached_season_values(passer_seasons, cache_dir, f"qb_passers_{MIN_QB_PASSES}", season_passer_ids)
+    else:
+        passers = {year: season_passer_ids(pbp) for year, pbp in passer_seasons}
+    keys += [season_player_keys(pa.repeat(pa.scalar(year), len(ids)), pa.array(ids, pa.int64()))
+             for year, ids in passers.items()]
+    if not keys:
+        return pa.array([], pa.int64())
+    return pc.unique(pa.concat_arrays(keys))
+
+
+def _column_or(table, name, default):
+    if name in table.column_names:
+        return table[name]
+    return pa.repeat(pa.scalar(default), table.num_rows)
+
+
+def classify_qb_sneaks(table, qb_ids):
+    """Add the QB sneak flags to an Arrow table of 4th downs.
+
+    is_qb_sneak   run play with 2 or fewer yards to go where the rusher is a
+                  quarterback (by player id) or the description says sneak,
+                  scrambles excluded
+    qb_rush       the rusher is one of that season's quarterbacks; qb_ids
+                  are (season, player) keys from qb_player_ids
+    desc_sneak    the description mentions a sneak
+    All three are plain booleans, computed with Arrow kernels only.
+    """
+    rusher = player_id_codes(_column_or(table, "rusher_player_id", None))
+    qb_rush = pc.fill_null(pc.is_in(season_player_keys(table["season"], rusher), value_set=qb_ids), False)
+    desc_sneak = pc.fill_null(
+        pc.match_substring_regex(pc.cast(_column_or(table, "desc", None), pa.string()), options=SNEAK_MATCH), False)
+
+    short_run = pc.fill_null(pc.and_(pc.equal(table["play_type"], "run"), pc.less_equal(table["ydstogo"], 2)), False)
+    scramble = pc.fill_null(pc.equal(_column_or(table, "qb_scramble", 0), 1), False)
+    is_qb_sneak = pc.and_(pc.and_(short_run, pc.or_(qb_rush, desc_sneak)), pc.invert(scramble))
+
+    return (table.append_column("is_qb_sneak", is_qb_sneak)
+                 .append_column("qb_rush", qb_rush)
+                 .append_column("desc_sneak", desc_sneak))
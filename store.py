@@ -0,0 +1,115 @@
+"""Memory-mapped Arrow IPC store of the prepared 4th down frame.
+
+The 4th downs with their derived columns (compact dtypes, situation buckets,
+indicators, QB sneak flags) are written once to cache/fourths.arrow,
+uncompressed, so readers memory-map the file instead of decoding it:
+opening it only parses the footer, and the column buffers are the OS page
+cache's pages, shared by every process that maps the same file (open_store).
+Only numeric columns without missing values stay zero-copy when converted to
+pandas (load_store); categoricals, strings, booleans and the nullable
+columns are copied into every pandas reader
+(`benchmarks/store_sharing.py` measures both).
+
+The store is keyed by the season files it was built from (size and mtime),
+by the quarterbacks its QB sneak flags were classified against and by the
+code that derives its columns, so it is rebuilt whenever any of them
+changes. It is replaced by a rename, so a process that still has the old
+file mapped keeps reading a consistent copy.
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+import pyarrow as pa
+
+import bucketing
+import rates
+import schema
+import sneaks
+from build_graph import code_hash, node_key
+from pbp_loader import pbp_path
+
+STORE_FILE = "fourths.arrow"
+_KEY = b"fourths_store_key"
+_COLUMNS = b"fourths_store_columns"
+
+
+def store_path(cache_dir="cache"):
+    return os.path.join(cache_dir, STORE_FILE)
+
+
+def store_key(years, data_dir="pbp_data", qb_ids=()):
+    """Key of the store for these seasons: the source files' size and mtime, the quarterbacks and the deriving code.
+
+    `qb_ids` are the (season, player) keys the QB sneak flags are classified
+    against (sneaks.qb_player_ids), so a changed roster rebuilds the store.
+    Only the file metadata is read, so checking the store costs a few stat calls.
+    """
+    sources = []
+    for year in years:
+        path = pbp_path(year, data_dir)
+        if os.path.exists(path):
+            stat = os.stat(path)
+            sources.append([year, stat.st_size, stat.st_mtime_ns])
+    qbs = hashlib.sha256(np.sort(np.asarray(qb_ids, dtype=np.int64)).tobytes()).hexdigest()
+    return node_key(sources=sources, qbs=qbs, code=code_hash(schema, bucketing, rates.add_indicators, sneaks))
+
+
+def stored_columns(cache_dir="cache"):
+    """The play-by-play columns the current store was loaded with (whatever its key), from its schema only"""
+    path = store_path(cache_dir)
+    if not os.path.exists(path):
+        return []
+    metadata = pa.ipc.open_file(pa.memory_map(path)).schema.metadata or {}
+    return json.loads(metadata.get(_COLUMNS, b"[]"))
+
+
+def write_store(fourths, cache_dir="cache", key="", columns=()):
+    """Write the prepared frame to the store; `columns` are the play-by-play columns it was loaded with"""
+    table = pa.Table.from_pandas(fourths, preserve_index=False)
+    metadata = {**(table.schema.metadata or {}), _KEY: key.encode(), _COLUMNS: json.dumps(list(columns)).encode()}
+    table = table.replace_schema_metadata(metadata)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    path = store_path(cache_dir)
+    tmp_path = path + ".tmp"
+    with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp_path, path)
+    return path
+
+
+def open_store(cache_dir="cache", key=None, columns=None):
+    """The store as a memory-mapped Arrow table, or None when it is missing or stale.
+
+    With a `key` the store must have been built under that key, and with
+    `columns` it must have been loaded with (at least) those play-by-play
+    columns; the others are left out so the table looks like a fresh load
+    of `columns`. Workers in other processes call this themselves instead
+    of being sent a copy of the rows.
+    """
+    path = store_path(cache_dir)
+    if not os.path.exists(path):
+        return None
+    table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+    metadata = table.schema.metadata or {}
+    if key is not None and metadata.get(_KEY, b"").decode() != key:
+        return None
+    if columns is not None:
+        stored = json.loads(metadata.get(_COLUMNS, b"[]"))
+        if not set(columns) <= set(stored):
+            return None
+        table = table.drop_columns([col for col in stored if col not in columns and col in table.column_names])
+    return table
+
+
+def load_store(cache_dir="cache", key=None, columns=None):
+    """The store as a pandas DataFrame (see open_store), or None.
+
+    The numeric columns without missing values are views of the mapped
+    pages; the others are converted into this process's memory.
+    """
+    table = open_store(cache_dir, key, columns)
+    # split_blocks keeps each column in its own block, so pandas doesn't copy them into 2D blocks
+    return None if table is None else table.to_pandas(split_blocks=True)
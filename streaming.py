@@ -0,0 +1,70 @@
+import time
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from bucketing import add_situation_categories
+from cube import build_cube, merge_cubes
+from instrumentation import stage
+from pbp_loader import _existing_season_files, _row_groups_with_down
+from rates import add_indicators
+from schema import apply_schema
+
+
+def iter_fourth_batches(file_path, columns, max_rows=100_000, down=4, prepare=None):
+    """Yield the 4th downs of one season file as DataFrames of at most max_rows rows.
+
+    Reads record batches of max_rows rows from the row groups that can hold a
+    4th down, so neither the season nor its 4th downs are ever materialized
+    whole. Requested columns missing from the file come back as all-null,
+    like the concatenated in-memory load. `prepare` is applied to each Arrow
+    batch before the conversion to pandas, as in load_fourths.
+    """
+    parquet_file = pq.ParquetFile(file_path)
+    metadata = parquet_file.metadata
+    present = [c for c in columns if c in metadata.schema.names]
+    read_cols = present if "down" in present else present + ["down"]
+
+    batches = parquet_file.iter_batches(batch_size=max_rows, columns=read_cols,
+                                        row_groups=_row_groups_with_down(metadata, down))
+    for batch in batches:
+        batch = batch.filter(pc.equal(batch["down"], down))
+        if batch.num_rows == 0:
+            continue
+        table = pa.Table.from_batches([batch]).select(present)
+        for col in columns:
+            if col not in present:
+                table = table.append_column(col, pa.nulls(table.num_rows))
+        table = table.select(columns)
+        if prepare is not None:
+            table = prepare(table)
+        yield table.to_pandas()
+
+
+def stream_cube(years, columns, data_dir="pbp_data", max_rows=100_000, prepare=None):
+    """Build the aggregate cube batch by batch, with at most max_rows 4th downs in memory.
+
+    Each batch goes through the same schema, bucketing and indicator steps as
+    the in-memory load, is aggregated into a partial cube and merged into the
+    running one. The cube's measures are counts, so the result is identical to
+    build_cube over all rows at once, while peak memory stays flat as seasons
+    are added.
+    """
+    start = time.perf_counter()
+    cube = None
+    total_rows = 0
+    for year, path in _existing_season_files(years, data_dir):
+        with stage(f"stream/{year}") as record:
+            season_rows = 0
+            for fourths in iter_fourth_batches(path, columns, max_rows, prepare=prepare):
+                fourths = add_indicators(add_situation_categories(apply_schema(fourths)))
+                part = build_cube(fourths)
+                cube = part if cube is None else merge_cubes([cube, part])
+                season_rows += len(fourths)
+            record["rows"] = season_rows
+        print(f"Streamed {season_rows} 4th downs from {year}")
+        total_rows += season_rows
+    print(f"Streamed {total_rows} 4th downs in {time.perf_counter() - start:.2f}s "
+          f"(batches of at most {max_rows} rows)")
+    return cube
@@ -0,0 +1,70 @@
+import json
+import os
+
+# Headline numbers for the dashboard and presentation, written by every analysis run
+SUMMARY_FILE = "analysis_summary.json"
+# Seasons from this one on count as the analytics era in the summary
+ANALYTICS_ERA = 2015
+
+
+def _pct(numerator, denominator):
+    return round(float(numerator) / float(denominator) * 100, 1) if denominator else 0.0
+
+
+def build_summary(cube, analyses, charts):
+    """Headline metrics of the 4th downs, computed from the aggregate cube.
+
+    `analyses` and `charts` are the number of analyses and charts the
+    project produces; the charts are counted by the run that writes them.
+    """
+    go_cube = cube[cube["decision"] == "go"]
+    seasons = sorted(int(season) for season in cube["season"].unique())
+    early = cube[cube["season"] < ANALYTICS_ERA]
+    recent = cube[cube["season"] >= ANALYTICS_ERA]
+
+    by_strategy = go_cube.groupby("play_type", observed=True)[["attempts", "successful"]].sum()
+    one_yard = go_cube[go_cube["ydstogo"] == 1]
+    sneaks = go_cube[go_cube["is_qb_sneak"] == True]
+
+    def strategy_rate(play_type):
+        if play_type not in by_strategy.index:
+            return 0.0
+        return _pct(by_strategy.loc[play_type, "successful"], by_strategy.loc[play_type, "attempts"])
+
+    return {
+        "total_fourths": int(cube["plays"].sum()),
+        "first_season": seasons[0] if seasons else None,
+        "last_season": seasons[-1] if seasons else None,
+        "seasons": len(seasons),
+        "go_attempts": int(go_cube["plays"].sum()),
+        "go_rate": _pct(cube["go"].sum(), cube["plays"].sum()),
+        "go_rate_before_analytics_era": _pct(early["go"].sum(), early["plays"].sum()),
+        "go_rate_analytics_era": _pct(recent["go"].sum(), recent["plays"].sum()),
+        "analytics_era": ANALYTICS_ERA,
+        # same definition as the success rate analysis: conversions per go-for-it attempt
+        "success_rate": _pct(go_cube["successful"].sum(), go_cube["plays"].sum()),
+        "one_yard_success_rate": _pct(one_yard["successful"].sum(), one_yard["attempts"].sum()),
+        "run_success_rate": strategy_rate("run"),
+        "pass_success_rate": strategy_rate("pass"),
+        "qb_sneak_rate": _pct(sneaks["plays"].sum(), go_cube["plays"].sum()),
+        "qb_sneak_success_rate": _pct(sneaks["successful"].sum(), sneaks["plays"].sum()),
+        "analyses": analyses,
+        "charts": charts,
+    }
+
+
+def write_summary(summary, cache_dir="cache"):
+    """Write the summary next to the other run artifacts and return its path"""
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, SUMMARY_FILE)
+    with open(path, "w") as f:
+        json.dump(summary, f, indent=2)
+    return path
+
+
+def load_summary(path=os.path.join("cache", SUMMARY_FILE)):
+    """Read the summary written by the last analysis run"""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{path} not found, run fourth_down_scripts.py first to write it")
+    with open(path) as f:
+        return json.load(f)
@@ -0,0 +1,132 @@
+"""Per-team 4th down aggression and conversion indices.
+
+A team's aggression index is how often it went for it relative to how often
+the league did in the same situations (season, field position, distance and
+time bucket): 100 is league average, 120 means 20% more go-for-it decisions
+than the league would have made on the same 4th downs. The conversion index
+does the same for conversions on its go-for-it attempts.
+
+Every count is accumulated per (team, season) with one bincount, so the
+result is a dense teams x seasons matrix per measure; rolling multi-season
+windows are differences of its cumulative sums along the season axis.
+"""
+import numpy as np
+import pandas as pd
+
+from bucketing import FIELD_ORDER, TIME_ORDER
+from rates import outcome_arrays
+
+# relocated franchises under their current abbreviation, so each team is one row
+TEAM_ALIASES = {"OAK": "LV", "SD": "LAC", "STL": "LA", "LAR": "LA"}
+# longer distances share the last bin when matching situations
+MAX_DISTANCE = 10
+ROLLING_SEASONS = 3
+
+
+def _as_float(values):
+    return pd.Series(values).to_numpy(dtype="float64", na_value=np.nan)
+
+
+def _indices(counts):
+    """Go rate, success rate and the two indices from count arrays (NaN where undefined)"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return {
+            "go_rate": counts["go"] / counts["plays"] * 100,
+            "success_rate": counts["successful"] / counts["attempts"] * 100,
+            "aggression_index": counts["go"] / counts["expected_go"] * 100,
+            "conversion_index": counts["successful"] / counts["expected_successful"] * 100,
+        }
+
+
+def current_teams(posteam):
+    """posteam with relocated franchises under their current abbreviation (see TEAM_ALIASES), as a categorical.
+
+    The aliases are applied to the distinct abbreviations, not to every row.
+    """
+    posteam = pd.Series(posteam, dtype="category")
+    merged, teams = pd.factorize(posteam.cat.categories.map(lambda name: TEAM_ALIASES.get(name, name)), sort=True)
+    codes = posteam.cat.codes.to_numpy()
+    return pd.Series(pd.Categorical.from_codes(np.where(codes >= 0, merged[codes], -1), categories=teams),
+                     index=posteam.index, name=posteam.name)
+
+
+def _trailing_sum(matrix, window):
+    """Sum over each season and the window - 1 before it, from one cumulative sum"""
+    cumulative = np.concatenate([np.zeros((matrix.shape[0], 1)), np.cumsum(matrix, axis=1)], axis=1)
+    end = np.arange(1, matrix.shape[1] + 1)
+    return cumulative[:, end] - cumulative[:, np.maximum(end - window, 0)]
+
+
+def team_counts(fourths):
+    """Plays, go-for-it decisions, conversions and their league expectations per team and season.
+
+    The league's go and conversion rates per situation are two bincounts
+    over every 4th down; each play then carries its situation's rates as its
+    expected counts, and every count is summed per (team, season) in one
+    more bincount each. Returns ({count: teams x seasons array}, teams,
+    seasons).
+    """
+    # seasons are small ints: their codes come from a lookup table instead of a sort
+    season = fourths["season"].to_numpy(dtype=np.int64)
+    first = season.min()
+    seasons = np.flatnonzero(np.bincount(season - first)) + first
+    lookup = np.zeros(seasons[-1] - first + 1, dtype=np.int64)
+    lookup[seasons - first] = np.arange(len(seasons))
+    s = lookup[season - first]
+    f = np.asarray(pd.Categorical(fourths["field_position"], categories=FIELD_ORDER).codes, dtype=np.int64)
+    t = np.asarray(pd.Categorical(fourths["time_category"], categories=TIME_ORDER).codes, dtype=np.int64)
+    d = np.clip(np.nan_to_num(_as_float(fourths["ydstogo"]), nan=1), 1, MAX_DISTANCE).astype(np.int64) - 1
+
+    go, attempt, success = outcome_arrays(fourths)
+
+    shape = (len(seasons), len(FIELD_ORDER), MAX_DISTANCE, len(TIME_ORDER))
+    situation = np.ravel_multi_index((s, f, d, t), shape)
+    size = int(np.prod(shape))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        go_rate = np.bincount(situation, weights=go, minlength=size) / np.bincount(situation, minlength=size)
+        success_rate = (np.bincount(situation, weights=success, minlength=size)
+                        / np.bincount(situation, weights=attempt, minlength=size))
+
+    posteam = current_teams(fourths["posteam"])
+    teams = posteam.cat.categories
+    team = posteam.cat.codes.to_numpy(dtype=np.int64)
+    keep = team >= 0
+    cell = team[keep] * len(seasons) + s[keep]
+    weights = {
+        "plays": None,
+        "go": go,
+        "expected_go": go_rate[situation],
+        "attempts": attempt,
+        "successful": success,
+        "expected_successful": np.nan_to_num(success_rate[situation]) * attempt,
+    }
+    counts = {name: np.bincount(cell, weights=None if w is None else w[keep],
+                                minlength=len(teams) * len(seasons)).reshape(len(teams), len(seasons))
+              for name, w in weights.items()}
+    return counts, list(teams), seasons
+
+
+def team_season_table(counts, teams, seasons, window=ROLLING_SEASONS):
+    """One row per team and season it played, with its rates, indices and their trailing `window`-season values"""
+    rolling = {name: _trailing_sum(values, window) for name, values in counts.items()}
+    columns = {name: values for name, values in counts.items() if not name.startswith("expected")}
+    columns.update(_indices(counts))
+    columns.update({f"rolling_{name}": values for name, values in _indices(rolling).items()})
+    index = pd.MultiIndex.from_product([teams, seasons], names=["posteam", "season"])
+    table = pd.DataFrame({name: np.ravel(values) for name, values in columns.items()}, index=index)
+    table[["plays", "go", "attempts", "successful"]] = table[["plays", "go", "attempts", "successful"]].astype("int64")
+    return table[table["plays"] > 0].round(1)
+
+
+def team_table(counts, teams, recent=ROLLING_SEASONS):
+    """All seasons per team, ranked by aggression index, with the index over the last `recent` seasons"""
+    totals = {name: values.sum(axis=1) for name, values in counts.items()}
+    table = pd.DataFrame({name: values for name, values in totals.items() if not name.startswith("expected")},
+                         index=pd.Index(teams, name="posteam")).astype("int64")
+    for name, values in _indices(totals).items():
+        table[name] = values
+    table["recent_aggression_index"] = _indices({name: values[:, -recent:].sum(axis=1)
+                                                 for name, values in counts.items()})["aggression_index"]
+    table = table.sort_values("aggression_index", ascending=False).round(1)
+    table.insert(0, "rank", np.arange(1, len(table) + 1))
+    return table
@@ -0,0 +1,56 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+import conversion
+from bucketing import TIME_ORDER
+
+
+def _cells():
+    rng = np.random.default_rng(0)
+    n = 200
+    attempts = rng.integers(1, 5, n)
+    return pd.DataFrame({
+        "season": rng.choice([2022, 2023, 2024], n),
+        "time_category": rng.choice(TIME_ORDER, n),
+        "yardline_100": rng.integers(1, 100, n),
+        "ydstogo": rng.integers(1, 20, n),
+        "play_type": rng.choice(conversion.PLAY_TYPES, n),
+        "attempts": attempts,
+        "conversions": rng.binomial(attempts, 0.5),
+    })
+
+
+def test_saved_model_is_reused_for_the_same_cells(tmp_path):
+    cells = _cells()
+    first = conversion.load_or_fit_conversion_model(cells, tmp_path)
+    assert conversion.load_conversion_model(tmp_path, conversion.cells_key(cells)) is not None
+    again = conversion.load_or_fit_conversion_model(cells, tmp_path)
+    np.testing.assert_array_equal(first["coef"], again["coef"])
+
+
+def test_changing_ridge_forces_a_refit(tmp_path, monkeypatch):
+    cells = _cells()
+    first = conversion.load_or_fit_conversion_model(cells, tmp_path)
+    old_key = conversion.cells_key(cells)
+
+    monkeypatch.setattr(conversion, "RIDGE", conversion.RIDGE * 10)
+    assert conversion.cells_key(cells) != old_key
+    refitted = conversion.load_or_fit_conversion_model(cells, tmp_path)
+    assert float(refitted["ridge"]) == conversion.RIDGE
+    assert not np.allclose(first["coef"], refitted["coef"])
+
+
+def test_changing_knots_forces_a_refit(tmp_path, monkeypatch):
+    cells = _cells()
+    conversion.load_or_fit_conversion_model(cells, tmp_path)
+
+    monkeypatch.setattr(conversion, "YARD_KNOTS", conversion.YARD_KNOTS[:-1])
+    assert conversion.load_conversion_model(tmp_path, conversion.cells_key(cells)) is None
+    refitted = conversion.load_or_fit_conversion_model(cells, tmp_path)
+    width = 1 + sum(width for _, width in conversion._blocks(len(refitted["seasons"])))
+    assert len(refitted["coef"]) == width
@@ -0,0 +1,105 @@
+"""Go-for-it and conversion rates conditioned on the offense's pre-snap win probability.
+
+Every grid is a 2D histogram over integer bin indices: each play gets a row
+and a column bin (win probability bin, yardline, field position bucket,
+minutes left), and plays, go-for-it decisions, attempts and conversions are
+summed per cell with one np.bincount each over the flattened cell index. No
+groupby over the float wp values is involved, so a 50 x 99 grid over every
+4th down costs a few array passes.
+"""
+import numpy as np
+import pandas as pd
+
+from bucketing import FIELD_ORDER, TIME_ORDER
+from intervals import add_intervals
+from rates import outcome_arrays
+
+WP_DECILES = 10
+# the fine grids: 2 percentage points of win probability per bin
+FINE_WP_BINS = 50
+MINUTES = 60
+# cells with fewer plays get no rate on the heatmaps
+MIN_CELL_PLAYS = 5
+
+
+def _as_float(values):
+    return pd.Series(values).to_numpy(dtype="float64", na_value=np.nan)
+
+
+def _clip_bins(values, n):
+    """floor(values) clipped into 0..n-1, -1 where missing"""
+    codes = np.clip(np.floor(np.nan_to_num(values)), 0, n - 1).astype(np.int64)
+    codes[np.isnan(values)] = -1
+    return codes
+
+
+def wp_bins(wp, bins=WP_DECILES):
+    """Win probability bin of every play (0 = lowest), -1 where wp is missing"""
+    return _clip_bins(_as_float(wp) * bins, bins)
+
+
+def wp_labels(bins=WP_DECILES):
+    """Bin labels in percent, e.g. "0-10%" ... "90-100%" for the deciles"""
+    edges = np.linspace(0, 100, bins + 1)
+    return [f"{low:g}-{high:g}%" for low, high in zip(edges[:-1], edges[1:])]
+
+
+def yardline_bins(yardline_100):
+    """yardline_100 - 1, i.e. 0..98"""
+    return _clip_bins(_as_float(yardline_100) - 1, 99)
+
+
+def minute_bins(game_seconds_remaining):
+    """Whole minutes left in regulation, 0..59 (overtime counts as 0)"""
+    return _clip_bins(_as_float(game_seconds_remaining) / 60, MINUTES)
+
+
+def field_bins(field_position):
+    return np.asarray(pd.Categorical(field_position, categories=FIELD_ORDER).codes, dtype=np.int64)
+
+
+def time_bins(time_category):
+    return np.asarray(pd.Categorical(time_category, categories=TIME_ORDER).codes, dtype=np.int64)
+
+
+def grid_counts(fourths, rows, n_rows, cols, n_cols):
+    """Plays, go-for-it decisions, attempts and conversions per (row bin, column bin).
+
+    `rows` and `cols` are integer bin indices of every play (-1 leaves the
+    play out). Returns {measure: (n_rows, n_cols) int array}.
+    """
+    go, attempt, success = outcome_arrays(fourths)
+    keep = (rows >= 0) & (cols >= 0)
+    cell = rows[keep] * n_cols + cols[keep]
+    weights = {"plays": None, "go": go, "attempts": attempt, "successful": success}
+    return {name: np.bincount(cell, weights=None if w is None else w[keep], minlength=n_rows * n_cols)
+            .reshape(n_rows, n_cols).astype(np.int64)
+            for name, w in weights.items()}
+
+
+def grid_go_rate(counts, min_plays=MIN_CELL_PLAYS):
+    """Go-for-it rate (%) of a grid, NaN in cells below min_plays plays"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(counts["plays"] >= min_plays, counts["go"] / counts["plays"] * 100, np.nan)
+
+
+def grid_success_rate(counts, min_plays=MIN_CELL_PLAYS):
+    """Conversion rate (%) of a grid, NaN in cells below min_plays attempts"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(counts["attempts"] >= min_plays, counts["successful"] / counts["attempts"] * 100, np.nan)
+
+
+def grid_rates(counts, min_plays=MIN_CELL_PLAYS):
+    """Go-for-it and success rates (%) of a grid, NaN in cells below min_plays plays / attempts"""
+    return grid_go_rate(counts, min_plays), grid_success_rate(counts, min_plays)
+
+
+def wp_decile_table(fourths):
+    """Plays, go rate, attempts and success rate (with its 95% intervals) per win probability decile"""
+    counts = grid_counts(fourths, wp_bins(fourths["wp"]), WP_DECILES, np.zeros(len(fourths), dtype=np.int64), 1)
+    table = pd.DataFrame({name: values[:, 0] for name, values in counts.items()},
+                         index=pd.Index(wp_labels(), name="wp_decile"))
+    go_rate, success_rate = grid_rates(counts, min_plays=1)
+    table["go_rate"] = go_rate[:, 0].round(1)
+    table["success_rate"] = success_rate[:, 0].round(1)
+    return add_intervals(table)